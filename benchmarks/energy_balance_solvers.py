@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""
+Compares the energy balance solvers: function evaluations per sunlit latitude, run time, and the largest relative
+difference in z_bar from a reference solved to a tolerance of 1e-12, for each species.
+
+    python benchmarks/energy_balance_solvers.py --num-models 64 --nlat 181 --tolerance 1e-6
+"""
+
+import argparse
+import dataclasses
+import json
+import logging
+import time
+
+import numpy as np
+
+from comet_ice_sublimation.model_input import (
+    EnergyBalanceSolver,
+    SublimationModelInput,
+    default_energy_balance_tolerance,
+)
+from comet_ice_sublimation.model_runner import run_sublimation_model
+from comet_ice_sublimation.molecular_species import *
+
+reference_tolerance = 1e-12
+
+
+def make_batch(
+    species: MolecularSpecies, num_models: int, nlat: int, seed: int
+) -> list[SublimationModelInput]:
+    rng = np.random.default_rng(seed)
+    return [
+        SublimationModelInput(
+            species=species,
+            visual_albedo=float(rng.uniform(0.0, 0.5)),
+            infrared_albedo=float(rng.uniform(0.0, 0.5)),
+            rh_au=float(rng.uniform(0.5, 10.0)),
+            sub_solar_latitude=float(rng.uniform(0.0, 90.0)),
+            num_latitude_gridpoints=nlat,
+            t_init_K=get_starting_temperature(species),
+            return_profile=True,
+        )
+        for _ in range(num_models)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--species",
+        choices=MolecularSpecies.all_species(),
+        nargs="+",
+        default=MolecularSpecies.all_species(),
+    )
+    parser.add_argument("--num-models", type=int, default=64)
+    parser.add_argument("--nlat", type=int, default=181)
+    parser.add_argument(
+        "--tolerance", type=float, default=default_energy_balance_tolerance
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", dest="filename", help="Save the comparison as json")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    print(
+        f"{args.num_models} models per species, nlat = {args.nlat}, tolerance = {args.tolerance:g}"
+    )
+    print(
+        f"{'species':>8} {'solver':>17} {'evals/lat':>10} {'time (s)':>10} {'max |dz_bar|':>13}"
+    )
+
+    comparison = []
+    for species in args.species:
+        smis = make_batch(
+            species=MolecularSpecies(species),
+            num_models=args.num_models,
+            nlat=args.nlat,
+            seed=args.seed,
+        )
+
+        reference_z_bars = np.array(
+            [
+                run_sublimation_model(
+                    dataclasses.replace(
+                        smi,
+                        solver=EnergyBalanceSolver.newton_bisection,
+                        tolerance=reference_tolerance,
+                    )
+                ).z_bar
+                for smi in smis
+            ]
+        )
+
+        for solver in EnergyBalanceSolver:
+            solver_smis = [
+                dataclasses.replace(smi, solver=solver, tolerance=args.tolerance)
+                for smi in smis
+            ]
+
+            t_start = time.perf_counter()
+            smrs = [run_sublimation_model(smi) for smi in solver_smis]
+            elapsed = time.perf_counter() - t_start
+
+            num_evaluations = 0
+            num_sunlit = 0
+            for smr in smrs:
+                # solved by iteration, with the profiles kept, as make_batch asks for
+                assert smr.num_iterations is not None and smr.temps_K is not None
+                num_evaluations += smr.num_iterations
+                num_sunlit += int(np.isfinite(smr.temps_K).sum())
+            z_bars = np.array([smr.z_bar for smr in smrs])
+            max_difference = float(np.max(np.abs(z_bars / reference_z_bars - 1)))
+
+            comparison.append(
+                {
+                    "species": species,
+                    "solver": solver.value,
+                    "evaluations_per_latitude": num_evaluations / num_sunlit,
+                    "seconds": elapsed,
+                    "max_relative_z_bar_difference": max_difference,
+                }
+            )
+            print(
+                f"{species:>8} {solver.value:>17} {num_evaluations / num_sunlit:>10.2f}"
+                f" {elapsed:>10.3f} {max_difference:>13.2e}"
+            )
+
+    if args.filename is not None:
+        with open(args.filename, "w") as json_file:
+            json.dump(
+                {
+                    "num_models": args.num_models,
+                    "nlat": args.nlat,
+                    "tolerance": args.tolerance,
+                    "solvers": comparison,
+                },
+                json_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
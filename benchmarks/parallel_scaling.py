@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Measures how the run time of run_sublimation_models_parallel scales with the number of worker processes.
+
+    python benchmarks/parallel_scaling.py --num-models 512 --nlat 181 --max-workers 64
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from comet_ice_sublimation.model_input import SublimationModelInput
+from comet_ice_sublimation.model_runner import (
+    default_num_workers,
+    run_sublimation_models_parallel,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+def make_batch(
+    species: MolecularSpecies, num_models: int, nlat: int, seed: int
+) -> list[SublimationModelInput]:
+    rng = np.random.default_rng(seed)
+    return [
+        SublimationModelInput(
+            species=species,
+            visual_albedo=float(rng.uniform(0.0, 0.5)),
+            infrared_albedo=float(rng.uniform(0.0, 0.5)),
+            rh_au=float(rng.uniform(0.5, 10.0)),
+            sub_solar_latitude=float(rng.uniform(0.0, 90.0)),
+            num_latitude_gridpoints=nlat,
+            t_init_K=get_starting_temperature(species),
+            return_profile=False,
+        )
+        for _ in range(num_models)
+    ]
+
+
+def worker_counts(max_workers: int) -> list[int]:
+    # powers of two up to max_workers, and max_workers itself
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--species", choices=MolecularSpecies.all_species(), default="H2O"
+    )
+    parser.add_argument("--num-models", type=int, default=512)
+    parser.add_argument("--nlat", type=int, default=181)
+    parser.add_argument("--max-workers", type=int, default=default_num_workers())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", dest="filename", help="Save the scaling curve as json")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    smis = make_batch(
+        species=MolecularSpecies(args.species),
+        num_models=args.num_models,
+        nlat=args.nlat,
+        seed=args.seed,
+    )
+
+    print(f"{args.num_models} {args.species} models, nlat = {args.nlat}")
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8} {'efficiency':>10}")
+
+    curve = []
+    for workers in worker_counts(args.max_workers):
+        t_start = time.perf_counter()
+        run_sublimation_models_parallel(smis=smis, workers=workers)
+        elapsed = time.perf_counter() - t_start
+
+        speedup = curve[0]["seconds"] / elapsed if curve else 1.0
+        curve.append(
+            {
+                "workers": workers,
+                "seconds": elapsed,
+                "speedup": speedup,
+                "efficiency": speedup / workers,
+            }
+        )
+        print(
+            f"{workers:>8d} {elapsed:>10.3f} {speedup:>8.2f} {speedup / workers:>10.2f}"
+        )
+
+    if args.filename is not None:
+        with open(args.filename, "w") as json_file:
+            json.dump(
+                {
+                    "species": args.species,
+                    "num_models": args.num_models,
+                    "nlat": args.nlat,
+                    "scaling": curve,
+                },
+                json_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""
+Times the startup of the command line program and of importing the package, each in a fresh interpreter, and checks
+them against a budget for the time they add to starting a bare interpreter.  Also checks that none of these import
+numpy or the model, which --help and argument errors never need.
+
+    python benchmarks/startup.py --runs 20 --budget-ms 100 -o startup.json
+
+Exits with status 1 if any of them is over budget or imports a module it shouldn't.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# modules that only running the model needs
+deferred_modules = [
+    "numpy",
+    "comet_ice_sublimation.energy_balance",
+    "comet_ice_sublimation.heat_of_sublimation",
+    "comet_ice_sublimation.model_runner.model_runner",
+    "comet_ice_sublimation.model_saver",
+    "comet_ice_sublimation.surface_geometry",
+]
+
+default_budget_ms = 100.0
+
+# arguments of the command line program for each case, or None to only import the package
+_startup_cases = {
+    "import": None,
+    "cli/help": ["--help"],
+    "cli/sweep/help": ["sweep", "--help"],
+    "cli/light-curve/help": ["light-curve", "--help"],
+    "cli/batch/help": ["batch", "--help"],
+    "cli/monte-carlo/help": ["monte-carlo", "--help"],
+    "cli/build-table/help": ["build-table", "--help"],
+    "cli/serve/help": ["serve", "--help"],
+}
+
+# the argv of python -c starts with "-c", which main skips like the name of the program
+_run_main = "from comet_ice_sublimation.comet_ice_sublimation import main; main()"
+
+_probe = """
+import sys
+sys.argv = ["comet_ice"] + {argv!r}
+try:
+    {statement}
+except SystemExit:
+    pass
+loaded = [m for m in {deferred_modules!r} if any(n == m or n.startswith(m + ".") for n in sys.modules)]
+print(",".join(loaded), file=sys.stderr)
+"""
+
+
+def case_command(argv: list[str] | None) -> list[str]:
+    if argv is None:
+        return [sys.executable, "-c", "import comet_ice_sublimation"]
+    return [sys.executable, "-c", _run_main, *argv]
+
+
+def time_command(command: list[str], runs: int) -> list[float]:
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def loaded_deferred_modules(argv: list[str] | None) -> list[str]:
+    probe = _probe.format(
+        argv=argv or [],
+        statement="import comet_ice_sublimation" if argv is None else _run_main,
+        deferred_modules=deferred_modules,
+    )
+    # the list of modules is the last line on stderr, after any warnings
+    result = subprocess.run(
+        [sys.executable, "-c", probe], check=True, capture_output=True, text=True
+    )
+    loaded = result.stderr.splitlines()[-1] if result.stderr else ""
+    return loaded.split(",") if loaded else []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=20,
+        help="Number of fresh interpreters each case is timed in; the fastest is checked against the budget",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=default_budget_ms,
+        help="Largest time in milliseconds that a case may add to starting a bare interpreter",
+    )
+    parser.add_argument("-o", dest="filename", help="Save the timings as json")
+    args = parser.parse_args()
+
+    interpreter = time_command([sys.executable, "-c", "pass"], runs=args.runs)
+    interpreter_ms = 1e3 * min(interpreter)
+    print(f"{'bare interpreter':<25} {interpreter_ms:8.1f} ms")
+
+    results = {}
+    failures = []
+    for name, argv in _startup_cases.items():
+        seconds = time_command(case_command(argv), runs=args.runs)
+        overhead_ms = 1e3 * min(seconds) - interpreter_ms
+        loaded = loaded_deferred_modules(argv)
+        results[name] = {
+            "seconds": min(seconds),
+            "seconds_median": statistics.median(seconds),
+            "overhead_ms": overhead_ms,
+            "deferred_modules_loaded": loaded,
+        }
+
+        flags = []
+        if overhead_ms > args.budget_ms:
+            flags.append("over budget")
+        if loaded:
+            flags.append(f"imports {', '.join(loaded)}")
+        if flags:
+            failures.append(name)
+        print(
+            f"{name:<25} {1e3 * min(seconds):8.1f} ms  (+{overhead_ms:.1f} ms)"
+            + ("  " + "; ".join(flags) if flags else "")
+        )
+
+    if args.filename is not None:
+        with open(args.filename, "w") as json_file:
+            json.dump(
+                {
+                    "python": sys.version,
+                    "budget_ms": args.budget_ms,
+                    "interpreter_seconds": min(interpreter),
+                    "startup": results,
+                },
+                json_file,
+                indent=2,
+            )
+
+    if failures:
+        print(
+            f"\n{len(failures)} startup cases failed the budget of {args.budget_ms} ms"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
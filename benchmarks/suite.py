@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks the hot paths of the model: the heat of sublimation of each species, the scalar energy balance and its
+iteration, in all and per iteration, the average projection factor, end-to-end run_sublimation_model for each
+species across latitude grids from a handful of points up and heliocentric distances, fitting albedos and distances
+to arrays of observations, save_model in each format, and the startup time of the command line program.
+
+Run the suite and save the timings as a json baseline, then compare a later run against it:
+
+    python benchmarks/suite.py run -o baseline.json
+    python benchmarks/suite.py run -o current.json
+    python benchmarks/suite.py compare baseline.json current.json --threshold 0.10
+
+compare exits with status 1 if any benchmark got slower by more than the threshold.  Pass --quick to run on fewer
+grid sizes and distances, and -k to only run the benchmarks whose names contain any of the given strings.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import datetime
+import importlib.metadata
+import json
+import logging
+import math
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable, Iterator
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance import *
+from comet_ice_sublimation.heat_of_sublimation import *
+from comet_ice_sublimation.heat_of_sublimation.pow10 import pow10_array
+from comet_ice_sublimation.model_input import (
+    FitParameter,
+    SublimationModelFitInput,
+    SublimationModelInput,
+)
+from comet_ice_sublimation.model_runner import (
+    fit_sublimation_models,
+    run_sublimation_model,
+)
+from comet_ice_sublimation.model_saver import save_model
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.parse_arguments import ModelOutputStorageFormat
+from comet_ice_sublimation.surface_geometry import *
+
+baseline_version = 1
+
+latitude_gridpoints = [181, 1001, 10001, 100001]
+heliocentric_distances_au = [0.5, 1.0, 3.0, 10.0]
+quick_latitude_gridpoints = [181, 10001]
+quick_heliocentric_distances_au = [1.0]
+# grids too small for the array solver's per-call overhead to pay off, which the scalar solver runs instead
+small_latitude_gridpoints = [5, 21, 61]
+
+# temperatures the scalar functions are timed at, one call each per loop, spanning the range the model reaches for
+# each species
+_benchmark_temperatures_K = {
+    MolecularSpecies.h2o: np.linspace(100.0, 300.0, 64),
+    MolecularSpecies.h2o_ch4: np.linspace(100.0, 300.0, 64),
+    MolecularSpecies.co2: np.linspace(40.0, 200.0, 64),
+    MolecularSpecies.co: np.linspace(15.0, 60.0, 64),
+}
+
+
+@dataclasses.dataclass
+class Benchmark:
+    name: str
+    function: Callable[[], object]
+    # calls of function per loop, so that timings are reported per call
+    calls_per_loop: int = 1
+    # fixed number of loops per repeat for slow benchmarks, instead of as many as fit in timeit's autorange
+    loops: int | None = None
+
+
+def make_input(
+    species: MolecularSpecies, rh_au: float, nlat: int, return_profile: bool = False
+) -> SublimationModelInput:
+    return SublimationModelInput(
+        species=species,
+        visual_albedo=0.05,
+        infrared_albedo=0.05,
+        rh_au=rh_au,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=nlat,
+        t_init_K=get_starting_temperature(species),
+        return_profile=return_profile,
+    )
+
+
+def heat_of_sublimation_benchmarks() -> Iterator[Benchmark]:
+    for species in MolecularSpecies:
+        temps_K = _benchmark_temperatures_K[species]
+        scalar_temps_K = temps_K.tolist()
+
+        def scalar(species=species, scalar_temps_K=scalar_temps_K):
+            for t_K in scalar_temps_K:
+                heat_of_sublimation(species=species, t_K=t_K)
+
+        yield Benchmark(
+            name=f"heat_of_sublimation/{species.value}",
+            function=scalar,
+            calls_per_loop=len(scalar_temps_K),
+        )
+
+        array_temps_K = np.resize(temps_K, 10000)
+        yield Benchmark(
+            name=f"heat_of_sublimation_array/{species.value}/n=10000",
+            function=lambda species=species, t_K=array_temps_K: heat_of_sublimation_array(
+                species=species, t_K=t_K
+            ),
+        )
+
+    # the price of matching the scalar functions bit-for-bit: the array functions raise 10 to the vapor pressure
+    # exponent with the C library pow one element at a time, rather than with NumPy's vectorized power
+    exponents = np.resize(np.linspace(-10.0, 10.0, 64), 10000)
+    yield Benchmark(
+        name="pow10_array/n=10000",
+        function=lambda x=exponents: pow10_array(x),
+    )
+    yield Benchmark(
+        name="np.power/n=10000",
+        function=lambda x=exponents: np.power(10.0, x),
+    )
+
+
+def energy_balance_benchmarks(rh_aus: list[float]) -> Iterator[Benchmark]:
+    for species in MolecularSpecies:
+        for rh_au in rh_aus:
+            smi = make_input(species=species, rh_au=rh_au, nlat=181)
+            t_init_K = get_starting_temperature(species)
+            incident_solar_flux = (
+                solar_flux_1au_erg_per_cm2_per_second
+                * (1.0 - smi.visual_albedo)
+                / (math.pi * rh_au**2)
+            )
+
+            yield Benchmark(
+                name=f"energy_balance/{species.value}/rh={rh_au:g}",
+                function=lambda smi=smi, flux=incident_solar_flux, t_K=t_init_K: energy_balance(
+                    smi=smi, incident_solar_flux=flux, t_K=t_K
+                ),
+            )
+            yield Benchmark(
+                name=f"converge_energy_balance/{species.value}/rh={rh_au:g}",
+                function=lambda smi=smi, t_K=t_init_K: converge_energy_balance(
+                    smi=smi,
+                    average_projection_factor=1.0 / math.pi,
+                    t_init_K=t_K,
+                ),
+            )
+
+            # the same, timed per iteration of the energy balance
+            num_iterations = int(
+                converge_energy_balance_array(
+                    smi=smi,
+                    average_projection_factors=np.array([1.0 / math.pi]),
+                    t_init_K=t_init_K,
+                ).num_iterations[0]
+            )
+            yield Benchmark(
+                name=f"converge_energy_balance/per_iteration/{species.value}/rh={rh_au:g}",
+                function=lambda smi=smi, t_K=t_init_K: converge_energy_balance(
+                    smi=smi,
+                    average_projection_factor=1.0 / math.pi,
+                    t_init_K=t_K,
+                ),
+                calls_per_loop=num_iterations,
+            )
+
+
+def average_projection_factor_benchmarks(nlats: list[int]) -> Iterator[Benchmark]:
+    grid = make_latitude_grid(sub_solar_latitude=30.0, num_latitude_gridpoints=181)
+    arctic_latitude_rad = (90 - 30.0) * math.pi / 180
+    points = [
+        (arctic_latitude_rad, lat, math.sin(lat), math.cos(lat), math.tan(lat))
+        for lat in grid.latitudes_rad.tolist()
+    ]
+
+    # the scalar function is cached, so time what it costs to compute rather than to look up
+    uncached = average_projection_factor.__wrapped__
+
+    def scalar():
+        for point in points:
+            uncached(*point)
+
+    yield Benchmark(
+        name="average_projection_factor/nlat=181",
+        function=scalar,
+        calls_per_loop=len(points),
+    )
+
+    for nlat in nlats:
+        sin_latitudes = np.linspace(-1.0, 1.0, nlat)
+        latitudes = np.arcsin(sin_latitudes)
+        cos_latitudes = np.cos(latitudes)
+        tan_latitudes = np.tan(latitudes)
+        yield Benchmark(
+            name=f"average_projection_factor_array/nlat={nlat}",
+            function=lambda l=latitudes, s=sin_latitudes, c=cos_latitudes, t=tan_latitudes: average_projection_factor_array(
+                arctic_latitude_rad, l, s, c, t
+            ),
+        )
+
+
+def run_sublimation_model_benchmarks(
+    nlats: list[int], rh_aus: list[float]
+) -> Iterator[Benchmark]:
+    # the latitude grid is cached between runs, as it is when a program runs the model many times
+    for species in MolecularSpecies:
+        for nlat in nlats:
+            for rh_au in rh_aus:
+                smi = make_input(species=species, rh_au=rh_au, nlat=nlat)
+                yield Benchmark(
+                    name=f"run_sublimation_model/{species.value}/nlat={nlat}/rh={rh_au:g}",
+                    function=lambda smi=smi: run_sublimation_model(smi=smi),
+                )
+
+
+def fit_sublimation_models_benchmarks(
+    num_observations: int,
+) -> Iterator[Benchmark]:
+    # observations spread over the distances and albedos of typical water production rate data, with targets the model
+    # can reach
+    rng = np.random.default_rng(0)
+    rh_aus = rng.uniform(0.5, 4.0, num_observations)
+    visual_albedos = rng.uniform(0.0, 0.5, num_observations)
+    for parameter in [FitParameter.visual_albedo, FitParameter.rh_au]:
+        smfi = SublimationModelFitInput(
+            species=MolecularSpecies.h2o,
+            parameter=parameter,
+            visual_albedos=np.asarray(
+                0.25 if parameter == FitParameter.visual_albedo else visual_albedos
+            ),
+            infrared_albedos=np.asarray(0.05),
+            rh_aus=np.asarray(
+                rh_aus if parameter == FitParameter.visual_albedo else 1.0
+            ),
+            sub_solar_latitudes=np.asarray(30.0),
+            num_latitude_gridpoints=181,
+            t_init_K=get_starting_temperature(MolecularSpecies.h2o),
+            z_bars=10 ** rng.uniform(15.0, 16.5, num_observations),
+        )
+        yield Benchmark(
+            name=f"fit_sublimation_models/{parameter.value}/n={num_observations}",
+            function=lambda smfi=smfi: fit_sublimation_models(smfi=smfi),
+            loops=1,
+        )
+
+
+def save_model_benchmarks(
+    nlats: list[int], output_dir: pathlib.Path
+) -> Iterator[Benchmark]:
+    for nlat in nlats:
+        smi = make_input(
+            species=MolecularSpecies.h2o, rh_au=1.0, nlat=nlat, return_profile=True
+        )
+        smr = run_sublimation_model(smi=smi)
+        for out_format in [
+            ModelOutputStorageFormat.json,
+            ModelOutputStorageFormat.csv,
+            ModelOutputStorageFormat.npz,
+        ]:
+            output_path = output_dir / f"model_{nlat}.{out_format.value}"
+            yield Benchmark(
+                name=f"save_model/{out_format.value}/nlat={nlat}",
+                function=lambda smi=smi, smr=smr, path=output_path, f=out_format: save_model(
+                    smi=smi, smr=smr, output_path=path, out_format=f
+                ),
+            )
+
+
+def cli_benchmarks() -> Iterator[Benchmark]:
+    # a fresh interpreter each time, so these include the cost of importing the package
+    command = [sys.executable, "-m", "comet_ice_sublimation.comet_ice_sublimation"]
+    yield Benchmark(
+        name="cli/help",
+        function=lambda: subprocess.run(
+            command + ["--help"], check=True, capture_output=True
+        ),
+        loops=1,
+    )
+    yield Benchmark(
+        name="cli/H2O/nlat=181",
+        function=lambda: subprocess.run(
+            command
+            + ["H2O", "--Av", "0.05", "--Air", "0.05", "--rh", "1", "--ssl", "30"],
+            check=True,
+            capture_output=True,
+        ),
+        loops=1,
+    )
+
+
+def time_benchmark(benchmark: Benchmark, repeats: int) -> dict[str, float | int]:
+    timer = timeit.Timer(benchmark.function)
+    loops = benchmark.loops
+    if loops is None:
+        loops, _ = timer.autorange()
+    seconds = np.array(timer.repeat(repeat=repeats, number=loops)) / (
+        loops * benchmark.calls_per_loop
+    )
+    return {
+        # the fastest repeat is the least disturbed by anything else running, so it is what compare uses
+        "seconds": float(seconds.min()),
+        "seconds_median": float(np.median(seconds)),
+        "loops": loops,
+        "repeats": repeats,
+        "calls_per_loop": benchmark.calls_per_loop,
+    }
+
+
+def run_metadata() -> dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=pathlib.Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "version": baseline_version,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "comet_ice_sublimation": importlib.metadata.version("comet_ice_sublimation"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_main(args: argparse.Namespace) -> int:
+    logging.disable(logging.WARNING)
+
+    nlats = quick_latitude_gridpoints if args.quick else latitude_gridpoints
+    rh_aus = (
+        quick_heliocentric_distances_au if args.quick else heliocentric_distances_au
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        benchmarks = [
+            *heat_of_sublimation_benchmarks(),
+            *energy_balance_benchmarks(rh_aus=rh_aus),
+            *average_projection_factor_benchmarks(nlats=nlats),
+            *run_sublimation_model_benchmarks(
+                nlats=small_latitude_gridpoints + nlats, rh_aus=rh_aus
+            ),
+            *fit_sublimation_models_benchmarks(
+                num_observations=100 if args.quick else 1000
+            ),
+            *save_model_benchmarks(
+                nlats=nlats[:2], output_dir=pathlib.Path(output_dir)
+            ),
+            *cli_benchmarks(),
+        ]
+        if args.k:
+            benchmarks = [b for b in benchmarks if any(k in b.name for k in args.k)]
+
+        for benchmark in benchmarks:
+            # keeps warnings such as save_model's about profiles in csv out of the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[benchmark.name] = time_benchmark(
+                    benchmark, repeats=args.repeats
+                )
+            print(
+                f"{benchmark.name:<55} {_format_seconds(results[benchmark.name]['seconds']):>10}",
+                flush=True,
+            )
+
+    if args.filename is not None:
+        with open(args.filename, "w") as json_file:
+            json.dump(
+                {"metadata": run_metadata(), "benchmarks": results},
+                json_file,
+                indent=2,
+            )
+
+    return 0
+
+
+def compare_main(args: argparse.Namespace) -> int:
+    with open(args.baseline) as json_file:
+        baseline = json.load(json_file)["benchmarks"]
+    with open(args.current) as json_file:
+        current = json.load(json_file)["benchmarks"]
+
+    print(f"{'benchmark':<55} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        ratio = current[name]["seconds"] / baseline[name]["seconds"]
+        if ratio > 1.0 + args.threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1.0 / (1.0 + args.threshold):
+            flag = "  faster"
+        else:
+            flag = ""
+        print(
+            f"{name:<55} {_format_seconds(baseline[name]['seconds']):>10}"
+            f" {_format_seconds(current[name]['seconds']):>10} {ratio:>7.2f}{flag}"
+        )
+
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"{name:<55} not in {args.current}")
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f"{name:<55} not in {args.baseline}")
+
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline"
+        )
+        return 1
+    return 0
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in [("s", 1.0), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", dest="filename", help="Save the timings as json")
+    run_parser.add_argument(
+        "--quick",
+        action="store_true",
+        help=f"Only use nlat = {quick_latitude_gridpoints} and rh = {quick_heliocentric_distances_au}",
+    )
+    run_parser.add_argument(
+        "-k",
+        nargs="+",
+        metavar="name",
+        help="Only run the benchmarks whose names contain any of these",
+    )
+    run_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Number of times each benchmark is timed; the fastest is kept",
+    )
+    run_parser.set_defaults(main=run_main)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare two saved runs, and flag regressions"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown above which a benchmark counts as a regression",
+    )
+    compare_parser.set_defaults(main=compare_main)
+
+    args = parser.parse_args()
+    return args.main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,36 +3,49 @@
 import logging
 import sys
 
-import numpy as np
-
-from comet_ice_sublimation.heat_of_sublimation import *
-from comet_ice_sublimation.model_input import *
-from comet_ice_sublimation.model_output import *
-from comet_ice_sublimation.model_runner import *
-from comet_ice_sublimation.model_saver.model_saver import save_model
-from comet_ice_sublimation.molecular_species import *
+# Only the argument parsing is imported up front: numpy and the model are imported by each mode once its arguments
+# are parsed, so that --help and argument errors return without loading them
 from comet_ice_sublimation.parse_arguments import *
-from comet_ice_sublimation.surface_geometry import *
 
 
 def main():
+    # subcommands are given as the first argument, in place of the species
+    if len(sys.argv) > 1 and sys.argv[1] in _subcommands:
+        return _subcommands[sys.argv[1]](sys.argv[2:])
+
     args = parse_arguments()
-    smi = sublimation_model_input_from_args(args=args)
-    if smi is None:
+    parsed_smis = [
+        sublimation_model_input_from_args(args=args, species=species)
+        for species in args.species
+    ]
+    smis = [smi for smi in parsed_smis if smi is not None]
+    if len(smis) < len(parsed_smis):
         print("No valid input for model! exiting.")
         return 1
+    if len(smis) > 1:
+        return _multi_species_main(args=args, smis=smis)
+    smi = smis[0]
+
+    import numpy as np
+
+    from comet_ice_sublimation.model_cache import SublimationModelCache
+    from comet_ice_sublimation.model_runner import (
+        run_sublimation_model,
+        run_sublimation_model_cached,
+    )
+    from comet_ice_sublimation.model_saver.model_saver import save_model
 
     print(f"Model input:\n------------\n{smi}\n------------\n")
 
-    if args.verbosity == 0:
-        logging.basicConfig(level="WARNING")
-    elif args.verbosity == 1:
-        logging.basicConfig(level="INFO")
-    else:
-        logging.basicConfig(level="DEBUG")
+    _setup_logging(args.verbosity)
 
     try:
-        smr = run_sublimation_model(smi=smi)
+        if args.cache_dir is None:
+            smr = run_sublimation_model(smi=smi)
+        else:
+            with SublimationModelCache(cache_dir=args.cache_dir) as cache:
+                smr = run_sublimation_model_cached(smi=smi, cache=cache)
+                logging.info(f"Result cache: {cache.stats()}")
         model_successful = True
         model_err_message = ""
     except Exception as e:
@@ -46,6 +59,14 @@ def main():
     print(
         f"Results:\nrh (AU): {smi.rh_au:4.2f}\tlog rh (AU): {np.log10(smi.rh_au):6.4f}\tZbar: {smr.z_bar:6.4e}\tZlog: {smr.log10_z_bar:6.4f}"
     )
+    if smr.z_bar_error is not None:
+        logging.info(f"Estimated quadrature error of Zbar: {smr.z_bar_error:6.4e}")
+    if smr.sensitivities is not None:
+        print(
+            f"dZbar/dAv: {smr.sensitivities.visual_albedo:6.4e}\tdZbar/dAir: {smr.sensitivities.infrared_albedo:6.4e}"
+            f"\tdZbar/drh (per AU): {smr.sensitivities.rh_au:6.4e}"
+            f"\tdZbar/dssl (per degree): {smr.sensitivities.sub_solar_latitude:6.4e}"
+        )
 
     if args.output_config is not None:
         save_model(
@@ -56,5 +77,360 @@ def main():
         )
 
 
+def _multi_species_main(
+    args: SublimationModelArguments, smis: list[SublimationModelInput]
+) -> int:
+    from comet_ice_sublimation.model_cache import SublimationModelCache
+    from comet_ice_sublimation.model_runner import (
+        run_sublimation_model_multi_species,
+        run_sublimation_model_multi_species_cached,
+    )
+    from comet_ice_sublimation.model_saver.model_saver import save_multi_species
+
+    for smi in smis:
+        print(f"Model input:\n------------\n{smi}\n------------\n")
+
+    _setup_logging(args.verbosity)
+
+    try:
+        if args.cache_dir is None:
+            smsr = run_sublimation_model_multi_species(smis=smis)
+        else:
+            with SublimationModelCache(cache_dir=args.cache_dir) as cache:
+                smsr = run_sublimation_model_multi_species_cached(
+                    smis=smis, cache=cache
+                )
+                logging.info(f"Result cache: {cache.stats()}")
+    except Exception as e:
+        print(f"Model failed with error message {e}!")
+        return 1
+
+    print(f"Results:\nrh (AU): {smis[0].rh_au:4.2f}")
+    for species, smr in smsr.results.items():
+        print(f"{species.value}:\tZbar: {smr.z_bar:6.4e}\tZlog: {smr.log10_z_bar:6.4f}")
+
+    if args.output_config is not None:
+        save_multi_species(
+            smis=smis,
+            smsr=smsr,
+            output_path=args.output_config.output_path,
+            out_format=args.output_config.output_format,
+        )
+
+    return 0
+
+
+def _setup_logging(verbosity: int) -> None:
+    if verbosity == 0:
+        logging.basicConfig(level="WARNING")
+    elif verbosity == 1:
+        logging.basicConfig(level="INFO")
+    else:
+        logging.basicConfig(level="DEBUG")
+
+
+def sweep_main(argv: list[str]) -> int:
+    args = parse_sweep_arguments(argv)
+    smsi = sublimation_model_sweep_input_from_args(args=args)
+    if smsi is None:
+        print("No valid input for model! exiting.")
+        return 1
+
+    import numpy as np
+
+    from comet_ice_sublimation.model_runner import run_sublimation_model_sweep_parallel
+    from comet_ice_sublimation.model_saver.model_saver import save_sweep
+
+    print(f"Model input:\n------------\n{smsi}\n------------\n")
+
+    _setup_logging(args.verbosity)
+
+    try:
+        smsr = run_sublimation_model_sweep_parallel(smsi=smsi, workers=args.workers)
+    except Exception as e:
+        print(f"Model failed with error message {e}!")
+        return 1
+
+    print("Results:")
+    for (i_rh, i_ssl, i_av, i_air), z_bar in np.ndenumerate(smsr.z_bar):
+        print(
+            f"rh (AU): {smsi.rh_aus[i_rh]:4.2f}\tssl: {smsi.sub_solar_latitudes[i_ssl]:6.2f}"
+            f"\tAv: {smsi.visual_albedos[i_av]:4.2f}\tAir: {smsi.infrared_albedos[i_air]:4.2f}"
+            f"\tZbar: {z_bar:6.4e}\tZlog: {smsr.log10_z_bar[i_rh, i_ssl, i_av, i_air]:6.4f}"
+        )
+
+    if args.output_config is not None:
+        save_sweep(
+            smsi=smsi,
+            smsr=smsr,
+            output_path=args.output_config.output_path,
+            out_format=args.output_config.output_format,
+        )
+
+    return 0
+
+
+def light_curve_main(argv: list[str]) -> int:
+    args = parse_light_curve_arguments(argv)
+    smi = light_curve_input_from_args(args=args)
+    if smi is None:
+        print("No valid input for model! exiting.")
+        return 1
+
+    from comet_ice_sublimation.model_input import read_ephemeris
+    from comet_ice_sublimation.model_runner import run_light_curve
+    from comet_ice_sublimation.model_saver.model_saver import LightCurveWriter
+
+    print(
+        f"Model input:\n------------\nSpecies: {smi.species.value}\n"
+        f"Visual albedo:\t\t{smi.visual_albedo:6.2f}\t\tInfrared albedo:\t{smi.infrared_albedo:<6.2f}\n"
+        f"Ephemeris:\t\t{args.ephemeris_path}\n------------\n"
+    )
+
+    _setup_logging(args.verbosity)
+
+    writer = None
+    if args.output_config is not None:
+        writer = LightCurveWriter(
+            smi=smi,
+            output_path=args.output_config.output_path,
+            out_format=args.output_config.output_format,
+        )
+
+    print("Results:")
+    try:
+        for row, smr in run_light_curve(
+            smi=smi, ephemeris=read_ephemeris(args.ephemeris_path)
+        ):
+            print(
+                f"epoch: {row.epoch}\trh (AU): {row.rh_au:4.2f}\tssl: {row.sub_solar_latitude:6.2f}"
+                f"\tZbar: {smr.z_bar:6.4e}\tZlog: {smr.log10_z_bar:6.4f}"
+            )
+            if writer is not None:
+                writer.write(row=row, smr=smr)
+    except Exception as e:
+        print(f"Model failed with error message {e}!")
+        return 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return 0
+
+
+def batch_main(argv: list[str]) -> int:
+    args = parse_batch_arguments(argv)
+
+    from comet_ice_sublimation.model_input import read_batch_inputs
+    from comet_ice_sublimation.model_runner import run_sublimation_model_batch
+    from comet_ice_sublimation.model_saver.model_saver import BatchResultWriter
+
+    _setup_logging(args.verbosity)
+
+    # results go to stdout unless a file is given, so nothing else is printed there
+    try:
+        input_file = (
+            sys.stdin if args.input_path is None else open(args.input_path, newline="")
+        )
+    except OSError as e:
+        # exits as argparse does on a usage error
+        print(
+            f"comet_ice batch: error: could not read the inputs: {e}", file=sys.stderr
+        )
+        return 2
+    output_file = (
+        sys.stdout
+        if args.output_path is None
+        else open(args.output_path, "w", newline="")
+    )
+    writer = BatchResultWriter(stream=output_file, out_format=args.output_format)
+
+    num_rows = 0
+    num_errors = 0
+    num_problems = 0
+    num_solves = 0
+    try:
+        input_rows = read_batch_inputs(
+            stream=input_file, input_format=args.input_format
+        )
+        for result in run_sublimation_model_batch(
+            input_rows=input_rows, workers=args.workers, window=args.window
+        ):
+            writer.write(result)
+            num_rows += 1
+            if result.error is not None:
+                num_errors += 1
+            elif (
+                result.smr is not None
+                and result.smr.num_energy_balance_problems is not None
+                and result.smr.num_energy_balance_solves is not None
+            ):
+                num_problems += result.smr.num_energy_balance_problems
+                num_solves += result.smr.num_energy_balance_solves
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    logging.info(f"Batch of {num_rows} rows finished")
+    if num_solves > 0:
+        logging.info(
+            f"Solved {num_solves} distinct energy balance problems for {num_problems} sunlit latitudes"
+            f" ({num_problems / num_solves:.2f}x deduplication)"
+        )
+    if num_errors > 0:
+        logging.warning(f"{num_errors} of {num_rows} rows failed")
+
+    return 0
+
+
+def monte_carlo_main(argv: list[str]) -> int:
+    args = parse_monte_carlo_arguments(argv)
+    smci = monte_carlo_input_from_args(args=args)
+    if smci is None:
+        print("No valid input for model! exiting.")
+        return 1
+
+    from comet_ice_sublimation.model_runner import run_sublimation_model_monte_carlo
+    from comet_ice_sublimation.model_saver.model_saver import save_monte_carlo
+
+    print(f"Model input:\n------------\n{smci}\n------------\n")
+
+    _setup_logging(args.verbosity)
+
+    try:
+        smcr = run_sublimation_model_monte_carlo(smci=smci, workers=args.workers)
+    except Exception as e:
+        print(f"Model failed with error message {e}!")
+        return 1
+
+    print(
+        f"Results over {smcr.num_samples - smcr.num_failed} samples ({smcr.num_failed} failed), seed {smcr.seed}:\n"
+        f"Zlog mean: {smcr.mean:6.4f} +/- {smcr.standard_error:6.4f}\tstd: {smcr.std:6.4f}"
+        f"\tmin: {smcr.minimum:6.4f}\tmax: {smcr.maximum:6.4f}"
+    )
+    for q, value, error in zip(
+        smcr.quantile_levels, smcr.quantiles, smcr.quantile_standard_errors
+    ):
+        print(f"Zlog quantile {q:5.3f}: {value:6.4f} +/- {error:6.4f}")
+
+    # the estimates each time the number of samples doubles, and at the end
+    print(
+        "\nConvergence:\nsamples\tmean\t+/-\t"
+        + "  ".join(f"q {q:<4.3g}" for q in smcr.quantile_levels)
+    )
+    convergence = smcr.convergence
+    next_count = 0
+    for i, count in enumerate(convergence.num_samples):
+        if count < next_count and i < convergence.num_samples.size - 1:
+            continue
+        next_count = 2 * count
+        print(
+            f"{count}\t{convergence.mean[i]:6.4f}\t{convergence.standard_error[i]:6.4f}\t"
+            + "  ".join(f"{value:6.4f}" for value in convergence.quantiles[i])
+        )
+
+    if args.output_path is not None:
+        save_monte_carlo(smci=smci, smcr=smcr, output_path=args.output_path)
+
+    return 0
+
+
+def build_table_main(argv: list[str]) -> int:
+    args = parse_build_table_arguments(argv)
+    smsi = build_table_input_from_args(args=args)
+    if smsi is None:
+        print("No valid input for model! exiting.")
+        return 1
+
+    from comet_ice_sublimation.model_runner import build_z_bar_table
+
+    print(f"Model input:\n------------\n{smsi}\n------------\n")
+
+    _setup_logging(args.verbosity)
+
+    try:
+        table = build_z_bar_table(
+            smsi=smsi,
+            output_path=args.output_path,
+            workers=args.workers,
+            num_check_points=args.num_check_points,
+            seed=args.seed,
+        )
+    except Exception as e:
+        print(f"Model failed with error message {e}!")
+        return 1
+
+    print(f"Saved table of {table.species.value} to {args.output_path}")
+    if table.interpolation_errors:
+        print("Interpolation error of Zlog (dex) at the centers of table cells:")
+    for method, errors in table.interpolation_errors.items():
+        print(
+            f"{method.value}:\tmax: {errors.max:6.2e}\t99%: {errors.p99:6.2e}\trms: {errors.rms:6.2e}"
+            f"\tover {errors.num_check_points} cells"
+        )
+
+    return 0
+
+
+def serve_main(argv: list[str]) -> int:
+    args = parse_serve_arguments(argv)
+
+    import signal
+
+    from comet_ice_sublimation.model_server import (
+        SublimationModelServer,
+        make_model_http_server,
+    )
+
+    _setup_logging(args.verbosity)
+
+    # stop cleanly on SIGTERM as well as ctrl-c, so that the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    with SublimationModelServer(
+        cache_dir=args.cache_dir,
+        max_batch_size=args.max_batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        result_cache_size=args.result_cache_size,
+    ) as model_server:
+        try:
+            http_server = make_model_http_server(
+                model_server=model_server, port=args.port, socket_path=args.socket_path
+            )
+        except OSError as e:
+            print(f"Could not start the server: {e}")
+            return 1
+
+        if args.socket_path is None:
+            host, port = http_server.socket.getsockname()[:2]
+            print(f"Serving on http://{host}:{port}", flush=True)
+        else:
+            print(f"Serving on unix socket {args.socket_path}", flush=True)
+
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            if args.socket_path is not None:
+                args.socket_path.unlink(missing_ok=True)
+            logging.info(f"Server stats: {model_server.stats.as_dict()}")
+
+    return 0
+
+
+_subcommands = {
+    "sweep": sweep_main,
+    "light-curve": light_curve_main,
+    "batch": batch_main,
+    "monte-carlo": monte_carlo_main,
+    "build-table": build_table_main,
+    "serve": serve_main,
+}
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -1 +1,7 @@
+from .energy_balance_result import *
+from .root_finding import *
 from .energy_balance import *
+from .energy_balance_table import *
+from .continuation import *
+from .unique_problems import *
+from .sensitivities import *
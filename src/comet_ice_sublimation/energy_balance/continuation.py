@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.molecular_species import *
+
+# In continuation mode, every this many latitudes are solved from the initial temperature first,
+# and the latitudes in between are started from the temperatures of their converged neighbours
+default_latitude_stride = 8
+
+
+@dataclass
+class ColdStartIterations:
+    # Surface temperatures reached when starting from the initial temperature, sorted, and the number of iterations
+    # it took to reach them.  Iterating from a fixed starting temperature mostly costs one clamped 10 K step per 10 K
+    # between the start and the solution, so the cost of a cold start at any other point is estimated from its final
+    # temperature
+    temps_K: np.ndarray
+    num_iterations: np.ndarray
+
+    @classmethod
+    def from_results(cls, sublimation_results: SublimationRateArrayResult):
+        solved = np.isfinite(sublimation_results.t_K)
+        temps_K = sublimation_results.t_K[solved]
+        order = np.argsort(temps_K)
+        return cls(
+            temps_K=temps_K[order],
+            num_iterations=sublimation_results.num_iterations[solved][order],
+        )
+
+    def estimate(self, temps_K: np.ndarray) -> np.ndarray:
+        # estimated iterations to reach each temperature from a cold start, zero where there is no solution
+        if self.temps_K.size == 0:
+            return np.zeros(np.shape(temps_K))
+        return np.where(
+            np.isfinite(temps_K),
+            np.interp(temps_K, self.temps_K, self.num_iterations),
+            0.0,
+        )
+
+
+@dataclass
+class TemperatureProfile:
+    # converged surface temperatures of a nearby solution as a function of latitude, in increasing order, nan where
+    # there was no sunlight
+    latitudes_rad: np.ndarray
+    temps_K: np.ndarray
+
+    def initial_temperatures(
+        self, latitudes_rad: np.ndarray, t_init_K: float
+    ) -> np.ndarray:
+        # starting temperatures at latitudes_rad, interpolated from the profile where it was sunlit, and t_init_K
+        # elsewhere
+        solved = np.isfinite(self.temps_K)
+        if not solved.any():
+            return np.full(np.shape(latitudes_rad), t_init_K, dtype=np.float64)
+        temps_K = np.interp(
+            latitudes_rad,
+            self.latitudes_rad[solved],
+            self.temps_K[solved],
+            left=np.nan,
+            right=np.nan,
+        )
+        return np.where(np.isfinite(temps_K), temps_K, t_init_K)
+
+
+def solve_energy_balance_continuation(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    latitude_stride: int = default_latitude_stride,
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton,
+    tolerance: float = default_energy_balance_tolerance,
+) -> tuple[SublimationRateArrayResult, ColdStartIterations]:
+    """
+    Solves the energy balance along the last axis of incident_solar_flux, taken to be latitude, in two passes:
+    every latitude_stride-th latitude is solved starting from t_init_K, and the remaining latitudes are then started
+    from the temperatures of their nearest converged neighbours, interpolated along latitude.
+    t_init_K may be an array broadcast against incident_solar_flux, such as the temperatures of a nearby solution.
+    Also returns the iteration counts of the first pass, to estimate what the second pass would have cost from t_init_K.
+    """
+
+    incident_solar_flux, infrared_albedos, t_init_Ks = np.broadcast_arrays(
+        np.asarray(incident_solar_flux, dtype=np.float64), infrared_albedo, t_init_K
+    )
+    num_latitudes = incident_solar_flux.shape[-1]
+
+    coarse = np.zeros(num_latitudes, dtype=bool)
+    coarse[::latitude_stride] = True
+    coarse[-1] = True
+
+    # flat index of every point, to report points that don't converge by their place in incident_solar_flux
+    point_indices = np.arange(incident_solar_flux.size).reshape(
+        incident_solar_flux.shape
+    )
+
+    try:
+        coarse_results = solve_energy_balance_array(
+            species=species,
+            infrared_albedo=infrared_albedos[..., coarse],
+            incident_solar_flux=incident_solar_flux[..., coarse],
+            t_init_K=t_init_Ks[..., coarse],
+            solver=solver,
+            tolerance=tolerance,
+        )
+    except EnergyBalanceConvergenceError as e:
+        raise e.at(point_indices[..., coarse]) from e
+
+    seeds_K = np.full(incident_solar_flux.shape, np.nan)
+    seeds_K[..., coarse] = coarse_results.t_K
+    seeds_K = interpolate_between_neighbours(seeds_K)
+    seeds_K = np.where(np.isfinite(seeds_K), seeds_K, t_init_Ks)
+
+    try:
+        fine_results = solve_energy_balance_array(
+            species=species,
+            infrared_albedo=infrared_albedos[..., ~coarse],
+            incident_solar_flux=incident_solar_flux[..., ~coarse],
+            t_init_K=seeds_K[..., ~coarse],
+            solver=solver,
+            tolerance=tolerance,
+        )
+    except EnergyBalanceConvergenceError as e:
+        raise e.at(point_indices[..., ~coarse]) from e
+
+    z = np.empty(incident_solar_flux.shape)
+    t_K = np.empty(incident_solar_flux.shape)
+    num_iterations = np.empty(incident_solar_flux.shape, dtype=np.int64)
+    num_clamped_steps = np.empty(incident_solar_flux.shape, dtype=np.int64)
+    for mask, results in ((coarse, coarse_results), (~coarse, fine_results)):
+        z[..., mask] = results.z
+        t_K[..., mask] = results.t_K
+        num_iterations[..., mask] = results.num_iterations
+        num_clamped_steps[..., mask] = results.num_clamped_steps
+
+    return (
+        SublimationRateArrayResult(
+            z=z,
+            t_K=t_K,
+            num_iterations=num_iterations,
+            num_clamped_steps=num_clamped_steps,
+        ),
+        ColdStartIterations.from_results(coarse_results),
+    )
+
+
+def interpolate_between_neighbours(values: np.ndarray) -> np.ndarray:
+    """
+    Fills in the nan entries along the last axis by linear interpolation between the nearest finite entries on either
+    side, or copies the nearest finite entry where there is only one side.  Rows with no finite entries stay nan.
+    """
+
+    n = values.shape[-1]
+    index = np.arange(n)
+    finite = np.isfinite(values)
+
+    # index of the nearest finite entry at or before, and at or after, each position; -1 and n where there isn't one
+    previous_index = np.maximum.accumulate(np.where(finite, index, -1), axis=-1)
+    next_index = np.flip(
+        np.minimum.accumulate(np.flip(np.where(finite, index, n), axis=-1), axis=-1),
+        axis=-1,
+    )
+
+    has_previous = previous_index >= 0
+    has_next = next_index < n
+    previous_values = np.take_along_axis(values, np.maximum(previous_index, 0), axis=-1)
+    next_values = np.take_along_axis(values, np.minimum(next_index, n - 1), axis=-1)
+
+    span = np.maximum(next_index - previous_index, 1)
+    weight = (index - previous_index) / span
+    interpolated = previous_values + weight * (next_values - previous_values)
+
+    return np.where(
+        has_previous & has_next,
+        interpolated,
+        np.where(has_previous, previous_values, next_values),
+    )
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import functools
 import math
 
 import numpy as np
@@ -7,8 +8,12 @@ from comet_ice_sublimation.heat_of_sublimation import *
 from comet_ice_sublimation.model_input import *
 from comet_ice_sublimation.physical_constants import *
 
+from .energy_balance_result import *
+from .root_finding import *
 
-@dataclass
+
+# slots keep this small and quick to build, since energy_balance returns one per iteration
+@dataclass(slots=True)
 class SublimationRateIterationResult:
     # sublimation rate for the model, molecules per cm^2 per second
     z: float
@@ -19,6 +24,156 @@ class SublimationRateIterationResult:
     converged: bool
 
 
+# Below this many sunlit points, solve_energy_balance_array iterates on each point in turn with ScalarEnergyBalance,
+# because each iteration over arrays this small costs more in numpy's per-call overhead than the arithmetic itself
+scalar_energy_balance_max_points = 32
+
+
+class ScalarEnergyBalance:
+    """
+    The clamped Newton iteration of energy_balance for one species and infrared albedo, with the species looked up
+    and the constants of the energy balance computed once, rather than on every step.  converge runs the whole
+    iteration with python floats in one loop, without building a result for each step, and gives the same results
+    as solve_energy_balance_array to the last bit: both take T^4 as (T^2)^2, since python's T**4 and NumPy's do not
+    always round alike.
+    """
+
+    __slots__ = ("tolerance", "_terms", "_root", "_emitted_flux_factor")
+
+    def __init__(
+        self,
+        species: MolecularSpecies,
+        infrared_albedo: float,
+        tolerance: float = default_energy_balance_tolerance,
+    ):
+        mass_g, self._terms = heat_of_sublimation_terms(species)
+        self._root = 1 / math.sqrt(mass_g * 2 * math.pi * boltzmann_ergs_per_kelvin)
+        # numpy scalars from the inputs would make every step slower
+        self._emitted_flux_factor = (
+            1 - float(infrared_albedo)
+        ) * stefan_boltzmann_sigma_ergs_percm2_per_kelvin4
+        self.tolerance = float(tolerance)
+
+    def step(
+        self, incident_solar_flux: float, t_K: float
+    ) -> SublimationRateIterationResult:
+        # one step of the iteration from t_K, as energy_balance takes it
+        (
+            latent_heat_of_vaporization,
+            latent_heat_of_vaporization_prime,
+            pressure,
+            pressure_prime,
+        ) = self._terms(t_K)
+
+        root = self._root
+        root_t = math.sqrt(t_K)
+
+        t_K2 = t_K * t_K
+        thermal_radiated_flux = self._emitted_flux_factor * (t_K2 * t_K2)
+
+        evaporation_loss_flux = root / root_t * pressure * latent_heat_of_vaporization
+
+        energy_balance_flux = (
+            thermal_radiated_flux + evaporation_loss_flux - incident_solar_flux
+        )
+
+        z = max(evaporation_loss_flux / latent_heat_of_vaporization, 1e-30)
+
+        # temperature derivative
+        radiated_flux_derivative = 4 * thermal_radiated_flux / t_K
+
+        x1 = pressure_prime * latent_heat_of_vaporization
+        x2 = pressure * latent_heat_of_vaporization_prime
+
+        evaporation_flux_derivative = root / root_t * (x1 + x2)
+        energy_balance_derivative = (
+            radiated_flux_derivative + evaporation_flux_derivative
+        )
+
+        dt = math.copysign(
+            min(10, abs(energy_balance_flux / energy_balance_derivative / 2)),
+            energy_balance_flux / energy_balance_derivative,
+        )
+        t_K -= dt
+
+        convergence_threshold = self.tolerance
+        converged = (
+            abs(energy_balance_flux / incident_solar_flux) < convergence_threshold
+            or abs(energy_balance_flux) < convergence_threshold
+        )
+
+        return SublimationRateIterationResult(z=z, t_K=t_K, converged=converged)
+
+    def converge(
+        self,
+        incident_solar_flux: float,
+        t_init_K: float,
+        num_iterations_max: int = 100000,
+    ) -> tuple[float, float, int, int]:
+        """
+        Iterates from t_init_K until the energy balance is met, and returns the sublimation rate, the temperature,
+        the number of iterations, and the number of steps clamped to 10 K.  The incident flux must be positive.
+        Raises EnergyBalanceConvergenceError if the iteration runs out of iterations.
+        """
+
+        # the same arithmetic as step, in the same order, inlined into one loop
+        terms = self._terms
+        root = self._root
+        emitted_flux_factor = self._emitted_flux_factor
+        convergence_threshold = self.tolerance
+        t_K = t_init_K
+        num_clamped_steps = 0
+
+        for niter in range(1, num_iterations_max + 1):
+            (
+                latent_heat_of_vaporization,
+                latent_heat_of_vaporization_prime,
+                pressure,
+                pressure_prime,
+            ) = terms(t_K)
+
+            root_over_root_t = root / math.sqrt(t_K)
+            t_K2 = t_K * t_K
+            thermal_radiated_flux = emitted_flux_factor * (t_K2 * t_K2)
+            evaporation_loss_flux = (
+                root_over_root_t * pressure * latent_heat_of_vaporization
+            )
+            energy_balance_flux = (
+                thermal_radiated_flux + evaporation_loss_flux - incident_solar_flux
+            )
+            z = max(evaporation_loss_flux / latent_heat_of_vaporization, 1e-30)
+
+            energy_balance_derivative = 4 * thermal_radiated_flux / t_K + (
+                root_over_root_t
+                * (
+                    pressure_prime * latent_heat_of_vaporization
+                    + pressure * latent_heat_of_vaporization_prime
+                )
+            )
+            newton_step = energy_balance_flux / energy_balance_derivative
+            if abs(newton_step) > 20:
+                num_clamped_steps += 1
+            t_K -= math.copysign(min(10, abs(newton_step / 2)), newton_step)
+
+            if (
+                abs(energy_balance_flux / incident_solar_flux) < convergence_threshold
+                or abs(energy_balance_flux) < convergence_threshold
+            ):
+                return z, t_K, niter, num_clamped_steps
+
+        raise EnergyBalanceConvergenceError(indices=np.array([0]))
+
+
+@functools.lru_cache(maxsize=256)
+def cached_scalar_energy_balance(
+    species: MolecularSpecies, infrared_albedo: float, tolerance: float
+) -> ScalarEnergyBalance:
+    # the solver for one species, infrared albedo, and tolerance, built once and shared by every call that needs it
+    return ScalarEnergyBalance(
+        species=species, infrared_albedo=infrared_albedo, tolerance=tolerance
+    )
+
+
 def converge_energy_balance(
     smi: SublimationModelInput,
     average_projection_factor: float,
@@ -26,9 +181,6 @@ def converge_energy_balance(
     num_iterations_max: int = 100000,
 ) -> SublimationRateIterationResult:
 
-    niter = 0
-    cur_temp_K = t_init_K
-
     # compute the incident solar flux
     incident_solar_flux = (
         solar_flux_1au_erg_per_cm2_per_second
@@ -38,22 +190,19 @@ def converge_energy_balance(
     )
 
     if average_projection_factor > 0:
-        while niter < num_iterations_max:
-            niter += 1
-            srir = energy_balance(
-                smi=smi,
-                incident_solar_flux=incident_solar_flux,
-                t_K=cur_temp_K,
-            )
-            if srir.converged:
-                break
-            cur_temp_K = srir.t_K
-        else:
-            raise RuntimeError("Energy balance iteration did not converge.")
+        z, t_K, _, _ = cached_scalar_energy_balance(
+            species=smi.species,
+            infrared_albedo=float(smi.infrared_albedo),
+            tolerance=float(smi.tolerance),
+        ).converge(
+            incident_solar_flux=float(incident_solar_flux),
+            t_init_K=float(t_init_K),
+            num_iterations_max=num_iterations_max,
+        )
     else:
         return SublimationRateIterationResult(z=0.0, t_K=np.nan, converged=True)
 
-    return srir
+    return SublimationRateIterationResult(z=z, t_K=t_K, converged=True)
 
 
 def energy_balance(
@@ -62,16 +211,241 @@ def energy_balance(
     t_K: float,
 ) -> SublimationRateIterationResult:
     # Calculate temperature and sublimation rate, and whether or not this converged
+    return cached_scalar_energy_balance(
+        species=smi.species,
+        infrared_albedo=float(smi.infrared_albedo),
+        tolerance=float(smi.tolerance),
+    ).step(incident_solar_flux=incident_solar_flux, t_K=t_K)
+
+
+def solve_energy_balance_scalar(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    num_iterations_max: int = 100000,
+    tolerance: float = default_energy_balance_tolerance,
+) -> SublimationRateArrayResult:
+    """
+    solve_energy_balance_array for the clamped Newton iteration, one point at a time with ScalarEnergyBalance, which
+    is quicker for a handful of points and gives the same results.
+    Raises EnergyBalanceConvergenceError, with every point that did not converge, if the budget runs out.
+    """
+
+    incident_solar_flux, infrared_albedo, t_init_K = np.broadcast_arrays(
+        incident_solar_flux, infrared_albedo, t_init_K
+    )
+    out_shape = incident_solar_flux.shape
+
+    flux = incident_solar_flux.astype(np.float64).ravel()
+    z = np.zeros_like(flux)
+    t_K = np.full_like(flux, np.nan)
+    num_iterations = np.zeros(flux.shape, dtype=np.int64)
+    num_clamped_steps = np.zeros(flux.shape, dtype=np.int64)
+
+    sunlit = np.flatnonzero(flux > 0)
+    infrared_albedos = infrared_albedo.astype(np.float64).ravel()[sunlit].tolist()
+    t_init_Ks = t_init_K.astype(np.float64).ravel()[sunlit].tolist()
+
+    # points of the same infrared albedo, which is usually all of them, share one solver
+    not_converged = []
+    for i, point_flux, point_infrared_albedo, point_t_init_K in zip(
+        sunlit.tolist(), flux[sunlit].tolist(), infrared_albedos, t_init_Ks
+    ):
+        solver = cached_scalar_energy_balance(
+            species=species,
+            infrared_albedo=point_infrared_albedo,
+            tolerance=float(tolerance),
+        )
+        try:
+            z[i], t_K[i], num_iterations[i], num_clamped_steps[i] = solver.converge(
+                incident_solar_flux=point_flux,
+                t_init_K=point_t_init_K,
+                num_iterations_max=num_iterations_max,
+            )
+        except EnergyBalanceConvergenceError:
+            not_converged.append(i)
+
+    if not_converged:
+        raise EnergyBalanceConvergenceError(indices=np.array(not_converged))
+
+    return SublimationRateArrayResult(
+        z=z.reshape(out_shape),
+        t_K=t_K.reshape(out_shape),
+        num_iterations=num_iterations.reshape(out_shape),
+        num_clamped_steps=num_clamped_steps.reshape(out_shape),
+    )
 
-    heat_of_sub = heat_of_sublimation(species=smi.species, t_K=t_K)
+
+def incident_solar_flux_array(
+    visual_albedo: float | np.ndarray,
+    rh_au: float | np.ndarray,
+    average_projection_factors: np.ndarray,
+) -> np.ndarray:
+    return (
+        solar_flux_1au_erg_per_cm2_per_second
+        * average_projection_factors
+        * (1.0 - visual_albedo)
+        / rh_au**2
+    )
+
+
+def converge_energy_balance_array(
+    smi: SublimationModelInput,
+    average_projection_factors: np.ndarray,
+    t_init_K: float | np.ndarray,
+    num_iterations_max: int = 100000,
+) -> SublimationRateArrayResult:
+    """
+    Array version of converge_energy_balance: solves the energy balance at every average projection factor at once.
+    """
+
+    incident_solar_flux = incident_solar_flux_array(
+        visual_albedo=smi.visual_albedo,
+        rh_au=smi.rh_au,
+        average_projection_factors=np.asarray(average_projection_factors),
+    )
+
+    return solve_energy_balance_array(
+        species=smi.species,
+        infrared_albedo=smi.infrared_albedo,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+        num_iterations_max=num_iterations_max,
+        solver=smi.solver,
+        tolerance=smi.tolerance,
+    )
+
+
+def solve_energy_balance_array(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    num_iterations_max: int = 100000,
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton,
+    tolerance: float = default_energy_balance_tolerance,
+) -> SublimationRateArrayResult:
+    """
+    Runs the same Newton iteration as converge_energy_balance on every element of incident_solar_flux at once.
+    The arguments are broadcast against each other, and points are dropped from the iteration as they converge.
+    Points with no incident sunlight are not iterated: they have z = 0 and t_K = nan.
+    The other solvers are handed to solve_energy_balance_bracketed, with its own iteration budget.
+    Raises EnergyBalanceConvergenceError, with the points that are still iterating, if the budget runs out.
+    """
+
+    if solver != EnergyBalanceSolver.clamped_newton:
+        return solve_energy_balance_bracketed(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_init_K=t_init_K,
+            solver=solver,
+            tolerance=tolerance,
+            num_iterations_max=min(num_iterations_max, bracketed_num_iterations_max),
+        )
+
+    incident_solar_flux, infrared_albedo, t_init_K = np.broadcast_arrays(
+        incident_solar_flux, infrared_albedo, t_init_K
+    )
+    out_shape = incident_solar_flux.shape
+
+    flux = incident_solar_flux.astype(np.float64).ravel()
+    active = np.flatnonzero(flux > 0)
+    if active.size < scalar_energy_balance_max_points:
+        return solve_energy_balance_scalar(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_init_K=t_init_K,
+            num_iterations_max=num_iterations_max,
+            tolerance=tolerance,
+        )
+
+    z = np.zeros_like(flux)
+    t_K = np.full_like(flux, np.nan)
+    num_iterations = np.zeros(flux.shape, dtype=np.int64)
+    num_clamped_steps = np.zeros(flux.shape, dtype=np.int64)
+
+    # indices of the points that are still iterating, along with their state
+    active_flux = flux[active]
+    active_infrared_albedo = infrared_albedo.astype(np.float64).ravel()[active]
+    active_t_K = t_init_K.astype(np.float64).ravel()[active]
+    active_clamped_steps = np.zeros(active.shape, dtype=np.int64)
+
+    for niter in range(1, num_iterations_max + 1):
+        if active.size == 0:
+            break
+
+        ebr = energy_balance_array(
+            species=species,
+            infrared_albedo=active_infrared_albedo,
+            incident_solar_flux=active_flux,
+            t_K=active_t_K,
+            tolerance=tolerance,
+        )
+
+        # steps of half the Newton step are clamped to 10 K in energy_balance_array
+        active_clamped_steps += (
+            np.abs(ebr.energy_balance_flux / ebr.energy_balance_derivative) > 20
+        )
+
+        done = ebr.converged
+        z[active[done]] = ebr.z[done]
+        t_K[active[done]] = ebr.t_K[done]
+        num_iterations[active[done]] = niter
+        num_clamped_steps[active[done]] = active_clamped_steps[done]
+
+        not_done = ~done
+        active = active[not_done]
+        active_flux = active_flux[not_done]
+        active_infrared_albedo = active_infrared_albedo[not_done]
+        active_t_K = ebr.t_K[not_done]
+        active_clamped_steps = active_clamped_steps[not_done]
+    else:
+        if active.size != 0:
+            raise EnergyBalanceConvergenceError(indices=active)
+
+    return SublimationRateArrayResult(
+        z=z.reshape(out_shape),
+        t_K=t_K.reshape(out_shape),
+        num_iterations=num_iterations.reshape(out_shape),
+        num_clamped_steps=num_clamped_steps.reshape(out_shape),
+    )
+
+
+@dataclass
+class EnergyBalanceArrayResult:
+    # sublimation rate at the temperatures given, molecules per cm^2 per second
+    z: np.ndarray
+    # suggested next temperature to try
+    t_K: np.ndarray
+    # which points satisfy the energy balance
+    converged: np.ndarray
+    # net flux out of the surface at the temperatures given, and its derivative with respect to temperature
+    energy_balance_flux: np.ndarray
+    energy_balance_derivative: np.ndarray
+
+
+def energy_balance_array(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_K: np.ndarray,
+    tolerance: float = default_energy_balance_tolerance,
+) -> EnergyBalanceArrayResult:
+    # Array version of energy_balance: one Newton step at every temperature in t_K
+
+    heat_of_sub = heat_of_sublimation_array(species=species, t_K=t_K)
 
     root = 1 / math.sqrt(heat_of_sub.mass_g * 2 * math.pi * boltzmann_ergs_per_kelvin)
-    root_t = math.sqrt(t_K)
+    root_t = np.sqrt(t_K)
 
+    t_K2 = t_K * t_K
     thermal_radiated_flux = (
-        (1 - smi.infrared_albedo)
+        (1 - infrared_albedo)
         * stefan_boltzmann_sigma_ergs_percm2_per_kelvin4
-        * t_K**4
+        * (t_K2 * t_K2)
     )
 
     evaporation_loss_flux = (
@@ -82,7 +456,9 @@ def energy_balance(
         thermal_radiated_flux + evaporation_loss_flux - incident_solar_flux
     )
 
-    z = max(evaporation_loss_flux / heat_of_sub.latent_heat_of_vaporization, 1e-30)
+    z = np.maximum(
+        evaporation_loss_flux / heat_of_sub.latent_heat_of_vaporization, 1e-30
+    )
 
     # temperature derivative
     radiated_flux_derivative = 4 * thermal_radiated_flux / t_K
@@ -93,16 +469,35 @@ def energy_balance(
     evaporation_flux_derivative = root / root_t * (x1 + x2)
     energy_balance_derivative = radiated_flux_derivative + evaporation_flux_derivative
 
-    dt = math.copysign(
-        min(10, abs(energy_balance_flux / energy_balance_derivative / 2)),
-        energy_balance_flux / energy_balance_derivative,
-    )
-    t_K -= dt
+    newton_step = energy_balance_flux / energy_balance_derivative
+    dt = np.copysign(np.minimum(10, np.abs(newton_step / 2)), newton_step)
 
-    convergence_threshold = 1e-6
+    convergence_threshold = tolerance
     converged = (
-        abs(energy_balance_flux / incident_solar_flux) < convergence_threshold
-        or abs(energy_balance_flux) < convergence_threshold
+        np.abs(energy_balance_flux / incident_solar_flux) < convergence_threshold
+    ) | (np.abs(energy_balance_flux) < convergence_threshold)
+
+    return EnergyBalanceArrayResult(
+        z=z,
+        t_K=t_K - dt,
+        converged=converged,
+        energy_balance_flux=energy_balance_flux,
+        energy_balance_derivative=energy_balance_derivative,
     )
 
-    return SublimationRateIterationResult(z=z, t_K=t_K, converged=converged)
+
+def sublimation_rate_array(species: MolecularSpecies, t_K: np.ndarray) -> np.ndarray:
+    # sublimation rate at the given surface temperatures, computed the same way as in energy_balance_array
+
+    heat_of_sub = heat_of_sublimation_array(species=species, t_K=t_K)
+
+    root = 1 / math.sqrt(heat_of_sub.mass_g * 2 * math.pi * boltzmann_ergs_per_kelvin)
+    root_t = np.sqrt(t_K)
+
+    evaporation_loss_flux = (
+        root / root_t * heat_of_sub.pressure * heat_of_sub.latent_heat_of_vaporization
+    )
+
+    return np.maximum(
+        evaporation_loss_flux / heat_of_sub.latent_heat_of_vaporization, 1e-30
+    )
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SublimationRateArrayResult:
+    # struct-of-arrays version of SublimationRateIterationResult, one entry per surface point
+    # sublimation rate, molecules per cm^2 per second
+    z: np.ndarray
+    # converged surface temperature, or nan where there is no incident sunlight
+    t_K: np.ndarray
+    # number of energy balance iterations taken at each point
+    num_iterations: np.ndarray
+    # number of steps at each point that were cut short of the solver's own step: clamped to 10 K by the clamped
+    # Newton iteration, or replaced by bisection in the bracketing solvers
+    num_clamped_steps: np.ndarray
+
+
+class EnergyBalanceConvergenceError(RuntimeError):
+    """
+    Raised when the energy balance is not solved at some of the points given to a solver.  indices are the flat
+    indices of those points in the solver's arrays, and latitudes_rad their latitudes, once they are known.
+    """
+
+    def __init__(
+        self,
+        indices: np.ndarray,
+        message: str = "Energy balance iteration did not converge.",
+        latitudes_rad: np.ndarray | None = None,
+    ):
+        super().__init__(message)
+        self.indices = np.asarray(indices)
+        self.latitudes_rad = latitudes_rad
+
+    def at(self, indices: np.ndarray) -> "EnergyBalanceConvergenceError":
+        # the same error for a solve on a subset of a larger array, where indices are the flat indices in the larger
+        # array of the points of the subset
+        return EnergyBalanceConvergenceError(
+            indices=np.ravel(indices)[self.indices], message=self.args[0]
+        )
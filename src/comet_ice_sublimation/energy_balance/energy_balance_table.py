@@ -0,0 +1,385 @@
+import functools
+import logging
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.heat_of_sublimation import *
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.physical_constants import *
+
+# For a given species and infrared albedo, the equilibrium temperature depends only on the incident solar flux,
+# so we can solve the energy balance once on a grid of fluxes and interpolate instead of iterating at every point.
+# The table covers these fluxes, in ergs per cm^2 per second: points outside of this range are solved by iteration
+default_table_flux_min = 1.0e-4
+default_table_flux_max = 1.0e9
+
+# The cubic interpolation error peaks a third of the way into an interval, where it can be up to (4/27) / (9/64) ~ 1.05
+# times the error at the nearest quarter point: the errors found at the check points are scaled up by this margin
+table_error_margin = 1.1
+
+
+@dataclass
+class EnergyBalanceTable:
+    species: MolecularSpecies
+    infrared_albedo: float
+
+    # equilibrium temperatures on an evenly spaced grid in log10 of the incident flux
+    log10_fluxes: np.ndarray
+    temps_K: np.ndarray
+    # derivative of temperature with respect to log10 flux at each grid point, for monotone cubic interpolation
+    temps_K_slopes: np.ndarray
+
+    # estimates of the largest interpolation error, from the errors found at the midpoints and quarter points between
+    # grid points compared to solving the energy balance there, scaled by table_error_margin.  These are measured, not
+    # guaranteed: a feature of the solution narrower than a quarter of a grid interval could be missed
+    max_temperature_error_K: float
+    max_relative_z_error: float
+
+
+def build_energy_balance_table(
+    species: MolecularSpecies,
+    infrared_albedo: float,
+    t_init_K: float | None = None,
+    flux_min: float = default_table_flux_min,
+    flux_max: float = default_table_flux_max,
+    rtol: float = 1.0e-6,
+    initial_points_per_decade: int = 8,
+    max_points: int = 2**16,
+) -> EnergyBalanceTable:
+    """
+    Solves the energy balance on a grid of incident fluxes, doubling the density of the grid until interpolating the
+    temperature gives sublimation rates within a relative error of rtol at the midpoints and quarter points between
+    grid points.
+    If max_points is reached first, the table is returned with the error it reached.
+    """
+
+    if t_init_K is None:
+        t_init_K = get_starting_temperature(species)
+
+    log10_flux_min = math.log10(flux_min)
+    log10_flux_max = math.log10(flux_max)
+    num_points = (
+        max(2, math.ceil((log10_flux_max - log10_flux_min) * initial_points_per_decade))
+        + 1
+    )
+
+    log10_fluxes = np.linspace(log10_flux_min, log10_flux_max, num_points)
+    temps_K = _solve_temperatures(
+        species=species,
+        infrared_albedo=infrared_albedo,
+        log10_fluxes=log10_fluxes,
+        t_init_K=t_init_K,
+    )
+
+    while True:
+        slopes = _monotone_slopes(log10_fluxes, temps_K)
+
+        # Check the interpolation against the solution at the quarter points of every interval as well as at the
+        # midpoints: errors in the slopes cancel at the midpoints, and show up most a third of the way in from either end
+        log10_midpoints = (log10_fluxes[1:] + log10_fluxes[:-1]) / 2
+        log10_check_points = np.concatenate(
+            [
+                (log10_fluxes[:-1] + log10_midpoints) / 2,
+                log10_midpoints,
+                (log10_midpoints + log10_fluxes[1:]) / 2,
+            ]
+        )
+        check_temps_K = _solve_temperatures(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            log10_fluxes=log10_check_points,
+            t_init_K=t_init_K,
+        )
+        midpoint_temps_K = check_temps_K[
+            log10_midpoints.size : 2 * log10_midpoints.size
+        ]
+        interpolated_temps_K = _monotone_interpolate(
+            log10_fluxes, temps_K, slopes, log10_check_points
+        )
+
+        max_temperature_error_K = table_error_margin * float(
+            np.max(np.abs(interpolated_temps_K - check_temps_K))
+        )
+        max_relative_z_error = table_error_margin * float(
+            np.max(
+                np.abs(
+                    sublimation_rate_array(species=species, t_K=interpolated_temps_K)
+                    / sublimation_rate_array(species=species, t_K=check_temps_K)
+                    - 1.0
+                )
+            )
+        )
+
+        if max_relative_z_error <= rtol or 2 * log10_fluxes.size - 1 > max_points:
+            break
+
+        # the midpoints are already solved, so they become the new grid points
+        refined_log10_fluxes = np.empty(2 * log10_fluxes.size - 1)
+        refined_log10_fluxes[0::2] = log10_fluxes
+        refined_log10_fluxes[1::2] = log10_midpoints
+        refined_temps_K = np.empty_like(refined_log10_fluxes)
+        refined_temps_K[0::2] = temps_K
+        refined_temps_K[1::2] = midpoint_temps_K
+        log10_fluxes = refined_log10_fluxes
+        temps_K = refined_temps_K
+
+    return EnergyBalanceTable(
+        species=species,
+        infrared_albedo=infrared_albedo,
+        log10_fluxes=log10_fluxes,
+        temps_K=temps_K,
+        temps_K_slopes=slopes,
+        max_temperature_error_K=max_temperature_error_K,
+        max_relative_z_error=max_relative_z_error,
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def get_energy_balance_table(
+    species: MolecularSpecies, infrared_albedo: float
+) -> EnergyBalanceTable:
+    # tables are only built once per species and infrared albedo per process
+    table = build_energy_balance_table(species=species, infrared_albedo=infrared_albedo)
+    logging.info(
+        f"Energy balance table for {species.value} at infrared albedo {infrared_albedo:g}: "
+        f"{table.log10_fluxes.size} fluxes, estimated max relative error of z {table.max_relative_z_error:.2e}"
+        f" and of temperature {table.max_temperature_error_K:.2e} K"
+    )
+    return table
+
+
+def lookup_energy_balance(
+    table: EnergyBalanceTable,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    newton_polish: bool = False,
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton,
+    tolerance: float = default_energy_balance_tolerance,
+) -> SublimationRateArrayResult:
+    """
+    Finds the equilibrium temperature and sublimation rate at each incident flux by interpolating in the table.
+    With newton_polish, a single Newton step is taken from the interpolated temperature, using the derivative of the
+    energy balance implied by the table, which roughly squares the relative error of the table.
+    Fluxes outside of the table are solved by iterating from t_init_K with the given solver and tolerance, and points
+    with no incident sunlight have z = 0 and t_K = nan.
+    """
+
+    incident_solar_flux = np.asarray(incident_solar_flux, dtype=np.float64)
+    t_K = np.full_like(incident_solar_flux, np.nan)
+    z = np.zeros_like(incident_solar_flux)
+    num_iterations = np.zeros(incident_solar_flux.shape, dtype=np.int64)
+    num_clamped_steps = np.zeros(incident_solar_flux.shape, dtype=np.int64)
+
+    lit = incident_solar_flux > 0
+    log10_flux = np.full_like(incident_solar_flux, -np.inf)
+    log10_flux[lit] = np.log10(incident_solar_flux[lit])
+
+    in_table = (log10_flux >= table.log10_fluxes[0]) & (
+        log10_flux <= table.log10_fluxes[-1]
+    )
+    t_K[in_table] = _monotone_interpolate(
+        table.log10_fluxes, table.temps_K, table.temps_K_slopes, log10_flux[in_table]
+    )
+
+    if newton_polish:
+        flux = incident_solar_flux[in_table]
+        ebr = energy_balance_array(
+            species=table.species,
+            infrared_albedo=table.infrared_albedo,
+            incident_solar_flux=flux,
+            t_K=t_K[in_table],
+        )
+        # The outgoing flux balances the incident flux along the table, so its derivative with respect to temperature
+        # is flux * ln(10) / (dT / dlog10(flux)).  The derivative from energy_balance_array is not used here because
+        # it approximates the derivative of the vapor pressure, which is why the iteration only takes half steps
+        dt_dlog10_flux = _monotone_interpolate_derivative(
+            table.log10_fluxes,
+            table.temps_K,
+            table.temps_K_slopes,
+            log10_flux[in_table],
+        )
+        t_K[in_table] -= (
+            ebr.energy_balance_flux * dt_dlog10_flux / (flux * math.log(10.0))
+        )
+        num_iterations[in_table] = 1
+
+    z[in_table] = sublimation_rate_array(species=table.species, t_K=t_K[in_table])
+
+    outside_table = lit & ~in_table
+    if np.any(outside_table):
+        try:
+            sublimation_results = solve_energy_balance_array(
+                species=table.species,
+                infrared_albedo=table.infrared_albedo,
+                incident_solar_flux=incident_solar_flux[outside_table],
+                t_init_K=np.broadcast_to(t_init_K, incident_solar_flux.shape)[
+                    outside_table
+                ],
+                solver=solver,
+                tolerance=tolerance,
+            )
+        except EnergyBalanceConvergenceError as e:
+            raise e.at(np.flatnonzero(outside_table)) from e
+        z[outside_table] = sublimation_results.z
+        t_K[outside_table] = sublimation_results.t_K
+        num_iterations[outside_table] = sublimation_results.num_iterations
+        num_clamped_steps[outside_table] = sublimation_results.num_clamped_steps
+
+    return SublimationRateArrayResult(
+        z=z,
+        t_K=t_K,
+        num_iterations=num_iterations,
+        num_clamped_steps=num_clamped_steps,
+    )
+
+
+def solve_energy_balance_tabulated(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    newton_polish: bool = False,
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton,
+    tolerance: float = default_energy_balance_tolerance,
+) -> SublimationRateArrayResult:
+    """
+    Table lookup counterpart to solve_energy_balance_array, using one table per distinct infrared albedo.
+    """
+
+    incident_solar_flux, infrared_albedos, t_init_Ks = np.broadcast_arrays(
+        incident_solar_flux, infrared_albedo, t_init_K
+    )
+
+    z = np.empty(incident_solar_flux.shape)
+    t_K = np.empty(incident_solar_flux.shape)
+    num_iterations = np.empty(incident_solar_flux.shape, dtype=np.int64)
+    num_clamped_steps = np.empty(incident_solar_flux.shape, dtype=np.int64)
+    for a_ir in np.unique(infrared_albedos):
+        mask = infrared_albedos == a_ir
+        try:
+            sublimation_results = lookup_energy_balance(
+                table=get_energy_balance_table(
+                    species=species, infrared_albedo=float(a_ir)
+                ),
+                incident_solar_flux=incident_solar_flux[mask],
+                t_init_K=t_init_Ks[mask],
+                newton_polish=newton_polish,
+                solver=solver,
+                tolerance=tolerance,
+            )
+        except EnergyBalanceConvergenceError as e:
+            raise e.at(np.flatnonzero(mask)) from e
+        z[mask] = sublimation_results.z
+        t_K[mask] = sublimation_results.t_K
+        num_iterations[mask] = sublimation_results.num_iterations
+        num_clamped_steps[mask] = sublimation_results.num_clamped_steps
+
+    return SublimationRateArrayResult(
+        z=z,
+        t_K=t_K,
+        num_iterations=num_iterations,
+        num_clamped_steps=num_clamped_steps,
+    )
+
+
+def _solve_temperatures(
+    species: MolecularSpecies,
+    infrared_albedo: float,
+    log10_fluxes: np.ndarray,
+    t_init_K: float,
+    polishing_tolerance: float = 1.0e-12,
+    num_polishing_steps_max: int = 200,
+) -> np.ndarray:
+    incident_solar_flux = 10.0**log10_fluxes
+    t_K = solve_energy_balance_array(
+        species=species,
+        infrared_albedo=infrared_albedo,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+    ).t_K
+
+    # The iteration stops once the energy balance holds to a relative tolerance of 1e-6, which would leave noise in the
+    # table at about that level, so we keep taking the same steps until the balance holds much more tightly
+    for _ in range(num_polishing_steps_max):
+        ebr = energy_balance_array(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_K=t_K,
+        )
+        t_K = ebr.t_K
+        if np.all(
+            np.abs(ebr.energy_balance_flux / incident_solar_flux) < polishing_tolerance
+        ):
+            break
+
+    return t_K
+
+
+def _monotone_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Fritsch-Carlson slopes for piecewise cubic hermite interpolation: the interpolant is monotone wherever the data are
+    h = np.diff(x)
+    delta = np.diff(y) / h
+
+    slopes = np.zeros_like(y)
+
+    # interior points: weighted harmonic mean of the neighboring secants, or zero at a local extremum
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    same_sign = delta[:-1] * delta[1:] > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+    # end points: one-sided three point estimate, limited to keep the end intervals monotone
+    slopes[0] = _monotone_end_slope(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = _monotone_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+
+    return slopes
+
+
+def _monotone_end_slope(h0: float, h1: float, delta0: float, delta1: float) -> float:
+    d = ((2 * h0 + h1) * delta0 - h0 * delta1) / (h0 + h1)
+    if np.sign(d) != np.sign(delta0):
+        return 0.0
+    elif np.sign(delta0) != np.sign(delta1) and abs(d) > abs(3 * delta0):
+        return 3 * delta0
+    return d
+
+
+def _monotone_interpolate(
+    x: np.ndarray, y: np.ndarray, slopes: np.ndarray, x_new: np.ndarray
+) -> np.ndarray:
+    # cubic hermite interpolation on the interval holding each point of x_new
+    i = np.clip(np.searchsorted(x, x_new, side="right") - 1, 0, x.size - 2)
+    h = x[i + 1] - x[i]
+    s = (x_new - x[i]) / h
+
+    s2 = s * s
+    s3 = s2 * s
+    h00 = 2 * s3 - 3 * s2 + 1
+    h10 = s3 - 2 * s2 + s
+    h01 = -2 * s3 + 3 * s2
+    h11 = s3 - s2
+
+    return h00 * y[i] + h10 * h * slopes[i] + h01 * y[i + 1] + h11 * h * slopes[i + 1]
+
+
+def _monotone_interpolate_derivative(
+    x: np.ndarray, y: np.ndarray, slopes: np.ndarray, x_new: np.ndarray
+) -> np.ndarray:
+    # derivative of the cubic hermite interpolation with respect to x
+    i = np.clip(np.searchsorted(x, x_new, side="right") - 1, 0, x.size - 2)
+    h = x[i + 1] - x[i]
+    s = (x_new - x[i]) / h
+
+    s2 = s * s
+    dh00 = 6 * s2 - 6 * s
+    dh10 = 3 * s2 - 4 * s + 1
+    dh01 = -6 * s2 + 6 * s
+    dh11 = 3 * s2 - 2 * s
+
+    return (dh00 * y[i] + dh01 * y[i + 1]) / h + dh10 * slopes[i] + dh11 * slopes[i + 1]
@@ -0,0 +1,457 @@
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+from comet_ice_sublimation.heat_of_sublimation import *
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.physical_constants import *
+
+from .energy_balance_result import *
+
+# The net flux out of the surface rises with temperature from -incident_solar_flux at 0 K, and is positive at the
+# radiative equilibrium temperature, so the solution is bracketed by these two.  The bracket is also kept below where
+# the fits for each species stop increasing: the latent heats of the CO2 and H2O-CH4 fits turn negative above these,
+# and the CO fit drops to much lower pressures above 61.544 K.  The net flux at these temperatures is above 1e11
+# erg/cm^2/s even with no thermal radiation, far above the solar flux anywhere a comet gets to
+_bracket_maximum_temperatures_K = {
+    MolecularSpecies.h2o: 1000.0,
+    MolecularSpecies.h2o_ch4: 400.0,
+    MolecularSpecies.co2: 300.0,
+    MolecularSpecies.co: 61.544,
+}
+
+# the bracketing solvers stop when the bracket shrinks below this fraction of the temperature,
+# even if the net flux has not yet reached the tolerance
+bracket_relative_width_min = 4 * np.finfo(np.float64).eps
+
+# each step of the bracketing solvers at least halves the bracket every few function evaluations,
+# so they don't need anything close to the budget of the clamped Newton iteration
+bracketed_num_iterations_max = 200
+
+
+@dataclass
+class EnergyBalanceResidualArrayResult:
+    # sublimation rate at the temperatures given, molecules per cm^2 per second
+    z: np.ndarray
+    # net flux out of the surface at the temperatures given, and its derivative with respect to temperature
+    energy_balance_flux: np.ndarray
+    energy_balance_derivative: np.ndarray
+    # derivative of z with respect to temperature
+    z_derivative: np.ndarray
+
+
+def energy_balance_residual_array(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_K: np.ndarray,
+) -> EnergyBalanceResidualArrayResult:
+    """
+    The net flux out of the surface, as in energy_balance_array, along with its exact derivative with respect to
+    temperature.  The pressure_prime of the heat of sublimation fits is the derivative of log10 of the pressure,
+    times the pressure, so it is multiplied by ln(10) here; the temperature dependence of the molecular speed is
+    also included.
+    """
+
+    heat_of_sub = heat_of_sublimation_array(species=species, t_K=t_K)
+
+    root = 1 / math.sqrt(heat_of_sub.mass_g * 2 * math.pi * boltzmann_ergs_per_kelvin)
+    root_t = np.sqrt(t_K)
+
+    thermal_radiated_flux = (
+        (1 - infrared_albedo) * stefan_boltzmann_sigma_ergs_percm2_per_kelvin4 * t_K**4
+    )
+
+    evaporation_loss_flux = (
+        root / root_t * heat_of_sub.pressure * heat_of_sub.latent_heat_of_vaporization
+    )
+
+    energy_balance_flux = (
+        thermal_radiated_flux + evaporation_loss_flux - incident_solar_flux
+    )
+
+    z = np.maximum(
+        evaporation_loss_flux / heat_of_sub.latent_heat_of_vaporization, 1e-30
+    )
+
+    radiated_flux_derivative = 4 * thermal_radiated_flux / t_K
+
+    pressure_derivative = math.log(10) * heat_of_sub.pressure_prime
+    x1 = pressure_derivative * heat_of_sub.latent_heat_of_vaporization
+    x2 = heat_of_sub.pressure * heat_of_sub.latent_heat_of_vaporization_prime
+
+    evaporation_flux_derivative = root / root_t * (x1 + x2) - evaporation_loss_flux / (
+        2 * t_K
+    )
+    z_derivative = root / root_t * pressure_derivative - z / (2 * t_K)
+
+    return EnergyBalanceResidualArrayResult(
+        z=z,
+        energy_balance_flux=energy_balance_flux,
+        energy_balance_derivative=radiated_flux_derivative
+        + evaporation_flux_derivative,
+        z_derivative=z_derivative,
+    )
+
+
+def energy_balance_converged(
+    energy_balance_flux: np.ndarray,
+    incident_solar_flux: np.ndarray,
+    tolerance: float,
+) -> np.ndarray:
+    # the same test as energy_balance_array: small net flux relative to the incident flux, or in absolute terms
+    return (np.abs(energy_balance_flux / incident_solar_flux) < tolerance) | (
+        np.abs(energy_balance_flux) < tolerance
+    )
+
+
+def energy_balance_bracket_K(
+    species: MolecularSpecies,
+    infrared_albedo: np.ndarray,
+    incident_solar_flux: np.ndarray,
+) -> np.ndarray:
+    # upper end of the bracket around the solution: the radiative equilibrium temperature, capped for the species
+    with np.errstate(divide="ignore"):
+        radiative_equilibrium_K = (
+            incident_solar_flux
+            / ((1 - infrared_albedo) * stefan_boltzmann_sigma_ergs_percm2_per_kelvin4)
+        ) ** 0.25
+    return np.minimum(radiative_equilibrium_K, _bracket_maximum_temperatures_K[species])
+
+
+def solve_energy_balance_bracketed(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+    solver: EnergyBalanceSolver,
+    tolerance: float = default_energy_balance_tolerance,
+    num_iterations_max: int = bracketed_num_iterations_max,
+) -> SublimationRateArrayResult:
+    """
+    Solves the energy balance at every element of incident_solar_flux with one of the bracketing solvers,
+    starting from t_init_K.  The arguments are broadcast against each other.
+    Unlike the clamped Newton iteration, z and t_K are both taken at the last temperature evaluated, and
+    num_iterations counts the evaluations of the energy balance, including those needed to set up the bracket, and
+    num_clamped_steps the steps that fell back to bisection.
+    Points with no incident sunlight are not iterated: they have z = 0 and t_K = nan.
+    """
+
+    incident_solar_flux, infrared_albedo, t_init_K = np.broadcast_arrays(
+        incident_solar_flux, infrared_albedo, t_init_K
+    )
+    out_shape = incident_solar_flux.shape
+
+    flux = incident_solar_flux.astype(np.float64).ravel()
+    z = np.zeros_like(flux)
+    t_K = np.full_like(flux, np.nan)
+    num_iterations = np.zeros(flux.shape, dtype=np.int64)
+    num_clamped_steps = np.zeros(flux.shape, dtype=np.int64)
+
+    active = np.flatnonzero(flux > 0)
+    active_infrared_albedo = infrared_albedo.astype(np.float64).ravel()[active]
+    active_flux = flux[active]
+    hi_K = energy_balance_bracket_K(
+        species=species,
+        infrared_albedo=active_infrared_albedo,
+        incident_solar_flux=active_flux,
+    )
+    start_K = np.minimum(t_init_K.astype(np.float64).ravel()[active], hi_K)
+
+    if solver == EnergyBalanceSolver.newton_bisection:
+        _newton_bisection(
+            species=species,
+            active=active,
+            infrared_albedo=active_infrared_albedo,
+            incident_solar_flux=active_flux,
+            start_K=start_K,
+            hi_K=hi_K,
+            tolerance=tolerance,
+            num_iterations_max=num_iterations_max,
+            z=z,
+            t_K=t_K,
+            num_iterations=num_iterations,
+            num_clamped_steps=num_clamped_steps,
+        )
+    elif solver == EnergyBalanceSolver.brent:
+        _brent(
+            species=species,
+            active=active,
+            infrared_albedo=active_infrared_albedo,
+            incident_solar_flux=active_flux,
+            start_K=start_K,
+            hi_K=hi_K,
+            tolerance=tolerance,
+            num_iterations_max=num_iterations_max,
+            z=z,
+            t_K=t_K,
+            num_iterations=num_iterations,
+            num_clamped_steps=num_clamped_steps,
+        )
+    else:
+        raise ValueError(f"{solver} is not a bracketing solver")
+
+    return SublimationRateArrayResult(
+        z=z.reshape(out_shape),
+        t_K=t_K.reshape(out_shape),
+        num_iterations=num_iterations.reshape(out_shape),
+        num_clamped_steps=num_clamped_steps.reshape(out_shape),
+    )
+
+
+def _newton_bisection(
+    species: MolecularSpecies,
+    active: np.ndarray,
+    infrared_albedo: np.ndarray,
+    incident_solar_flux: np.ndarray,
+    start_K: np.ndarray,
+    hi_K: np.ndarray,
+    tolerance: float,
+    num_iterations_max: int,
+    z: np.ndarray,
+    t_K: np.ndarray,
+    num_iterations: np.ndarray,
+    num_clamped_steps: np.ndarray,
+) -> None:
+    # the net flux is negative at the lower end of the bracket and positive at the upper end;
+    # the lower end starts at 0 K, where the net flux is known without evaluating it
+    lo_K = np.zeros_like(hi_K)
+    cur_K = start_K
+    bisections = np.zeros(active.shape, dtype=np.int64)
+
+    for niter in range(1, num_iterations_max + 1):
+        if active.size == 0:
+            return
+
+        ebr = energy_balance_residual_array(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_K=cur_K,
+        )
+
+        lo_K = np.where(ebr.energy_balance_flux < 0, cur_K, lo_K)
+        hi_K = np.where(ebr.energy_balance_flux > 0, cur_K, hi_K)
+
+        done = energy_balance_converged(
+            ebr.energy_balance_flux, incident_solar_flux, tolerance
+        ) | (hi_K - lo_K <= bracket_relative_width_min * cur_K)
+        z[active[done]] = ebr.z[done]
+        t_K[active[done]] = cur_K[done]
+        num_iterations[active[done]] = niter
+        num_clamped_steps[active[done]] = bisections[done]
+
+        # Newton step on log(outgoing flux) - log(incident flux), which is much closer to linear in temperature
+        # than the net flux is when sublimation takes over
+        outgoing_flux = ebr.energy_balance_flux + incident_solar_flux
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton_K = (
+                cur_K
+                - np.log(outgoing_flux / incident_solar_flux)
+                * outgoing_flux
+                / ebr.energy_balance_derivative
+            )
+        inside = np.isfinite(newton_K) & (newton_K > lo_K) & (newton_K < hi_K)
+        next_K = np.where(inside, newton_K, 0.5 * (lo_K + hi_K))
+        bisections += ~inside
+
+        not_done = ~done
+        active = active[not_done]
+        infrared_albedo = infrared_albedo[not_done]
+        incident_solar_flux = incident_solar_flux[not_done]
+        lo_K = lo_K[not_done]
+        hi_K = hi_K[not_done]
+        cur_K = next_K[not_done]
+        bisections = bisections[not_done]
+
+    if active.size != 0:
+        raise EnergyBalanceConvergenceError(indices=active)
+
+
+def _brent(
+    species: MolecularSpecies,
+    active: np.ndarray,
+    infrared_albedo: np.ndarray,
+    incident_solar_flux: np.ndarray,
+    start_K: np.ndarray,
+    hi_K: np.ndarray,
+    tolerance: float,
+    num_iterations_max: int,
+    z: np.ndarray,
+    t_K: np.ndarray,
+    num_iterations: np.ndarray,
+    num_clamped_steps: np.ndarray,
+) -> None:
+    # Brent's method as in scipy.optimize.brentq, run on every point at once, on log(outgoing flux) -
+    # log(incident flux) as in _newton_bisection.  The bracket is set up from the starting temperature: if the net
+    # flux there is positive, the other end is 0 K, where the outgoing flux is zero, and otherwise it is the upper
+    # end of the bracket, which takes one more evaluation
+
+    start = energy_balance_residual_array(
+        species=species,
+        infrared_albedo=infrared_albedo,
+        incident_solar_flux=incident_solar_flux,
+        t_K=start_K,
+    )
+
+    # a starting temperature that already solves the energy balance is taken as it is
+    done = energy_balance_converged(
+        start.energy_balance_flux, incident_solar_flux, tolerance
+    )
+    z[active[done]] = start.z[done]
+    t_K[active[done]] = start_K[done]
+    num_iterations[active[done]] = 1
+
+    not_done = ~done
+    active = active[not_done]
+    infrared_albedo = infrared_albedo[not_done]
+    incident_solar_flux = incident_solar_flux[not_done]
+    start_K = start_K[not_done]
+    hi_K = hi_K[not_done]
+    f_start = _log_flux_ratio(start.energy_balance_flux[not_done], incident_solar_flux)
+    z_start = start.z[not_done]
+    evaluations = np.ones(active.shape, dtype=np.int64)
+
+    above = f_start > 0
+    x_pre = np.where(above, 0.0, start_K)
+    f_pre = np.where(above, -np.inf, f_start)
+    z_pre = np.where(above, 0.0, z_start)
+    x_cur = np.where(above, start_K, hi_K)
+    f_cur = f_start.copy()
+    z_cur = z_start.copy()
+
+    below = np.flatnonzero(~above)
+    if below.size != 0:
+        upper = energy_balance_residual_array(
+            species=species,
+            infrared_albedo=infrared_albedo[below],
+            incident_solar_flux=incident_solar_flux[below],
+            t_K=hi_K[below],
+        )
+        # rounding can leave the net flux a little below zero at the radiative equilibrium temperature,
+        # when there is no sublimation there
+        unbracketed = (upper.energy_balance_flux < 0) & ~energy_balance_converged(
+            upper.energy_balance_flux, incident_solar_flux[below], tolerance
+        )
+        if np.any(unbracketed):
+            raise EnergyBalanceConvergenceError(
+                indices=active[below[unbracketed]],
+                message="Energy balance solution could not be bracketed.",
+            )
+        f_cur[below] = _log_flux_ratio(
+            upper.energy_balance_flux, incident_solar_flux[below]
+        )
+        z_cur[below] = upper.z
+        evaluations[below] += 1
+
+    x_blk = np.zeros_like(x_cur)
+    f_blk = np.zeros_like(x_cur)
+    z_blk = np.zeros_like(x_cur)
+    s_pre = np.zeros_like(x_cur)
+    s_cur = np.zeros_like(x_cur)
+    bisections = np.zeros(active.shape, dtype=np.int64)
+
+    while active.size != 0:
+        if np.any(evaluations > num_iterations_max):
+            raise EnergyBalanceConvergenceError(
+                indices=active[evaluations > num_iterations_max]
+            )
+
+        # keep the bracket [x_cur, x_blk] around the solution, with x_cur the better of its two ends
+        sign_change = f_pre * f_cur < 0
+        x_blk = np.where(sign_change, x_pre, x_blk)
+        f_blk = np.where(sign_change, f_pre, f_blk)
+        z_blk = np.where(sign_change, z_pre, z_blk)
+        s_pre = np.where(sign_change, x_cur - x_pre, s_pre)
+        s_cur = np.where(sign_change, x_cur - x_pre, s_cur)
+
+        swap = np.abs(f_blk) < np.abs(f_cur)
+        x_pre, x_cur, x_blk = (
+            np.where(swap, x_cur, x_pre),
+            np.where(swap, x_blk, x_cur),
+            np.where(swap, x_cur, x_blk),
+        )
+        f_pre, f_cur, f_blk = (
+            np.where(swap, f_cur, f_pre),
+            np.where(swap, f_blk, f_cur),
+            np.where(swap, f_cur, f_blk),
+        )
+        z_pre, z_cur, z_blk = (
+            np.where(swap, z_cur, z_pre),
+            np.where(swap, z_blk, z_cur),
+            np.where(swap, z_cur, z_blk),
+        )
+
+        delta = bracket_relative_width_min * np.abs(x_cur) / 2
+        s_bis = (x_blk - x_cur) / 2
+
+        done = energy_balance_converged(
+            incident_solar_flux * np.expm1(f_cur), incident_solar_flux, tolerance
+        ) | (np.abs(s_bis) < delta)
+        z[active[done]] = z_cur[done]
+        t_K[active[done]] = x_cur[done]
+        num_iterations[active[done]] = evaluations[done]
+        num_clamped_steps[active[done]] = bisections[done]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # secant step when only two distinct points are known, inverse quadratic interpolation otherwise
+            s_secant = -f_cur * (x_cur - x_pre) / (f_cur - f_pre)
+            d_pre = (f_pre - f_cur) / (x_pre - x_cur)
+            d_blk = (f_blk - f_cur) / (x_blk - x_cur)
+            s_interpolate = (
+                -f_cur
+                * (f_blk * d_blk - f_pre * d_pre)
+                / (d_blk * d_pre * (f_blk - f_pre))
+            )
+            s_try = np.where(x_pre == x_blk, s_secant, s_interpolate)
+
+        interpolate = (
+            (np.abs(s_pre) > delta)
+            & np.isfinite(f_pre)
+            & np.isfinite(f_blk)
+            & (np.abs(f_cur) < np.abs(f_pre))
+            & np.isfinite(s_try)
+            & (2 * np.abs(s_try) < np.minimum(np.abs(s_pre), 3 * np.abs(s_bis) - delta))
+        )
+        s_pre = np.where(interpolate, s_cur, s_bis)
+        s_cur = np.where(interpolate, s_try, s_bis)
+        bisections += ~interpolate
+
+        x_pre = x_cur
+        f_pre = f_cur
+        z_pre = z_cur
+        x_cur = x_cur + np.where(
+            np.abs(s_cur) > delta, s_cur, np.copysign(delta, s_bis)
+        )
+
+        not_done = ~done
+        active = active[not_done]
+        infrared_albedo = infrared_albedo[not_done]
+        incident_solar_flux = incident_solar_flux[not_done]
+        evaluations = evaluations[not_done] + 1
+        x_pre, f_pre, z_pre = x_pre[not_done], f_pre[not_done], z_pre[not_done]
+        x_blk, f_blk, z_blk = x_blk[not_done], f_blk[not_done], z_blk[not_done]
+        s_pre, s_cur = s_pre[not_done], s_cur[not_done]
+        x_cur = x_cur[not_done]
+        bisections = bisections[not_done]
+
+        if active.size == 0:
+            return
+
+        ebr = energy_balance_residual_array(
+            species=species,
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_K=x_cur,
+        )
+        f_cur = _log_flux_ratio(ebr.energy_balance_flux, incident_solar_flux)
+        z_cur = ebr.z
+
+
+def _log_flux_ratio(
+    energy_balance_flux: np.ndarray, incident_solar_flux: np.ndarray
+) -> np.ndarray:
+    # log of the outgoing flux over the incident flux, which is zero at the solution
+    with np.errstate(divide="ignore"):
+        return np.log1p(energy_balance_flux / incident_solar_flux)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.physical_constants import *
+
+from .root_finding import *
+
+
+def sublimation_rate_sensitivities(
+    species: MolecularSpecies,
+    visual_albedo: float,
+    infrared_albedo: float,
+    rh_au: float,
+    incident_solar_flux: np.ndarray,
+    incident_solar_flux_sub_solar_latitude_derivative: np.ndarray,
+    t_K: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Derivatives of the sublimation rate at temperatures t_K that solve the energy balance, with respect to the visual
+    and infrared albedos, the heliocentric distance, and the sub-solar latitude, keyed by the names of those fields of
+    SublimationModelInput.  The net flux F(T, p) is zero at the solution for every value of a parameter p, so by the
+    implicit function theorem dT/dp = -(dF/dp) / (dF/dT), and dz/dp = dz/dT dT/dp, with both derivatives with respect
+    to temperature taken exactly from energy_balance_residual_array.  Points with no sunlight have derivatives of 0.
+    """
+
+    sensitivities = {
+        name: np.zeros(np.shape(incident_solar_flux))
+        for name in ("visual_albedo", "infrared_albedo", "rh_au", "sub_solar_latitude")
+    }
+    lit = incident_solar_flux > 0
+    if not np.any(lit):
+        return sensitivities
+
+    flux = incident_solar_flux[lit]
+    t_K = t_K[lit]
+    ebr = energy_balance_residual_array(
+        species=species,
+        infrared_albedo=infrared_albedo,
+        incident_solar_flux=flux,
+        t_K=t_K,
+    )
+    # dz/dT / dF/dT, so that dz/dp = -dF/dp times this
+    z_per_net_flux = ebr.z_derivative / ebr.energy_balance_derivative
+
+    # the incident flux goes as (1 - visual_albedo) / rh_au^2, and the radiated flux as (1 - infrared_albedo)
+    net_flux_derivatives = {
+        "visual_albedo": flux / (1.0 - visual_albedo),
+        "infrared_albedo": -stefan_boltzmann_sigma_ergs_percm2_per_kelvin4 * t_K**4,
+        "rh_au": 2.0 * flux / rh_au,
+        "sub_solar_latitude": -incident_solar_flux_sub_solar_latitude_derivative[lit],
+    }
+    for name, net_flux_derivative in net_flux_derivatives.items():
+        sensitivities[name][lit] = -net_flux_derivative * z_per_net_flux
+    return sensitivities
@@ -0,0 +1,88 @@
+from collections.abc import Callable
+
+import numpy as np
+
+from .energy_balance_result import *
+
+
+def solve_unique_energy_balance_problems(
+    solve: Callable[..., SublimationRateArrayResult],
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+) -> tuple[SublimationRateArrayResult, np.ndarray]:
+    """
+    Calls solve(infrared_albedo=..., incident_solar_flux=..., t_init_K=...) on the distinct problems among the
+    sunlit points only, and gives every point the solution of its problem.  Points with the same infrared albedo,
+    incident flux, and initial temperature have the same solution, and solve_energy_balance_array gives the same
+    bits whether the fewer points left send it down its scalar path or not, so solving each problem once changes
+    nothing but the time taken for that solver; a solve without that parity may differ in the last bit.
+    Also returns the flat indices of the points that were solved, the first point of each distinct problem, so that
+    callers can see how much was saved.  Points with no sunlight are never solved, and are not among them.
+    """
+
+    incident_solar_flux, infrared_albedo, t_init_K = np.broadcast_arrays(
+        incident_solar_flux, infrared_albedo, t_init_K
+    )
+    out_shape = incident_solar_flux.shape
+
+    flux = incident_solar_flux.astype(np.float64).ravel()
+    lit = np.flatnonzero(flux > 0)
+    infrared_albedos = infrared_albedo.astype(np.float64).ravel()[lit]
+    t_init_Ks = t_init_K.astype(np.float64).ravel()[lit]
+
+    # the albedo and starting temperature are almost always the same everywhere, and then the flux alone tells the
+    # problems apart, which is much quicker to sort
+    if np.all(infrared_albedos == infrared_albedos[:1]) and np.all(
+        t_init_Ks == t_init_Ks[:1]
+    ):
+        _, first, inverse = np.unique(flux[lit], return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(
+            np.stack([flux[lit], infrared_albedos, t_init_Ks], axis=1),
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+    inverse = inverse.ravel()
+
+    if first.size == lit.size:
+        return (
+            solve(
+                infrared_albedo=infrared_albedo,
+                incident_solar_flux=incident_solar_flux,
+                t_init_K=t_init_K,
+            ),
+            lit,
+        )
+
+    try:
+        unique_results = solve(
+            infrared_albedo=infrared_albedos[first],
+            incident_solar_flux=flux[lit[first]],
+            t_init_K=t_init_Ks[first],
+        )
+    except EnergyBalanceConvergenceError as e:
+        # every point of a problem that failed failed with it
+        raise EnergyBalanceConvergenceError(
+            indices=lit[np.isin(inverse, e.indices)], message=e.args[0]
+        ) from e
+
+    z = np.zeros_like(flux)
+    t_K = np.full_like(flux, np.nan)
+    num_iterations = np.zeros(flux.shape, dtype=np.int64)
+    z[lit] = unique_results.z[inverse]
+    t_K[lit] = unique_results.t_K[inverse]
+    num_iterations[lit] = unique_results.num_iterations[inverse]
+    num_clamped_steps = np.zeros(flux.shape, dtype=np.int64)
+    num_clamped_steps[lit] = unique_results.num_clamped_steps[inverse]
+
+    return (
+        SublimationRateArrayResult(
+            z=z.reshape(out_shape),
+            t_K=t_K.reshape(out_shape),
+            num_iterations=num_iterations.reshape(out_shape),
+            num_clamped_steps=num_clamped_steps.reshape(out_shape),
+        ),
+        np.sort(lit[first]),
+    )
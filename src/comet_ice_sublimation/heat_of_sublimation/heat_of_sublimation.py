@@ -1,18 +1,60 @@
+from collections.abc import Callable
+
+import numpy as np
+
 from .heat_of_sublimation_water import *
 from .heat_of_sublimation_water_methane import *
 from .heat_of_sublimation_carbon_dioxide import *
 from .heat_of_sublimation_carbon_monoxide import *
 from ..molecular_species import *
 
+# mass of the molecule in grams, and the function giving the rest of its HeatOfSublimationResult as a tuple, for each
+# species
+_heat_of_sublimation_terms = {
+    MolecularSpecies.h2o: (water_molecule_mass_g, heat_of_sublimation_water_terms),
+    MolecularSpecies.h2o_ch4: (
+        water_methane_molecule_mass_g,
+        heat_of_sublimation_water_methane_terms,
+    ),
+    MolecularSpecies.co2: (
+        carbon_dioxide_molecule_mass_g,
+        heat_of_sublimation_carbon_dioxide_terms,
+    ),
+    MolecularSpecies.co: (
+        carbon_monoxide_molecule_mass_g,
+        heat_of_sublimation_carbon_monoxide_terms,
+    ),
+}
+
 
 def heat_of_sublimation(
     species: MolecularSpecies, t_K: float
 ) -> HeatOfSublimationResult:
+    mass_g, terms = _heat_of_sublimation_terms[species]
+    return HeatOfSublimationResult(mass_g, *terms(t_K))
+
+
+def heat_of_sublimation_terms(
+    species: MolecularSpecies,
+) -> tuple[float, Callable[[float], tuple[float, float, float, float]]]:
+    """
+    Looks up the mass of a molecule of the species, in grams, and the function that gives its latent heat of
+    sublimation, the derivative of that, its vapor pressure, and the derivative of that at a temperature, as a
+    tuple in that order.  Loops over many temperatures look these up once, and so don't build a
+    HeatOfSublimationResult for every temperature or dispatch on the species each time.
+    """
+
+    return _heat_of_sublimation_terms[species]
+
+
+def heat_of_sublimation_array(
+    species: MolecularSpecies, t_K: np.ndarray
+) -> HeatOfSublimationArrayResult:
     if species == MolecularSpecies.h2o:
-        return heat_of_sublimation_water(t_K=t_K)
+        return heat_of_sublimation_water_array(t_K=t_K)
     elif species == MolecularSpecies.h2o_ch4:
-        return heat_of_sublimation_water_methane(t_K=t_K)
+        return heat_of_sublimation_water_methane_array(t_K=t_K)
     elif species == MolecularSpecies.co2:
-        return heat_of_sublimation_carbon_dioxide(t_K=t_K)
+        return heat_of_sublimation_carbon_dioxide_array(t_K=t_K)
     elif species == MolecularSpecies.co:
-        return heat_of_sublimation_carbon_monoxide(t_K=t_K)
+        return heat_of_sublimation_carbon_monoxide_array(t_K=t_K)
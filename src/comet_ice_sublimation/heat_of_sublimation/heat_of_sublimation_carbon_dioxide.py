@@ -1,19 +1,34 @@
-import itertools
 import logging
-import operator
+
+import numpy as np
 
 from .heat_of_sublimation_result import *
+from .pow10 import *
 from ..physical_constants import *
 
+# atomic mass units to grams
+carbon_dioxide_molecule_mass_g = 44.0 * amu_to_grams
+
 
 # "Vaporization of Comet Nuclei: Light Curves and Life Times", Cowan & A'Hearn, 1979
 # DOI: 10.1007/BF00897085
 def heat_of_sublimation_carbon_dioxide(t_K: float) -> HeatOfSublimationResult:
+    return HeatOfSublimationResult(
+        carbon_dioxide_molecule_mass_g, *heat_of_sublimation_carbon_dioxide_terms(t_K)
+    )
+
+
+def heat_of_sublimation_carbon_dioxide_terms(
+    t_K: float,
+) -> tuple[float, float, float, float]:
+    # the fields of HeatOfSublimationResult after the mass, in order, for loops that don't need a result object
 
     # generate powers of the temperature
-    t_K2, t_K3, t_K4, t_K5, t_K6 = list(
-        itertools.accumulate([t_K] * 4, operator.mul, initial=t_K**2)
-    )
+    t_K2 = t_K * t_K
+    t_K3 = t_K2 * t_K
+    t_K4 = t_K3 * t_K
+    t_K5 = t_K4 * t_K
+    t_K6 = t_K5 * t_K
 
     # in calories/mole
     latent_heat_of_vaporization = (
@@ -49,10 +64,69 @@ def heat_of_sublimation_carbon_dioxide(t_K: float) -> HeatOfSublimationResult:
         pressure_dynecm2 = torr_to_dyne_per_cm2 * 10.0**pressure_torr
         pressure_dynecm2_prime = pressure_torr_prime * pressure_dynecm2
 
+    return (
+        latent_heat_of_vaporization,
+        latent_heat_of_vaporization_prime,
+        pressure_dynecm2,
+        pressure_dynecm2_prime,
+    )
+
+
+def heat_of_sublimation_carbon_dioxide_array(
+    t_K: float | np.ndarray,
+) -> HeatOfSublimationArrayResult:
+
+    temps_K: np.ndarray = np.asarray(t_K, dtype=np.float64)
+
+    # generate powers of the temperature
+    t_K2 = temps_K * temps_K
+    t_K3 = t_K2 * temps_K
+    t_K4 = t_K3 * temps_K
+    t_K5 = t_K4 * temps_K
+    t_K6 = t_K5 * temps_K
+
+    # in calories/mole
+    latent_heat_of_vaporization = (
+        6269.0 + 9.877 * temps_K - 0.130997 * t_K2 + 6.2735e-4 * t_K3 - 1.2699e-6 * t_K4
+    )
+    latent_heat_of_vaporization_prime = (
+        9.877 - 0.261994 * temps_K + 1.88205e-3 * t_K2 - 5.0796e-6 * t_K3
+    )
+    # convert to ergs/molecule
+    latent_heat_of_vaporization *= cal_per_mol_to_ergs_per_molecule
+    latent_heat_of_vaporization_prime *= cal_per_mol_to_ergs_per_molecule
+
+    # vapor pressure is only defined above 20 K, and is left at zero below
+    pressure_dynecm2 = np.zeros_like(temps_K)
+    pressure_dynecm2_prime = np.zeros_like(temps_K)
+
+    cold = temps_K <= 20
+    if np.any(cold):
+        logging.warn("CO2 temperature < 20 K")
+
+    warm = ~cold
+    pressure_torr = (
+        21.3807649e0
+        - 2570.647e0 / temps_K[warm]
+        - 7.78129489e4 / t_K2[warm]
+        + 4.32506256e6 / t_K3[warm]
+        - 1.20671368e8 / t_K4[warm]
+        + 1.34966306e9 / t_K5[warm]
+    )
+    pressure_torr_prime = (
+        2570.647e0 / t_K2[warm]
+        + 1.556258978e5 / t_K3[warm]
+        - 12.97518768e6 / t_K4[warm]
+        + 4.82685472e8 / t_K5[warm]
+        - 6.7483153e9 / t_K6[warm]
+    )
+    pressure_dynecm2[warm] = torr_to_dyne_per_cm2 * pow10_array(pressure_torr)
+    pressure_dynecm2_prime[warm] = pressure_torr_prime * pressure_dynecm2[warm]
+
     # atomic mass units to grams
     mass = 44.0 * amu_to_grams
 
-    return HeatOfSublimationResult(
+    return HeatOfSublimationArrayResult(
         mass_g=mass,
         latent_heat_of_vaporization=latent_heat_of_vaporization,
         latent_heat_of_vaporization_prime=latent_heat_of_vaporization_prime,
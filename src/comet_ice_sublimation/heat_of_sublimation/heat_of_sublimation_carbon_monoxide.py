@@ -1,20 +1,35 @@
-import itertools
 import logging
-import operator
 import sys
 
+import numpy as np
+
 from .heat_of_sublimation_result import *
+from .pow10 import *
 from ..physical_constants import *
 
+# atomic mass units to grams
+carbon_monoxide_molecule_mass_g = 28.0 * amu_to_grams
+
 
 # "Vaporization of Comet Nuclei: Light Curves and Life Times", Cowan & A'Hearn, 1979
 # DOI: 10.1007/BF00897085
 def heat_of_sublimation_carbon_monoxide(t_K: float) -> HeatOfSublimationResult:
+    return HeatOfSublimationResult(
+        carbon_monoxide_molecule_mass_g, *heat_of_sublimation_carbon_monoxide_terms(t_K)
+    )
+
+
+def heat_of_sublimation_carbon_monoxide_terms(
+    t_K: float,
+) -> tuple[float, float, float, float]:
+    # the fields of HeatOfSublimationResult after the mass, in order, for loops that don't need a result object
 
     # generate powers of the temperature
-    t_K2, t_K3, t_K4, t_K5, t_K6 = list(
-        itertools.accumulate([t_K] * 4, operator.mul, initial=t_K**2)
-    )
+    t_K2 = t_K * t_K
+    t_K3 = t_K2 * t_K
+    t_K4 = t_K3 * t_K
+    t_K5 = t_K4 * t_K
+    t_K6 = t_K5 * t_K
 
     if t_K > 68.127:
         latent_heat_of_vaporization = 0
@@ -91,10 +106,104 @@ def heat_of_sublimation_carbon_monoxide(t_K: float) -> HeatOfSublimationResult:
     latent_heat_of_vaporization *= cal_per_mol_to_ergs_per_molecule
     latent_heat_of_vaporization_prime *= cal_per_mol_to_ergs_per_molecule
 
+    return (
+        latent_heat_of_vaporization,
+        latent_heat_of_vaporization_prime,
+        pressure_dynecm2,
+        pressure_dynecm2_prime,
+    )
+
+
+def heat_of_sublimation_carbon_monoxide_array(
+    t_K: float | np.ndarray,
+) -> HeatOfSublimationArrayResult:
+
+    temps_K: np.ndarray = np.asarray(t_K, dtype=np.float64)
+
+    # generate powers of the temperature
+    t_K2 = temps_K * temps_K
+    t_K3 = t_K2 * temps_K
+    t_K4 = t_K3 * temps_K
+    t_K5 = t_K4 * temps_K
+    t_K6 = t_K5 * temps_K
+
+    too_hot = temps_K > 68.127
+    if np.any(too_hot):
+        sys.exit(f"error in CO temp, T = {temps_K[too_hot][0]}")
+
+    latent_heat_of_vaporization = np.zeros_like(temps_K)
+    latent_heat_of_vaporization_prime = np.zeros_like(temps_K)
+    pressure_dynecm2 = np.zeros_like(temps_K)
+    pressure_dynecm2_prime = np.zeros_like(temps_K)
+
+    # 61.544 K < T <= 68.127 K
+    hot = temps_K > 61.544
+    t, t2, t3, t4 = temps_K[hot], t_K2[hot], t_K3[hot], t_K4[hot]
+    latent_heat_of_vaporization[hot] = 1855 + 3.253 * t - 0.06833 * t2
+    latent_heat_of_vaporization_prime[hot] = 3.253 - 0.13666 * t
+    pressure_dynecm2[hot] = (
+        16.8655152e0 - 748.151471e0 / t - 5.84330795e0 / t2 + 3.93853859e0 / t3
+    )
+    pressure_dynecm2_prime[hot] = (
+        748.15147e0 / t2 + 11.6866159e0 / t3 - 11.81561577e0 / t4
+    )
+
+    # T <= 61.544 K: the latent heat is the same polynomial above and below 14 K,
+    # but the vapor pressure is only defined at or above 14 K, and is left at zero below
+    cool = ~hot
+    t, t2, t3, t4, t5 = temps_K[cool], t_K2[cool], t_K3[cool], t_K4[cool], t_K5[cool]
+    latent_heat_of_vaporization[cool] = (
+        1893
+        + 7.331 * t
+        + 0.01096 * t2
+        - 0.0060658 * t3
+        + 1.166e-4 * t4
+        - 7.8957e-7 * t5
+    )
+    latent_heat_of_vaporization_prime[cool] = (
+        7.331 + 0.02192 * t - 0.0181974 * t2 + 4.664e-4 * t3 - 3.94785e-6 * t4
+    )
+
+    cold = temps_K < 14.0
+    if np.any(cold):
+        logging.warn("CO temperature < 14 K")
+
+    # 14 K <= T <= 61.544 K
+    mid = cool & ~cold
+    t, t2, t3, t4, t5, t6 = (
+        temps_K[mid],
+        t_K2[mid],
+        t_K3[mid],
+        t_K4[mid],
+        t_K5[mid],
+        t_K6[mid],
+    )
+    pressure_torr = (
+        18.0741183e0
+        - 769.842078e0 / t
+        - 12148.7759e0 / t2
+        + 2.7350095e5 / t3
+        - 2.9087467e6 / t4
+        + 1.20319418e7 / t5
+    )
+    pressure_torr_prime = (
+        769.842078e0 / t2
+        + 24297.5518 / t3
+        - 820502.85e0 / t4
+        + 11634986.8e0 / t5
+        - 60159709.0e0 / t6
+    )
+    pressure_dynecm2[mid] = torr_to_dyne_per_cm2 * pow10_array(pressure_torr)
+    pressure_dynecm2_prime[mid] = pressure_torr_prime * pressure_dynecm2[mid]
+
+    # convert to ergs/molecule
+    latent_heat_of_vaporization *= cal_per_mol_to_ergs_per_molecule
+    latent_heat_of_vaporization_prime *= cal_per_mol_to_ergs_per_molecule
+
     # atomic mass units to grams
     mass = 28.0 * amu_to_grams
 
-    return HeatOfSublimationResult(
+    return HeatOfSublimationArrayResult(
         mass_g=mass,
         latent_heat_of_vaporization=latent_heat_of_vaporization,
         latent_heat_of_vaporization_prime=latent_heat_of_vaporization_prime,
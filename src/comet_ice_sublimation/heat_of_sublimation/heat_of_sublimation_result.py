@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass
+
+# slots keep this small and quick to build, since the scalar functions return one per temperature
+@dataclass(slots=True)
 class HeatOfSublimationResult:
     # mass of molecule, grams
     mass_g: float
@@ -13,3 +16,19 @@ class HeatOfSublimationResult:
     # in dyne/cm2
     pressure: float
     pressure_prime: float
+
+
+@dataclass
+class HeatOfSublimationArrayResult:
+    # struct-of-arrays version of HeatOfSublimationResult: one entry per temperature given
+
+    # mass of molecule, grams
+    mass_g: float
+
+    # ergs per molecule
+    latent_heat_of_vaporization: np.ndarray
+    latent_heat_of_vaporization_prime: np.ndarray
+
+    # in dyne/cm2
+    pressure: np.ndarray
+    pressure_prime: np.ndarray
@@ -1,6 +1,12 @@
+import numpy as np
+
 from .heat_of_sublimation_result import *
+from .pow10 import *
 from ..physical_constants import *
 
+# atomic mass units to grams
+water_molecule_mass_g = 18.0 * amu_to_grams
+
 
 # "Vaporization of Comet Nuclei: Light Curves and Life Times", Cowan & A'Hearn, 1979
 # DOI: 10.1007/BF00897085
@@ -13,7 +19,15 @@ def heat_of_sublimation_water(t_K: float) -> HeatOfSublimationResult:
     DOI: 10.1029/93GL00105
     """
 
-    t_K2 = t_K**2
+    return HeatOfSublimationResult(
+        water_molecule_mass_g, *heat_of_sublimation_water_terms(t_K)
+    )
+
+
+def heat_of_sublimation_water_terms(t_K: float) -> tuple[float, float, float, float]:
+    # the fields of HeatOfSublimationResult after the mass, in order, for loops that don't need a result object
+
+    t_K2 = t_K * t_K
 
     # in calories/mole
     latent_heat_of_vaporization = 12420.0 - 4.8 * t_K
@@ -26,10 +40,40 @@ def heat_of_sublimation_water(t_K: float) -> HeatOfSublimationResult:
     pressure_dynecm2 = 10.0 * 10.0**pressure_pascals
     pressure_dynecm2_prime = (2663.5 / t_K2) * pressure_dynecm2
 
+    return (
+        latent_heat_of_vaporization,
+        latent_heat_of_vaporization_prime,
+        pressure_dynecm2,
+        pressure_dynecm2_prime,
+    )
+
+
+def heat_of_sublimation_water_array(
+    t_K: float | np.ndarray,
+) -> HeatOfSublimationArrayResult:
+    """
+    Array version of heat_of_sublimation_water: evaluates every temperature in t_K at once,
+    with results identical to calling heat_of_sublimation_water on each temperature.
+    """
+
+    temps_K: np.ndarray = np.asarray(t_K, dtype=np.float64)
+    t_K2 = temps_K * temps_K
+
+    # in calories/mole
+    latent_heat_of_vaporization = 12420.0 - 4.8 * temps_K
+    latent_heat_of_vaporization_prime = np.full_like(temps_K, -4.8)
+    # convert to ergs/molecule
+    latent_heat_of_vaporization *= cal_per_mol_to_ergs_per_molecule
+    latent_heat_of_vaporization_prime *= cal_per_mol_to_ergs_per_molecule
+
+    pressure_pascals = -2663.5 / temps_K + 12.537
+    pressure_dynecm2 = 10.0 * pow10_array(pressure_pascals)
+    pressure_dynecm2_prime = (2663.5 / t_K2) * pressure_dynecm2
+
     # atomic mass units to grams
     mass = 18.0 * amu_to_grams
 
-    return HeatOfSublimationResult(
+    return HeatOfSublimationArrayResult(
         mass_g=mass,
         latent_heat_of_vaporization=latent_heat_of_vaporization,
         latent_heat_of_vaporization_prime=latent_heat_of_vaporization_prime,
@@ -0,0 +1,19 @@
+import itertools
+import math
+
+import numpy as np
+
+
+def pow10_array(x: np.ndarray) -> np.ndarray:
+    """
+    Computes 10**x elementwise with the C library pow, the same way python computes 10.0**x for a float.
+    NumPy's vectorized power is about 15 times faster, but rounds about 5% of results differently from the C
+    library, so the array versions of the heat of sublimation functions use this to match the scalar versions
+    bit-for-bit.  benchmarks/suite.py times both.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    return np.fromiter(
+        map(math.pow, itertools.repeat(10.0), x.ravel().tolist()),
+        dtype=np.float64,
+        count=x.size,
+    ).reshape(x.shape)
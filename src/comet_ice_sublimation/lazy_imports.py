@@ -0,0 +1,29 @@
+import importlib
+import sys
+from collections.abc import Callable
+from typing import Any
+
+
+def lazy_submodule_attributes(
+    package_name: str, submodule_names: dict[str, str]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """
+    Module __getattr__ and __dir__ functions for a package that imports each of its names from a submodule only when
+    the name is first used, given the name of the submodule holding each name.  The package lists the same names in
+    __all__, so that star imports of it still import everything.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in submodule_names:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        value = getattr(
+            importlib.import_module(f".{submodule_names[name]}", package_name), name
+        )
+        # later lookups find the name without coming back here
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(vars(sys.modules[package_name])) | set(submodule_names))
+
+    return __getattr__, __dir__
@@ -0,0 +1 @@
+from .model_cache import *
@@ -0,0 +1,234 @@
+import dataclasses
+import hashlib
+import importlib.metadata
+import json
+import logging
+import pathlib
+import sqlite3
+import time
+
+import numpy as np
+
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+
+cache_file_name = "comet_ice_sublimation_cache.sqlite"
+default_cache_size_bytes = 2**30
+
+
+def _package_version() -> str:
+    try:
+        return importlib.metadata.version("comet_ice_sublimation")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def model_input_cache_key(smi: SublimationModelInput) -> str:
+    """
+    Hash of every field of the model input that can change the result, along with the package version, so that
+    results are not reused across versions of the model.
+    Numbers of fields that aren't ints are written as floats in hex, so that equal values always give the same key,
+    whether given as 190 or 190.0, and return_profile, return_telemetry, and return_sensitivities are left out
+    because a result with profiles also answers a request without them, and neither telemetry nor sensitivities are
+    stored.
+    """
+
+    def _canonical(field: dataclasses.Field, value):
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if field.type is int:
+            return int(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return float(value).hex()
+        return value
+
+    canonical = {
+        field.name: _canonical(field, getattr(smi, field.name))
+        for field in dataclasses.fields(smi)
+        if field.name
+        not in ("return_profile", "return_telemetry", "return_sensitivities")
+    }
+    canonical["package_version"] = _package_version()
+
+    return hashlib.sha256(
+        json.dumps(canonical, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class SublimationModelCache:
+    """
+    Results of run_sublimation_model stored in an SQLite database in cache_dir, keyed by model_input_cache_key.
+    Profiles are stored as raw float64 bytes when the model was run with return_profile and the trapezoid rule.
+    When the stored results grow past max_size_bytes, the least recently used results are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path,
+        max_size_bytes: int = default_cache_size_bytes,
+    ):
+        cache_dir = pathlib.Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_path = cache_dir / cache_file_name
+        self.max_size_bytes = max_size_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        # other processes may be reading and writing the same cache, so wait on locks instead of failing
+        self._connection = sqlite3.connect(self.cache_path, timeout=60.0)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " z_bar REAL NOT NULL,"
+            " log10_z_bar REAL NOT NULL,"
+            " zs BLOB,"
+            " temps_K BLOB,"
+            " size_bytes INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+        )
+        # caches written before error estimates were stored don't have a column for them
+        columns = [
+            row[1] for row in self._connection.execute("PRAGMA table_info(results)")
+        ]
+        if "z_bar_error" not in columns:
+            self._connection.execute("ALTER TABLE results ADD COLUMN z_bar_error REAL")
+        self._connection.commit()
+
+    def get(self, smi: SublimationModelInput) -> SublimationModelResult | None:
+        key = model_input_cache_key(smi)
+        row = self._connection.execute(
+            "SELECT z_bar, log10_z_bar, zs, temps_K, z_bar_error FROM results WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+        # a result without profiles can't answer a request for them, and telemetry and sensitivities are only known
+        # for fresh runs
+        if (
+            row is None
+            or (smi.return_profile and row[2] is None)
+            or smi.return_telemetry
+            or smi.return_sensitivities
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._connection.execute(
+            "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        self._connection.commit()
+
+        z_bar, log10_z_bar, zs_blob, temps_K_blob, z_bar_error = row
+        if z_bar_error is not None:
+            z_bar_error = np.float64(z_bar_error)
+        if not smi.return_profile:
+            return SublimationModelResult(
+                z_bar=np.float64(z_bar),
+                log10_z_bar=np.float64(log10_z_bar),
+                latitudes_rad=None,
+                zs=None,
+                temps_K=None,
+                z_bar_error=z_bar_error,
+            )
+
+        # the latitudes only depend on the number of gridpoints, so they aren't stored
+        return SublimationModelResult(
+            z_bar=np.float64(z_bar),
+            log10_z_bar=np.float64(log10_z_bar),
+            latitudes_rad=np.arcsin(
+                np.linspace(start=-1, stop=1, num=smi.num_latitude_gridpoints)
+            ),
+            zs=np.frombuffer(zs_blob, dtype=np.float64).copy(),
+            temps_K=np.frombuffer(temps_K_blob, dtype=np.float64).copy(),
+            z_bar_error=z_bar_error,
+        )
+
+    def put(self, smi: SublimationModelInput, smr: SublimationModelResult) -> None:
+        key = model_input_cache_key(smi)
+
+        zs_blob = None
+        temps_K_blob = None
+        # profiles are only stored for the trapezoid rule, whose latitudes can be recomputed from the input
+        if (
+            smr.zs is not None
+            and smr.temps_K is not None
+            and smi.quadrature == LatitudeQuadrature.trapezoid
+        ):
+            zs_blob = np.ascontiguousarray(smr.zs, dtype=np.float64).tobytes()
+            temps_K_blob = np.ascontiguousarray(smr.temps_K, dtype=np.float64).tobytes()
+        else:
+            # don't replace a stored result that has profiles with one that doesn't
+            row = self._connection.execute(
+                "SELECT zs IS NOT NULL FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0]:
+                return
+
+        # the key, the two floats, and the sqlite row overhead come to roughly 100 bytes
+        size_bytes = 100
+        if zs_blob is not None and temps_K_blob is not None:
+            size_bytes += len(zs_blob) + len(temps_K_blob)
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results"
+            " (key, z_bar, log10_z_bar, zs, temps_K, size_bytes, last_access, z_bar_error)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                float(smr.z_bar),
+                float(smr.log10_z_bar),
+                zs_blob,
+                temps_K_blob,
+                size_bytes,
+                time.time(),
+                None if smr.z_bar_error is None else float(smr.z_bar_error),
+            ),
+        )
+        self._evict()
+        self._connection.commit()
+
+    def _evict(self) -> None:
+        total_size_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM results"
+        ).fetchone()[0]
+        if total_size_bytes <= self.max_size_bytes:
+            return
+
+        # walk the results from least to most recently used, removing them until we are back under the limit
+        excess_bytes = total_size_bytes - self.max_size_bytes
+        evicted_keys = []
+        for key, size_bytes in self._connection.execute(
+            "SELECT key, size_bytes FROM results ORDER BY last_access ASC"
+        ):
+            evicted_keys.append((key,))
+            excess_bytes -= size_bytes
+            if excess_bytes <= 0:
+                break
+
+        self._connection.executemany("DELETE FROM results WHERE key = ?", evicted_keys)
+        logging.debug(f"Evicted {len(evicted_keys)} results from {self.cache_path}")
+
+    def stats(self) -> dict:
+        num_results, total_size_bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM results"
+        ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "num_results": num_results,
+            "size_bytes": total_size_bytes,
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1 +1,121 @@
-from .sublimation_model_input import SublimationModelInput
+from typing import TYPE_CHECKING
+
+from ..lazy_imports import lazy_submodule_attributes
+
+# The submodules are only imported when one of their names is first used, so that the command line can parse its
+# arguments from sublimation_model_input and batch_input without importing numpy for the ephemeris and sweep inputs
+_submodule_names = {
+    "BatchInputFormat": "batch_input",
+    "BatchInputRow": "batch_input",
+    "batch_input_aliases": "batch_input",
+    "batch_record_to_input": "batch_input",
+    "read_batch_inputs": "batch_input",
+    "EphemerisRow": "ephemeris",
+    "ephemeris_columns": "ephemeris",
+    "ephemeris_npz_chunk_rows": "ephemeris",
+    "read_ephemeris": "ephemeris",
+    "EnergyBalanceSolver": "sublimation_model_input",
+    "EnergyBalanceTableMode": "sublimation_model_input",
+    "LatitudeQuadrature": "sublimation_model_input",
+    "SublimationModelInput": "sublimation_model_input",
+    "default_energy_balance_tolerance": "sublimation_model_input",
+    "default_quadrature_rtol": "sublimation_model_input",
+    "sublimation_model_input_error": "sublimation_model_input",
+    "sublimation_model_input_key": "sublimation_model_input",
+    "SublimationModelSweepInput": "sublimation_model_sweep_input",
+    "FitParameter": "sublimation_model_fit_input",
+    "SublimationModelFitInput": "sublimation_model_fit_input",
+    "default_fit_rtol": "sublimation_model_fit_input",
+    "default_max_fit_iterations": "sublimation_model_fit_input",
+    "sublimation_model_fit_input_error": "sublimation_model_fit_input",
+    "DistributionKind": "sublimation_model_monte_carlo_input",
+    "ParameterDistribution": "sublimation_model_monte_carlo_input",
+    "SublimationModelMonteCarloInput": "sublimation_model_monte_carlo_input",
+    "default_monte_carlo_batch_size": "sublimation_model_monte_carlo_input",
+    "default_monte_carlo_quantile_levels": "sublimation_model_monte_carlo_input",
+    "monte_carlo_parameter_in_range": "sublimation_model_monte_carlo_input",
+    "monte_carlo_parameter_ranges": "sublimation_model_monte_carlo_input",
+    "parse_parameter_distribution": "sublimation_model_monte_carlo_input",
+    "sublimation_model_monte_carlo_input_error": "sublimation_model_monte_carlo_input",
+}
+
+# the names of _submodule_names, written out for type checkers; tests/test_lazy_imports.py checks they match
+__all__ = [
+    "BatchInputFormat",
+    "BatchInputRow",
+    "batch_input_aliases",
+    "batch_record_to_input",
+    "read_batch_inputs",
+    "EphemerisRow",
+    "ephemeris_columns",
+    "ephemeris_npz_chunk_rows",
+    "read_ephemeris",
+    "EnergyBalanceSolver",
+    "EnergyBalanceTableMode",
+    "LatitudeQuadrature",
+    "SublimationModelInput",
+    "default_energy_balance_tolerance",
+    "default_quadrature_rtol",
+    "sublimation_model_input_error",
+    "sublimation_model_input_key",
+    "SublimationModelSweepInput",
+    "FitParameter",
+    "SublimationModelFitInput",
+    "default_fit_rtol",
+    "default_max_fit_iterations",
+    "sublimation_model_fit_input_error",
+    "DistributionKind",
+    "ParameterDistribution",
+    "SublimationModelMonteCarloInput",
+    "default_monte_carlo_batch_size",
+    "default_monte_carlo_quantile_levels",
+    "monte_carlo_parameter_in_range",
+    "monte_carlo_parameter_ranges",
+    "parse_parameter_distribution",
+    "sublimation_model_monte_carlo_input_error",
+]
+__getattr__, __dir__ = lazy_submodule_attributes(__name__, _submodule_names)
+
+if TYPE_CHECKING:
+    from .batch_input import (
+        BatchInputFormat,
+        BatchInputRow,
+        batch_input_aliases,
+        batch_record_to_input,
+        read_batch_inputs,
+    )
+    from .ephemeris import (
+        EphemerisRow,
+        ephemeris_columns,
+        ephemeris_npz_chunk_rows,
+        read_ephemeris,
+    )
+    from .sublimation_model_input import (
+        EnergyBalanceSolver,
+        EnergyBalanceTableMode,
+        LatitudeQuadrature,
+        SublimationModelInput,
+        default_energy_balance_tolerance,
+        default_quadrature_rtol,
+        sublimation_model_input_error,
+        sublimation_model_input_key,
+    )
+    from .sublimation_model_fit_input import (
+        FitParameter,
+        SublimationModelFitInput,
+        default_fit_rtol,
+        default_max_fit_iterations,
+        sublimation_model_fit_input_error,
+    )
+    from .sublimation_model_monte_carlo_input import (
+        DistributionKind,
+        ParameterDistribution,
+        SublimationModelMonteCarloInput,
+        default_monte_carlo_batch_size,
+        default_monte_carlo_quantile_levels,
+        monte_carlo_parameter_in_range,
+        monte_carlo_parameter_ranges,
+        parse_parameter_distribution,
+        sublimation_model_monte_carlo_input_error,
+    )
+    from .sublimation_model_sweep_input import SublimationModelSweepInput
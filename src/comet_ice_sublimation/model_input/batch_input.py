@@ -0,0 +1,175 @@
+import csv
+import dataclasses
+import json
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, TextIO
+
+from ..molecular_species import *
+from .sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    LatitudeQuadrature,
+    SublimationModelInput,
+    sublimation_model_input_error,
+)
+
+
+class BatchInputFormat(StrEnum):
+    # one json object per line
+    json = "json"
+    # a header row naming the fields, then one row per model
+    csv = "csv"
+
+
+# field names of SublimationModelInput, along with the names of the matching command line options
+batch_input_aliases = {
+    "Av": "visual_albedo",
+    "Air": "infrared_albedo",
+    "rh": "rh_au",
+    "ssl": "sub_solar_latitude",
+    "nlat": "num_latitude_gridpoints",
+    "temp": "t_init_K",
+    "profiles": "return_profile",
+    "table": "energy_balance_table",
+    "telemetry": "return_telemetry",
+    "sensitivities": "return_sensitivities",
+}
+
+# fields that may be left out, with their defaults as on the command line; t_init_K defaults by species
+_batch_input_defaults = {
+    "num_latitude_gridpoints": 181,
+    "t_init_K": None,
+    "return_profile": False,
+}
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("false", "0", "no"):
+            return False
+        raise ValueError(f"Expected true or false, not '{value}'")
+    return bool(value)
+
+
+_batch_input_field_types = {
+    "species": MolecularSpecies,
+    "visual_albedo": float,
+    "infrared_albedo": float,
+    "rh_au": float,
+    "sub_solar_latitude": float,
+    "num_latitude_gridpoints": int,
+    "t_init_K": float,
+    "return_profile": _parse_bool,
+    "energy_balance_table": EnergyBalanceTableMode,
+    "continuation": _parse_bool,
+    "solver": EnergyBalanceSolver,
+    "tolerance": float,
+    "quadrature": LatitudeQuadrature,
+    "quadrature_rtol": float,
+    "return_telemetry": _parse_bool,
+    "return_sensitivities": _parse_bool,
+}
+
+
+@dataclass
+class BatchInputRow:
+    # number of the row in the input, counting from 1 and not counting a csv header, so results can be matched up
+    row: int
+    # passed through from an optional "id" field, for the same reason
+    id: Any
+    # exactly one of these is set
+    smi: SublimationModelInput | None
+    error: str | None
+
+
+def read_batch_inputs(
+    stream: TextIO, input_format: BatchInputFormat
+) -> Iterator[BatchInputRow]:
+    """
+    Reads model inputs from a stream one row at a time, and validates each into a SublimationModelInput.
+    Fields are named as in SublimationModelInput or as the command line options (Av, Air, rh, ssl, nlat, temp,
+    ...).  A row that can not be read or fails validation gives a row with an error message, and reading carries on.
+    """
+
+    if input_format == BatchInputFormat.csv:
+        records = _read_csv_records(stream)
+    else:
+        records = _read_json_records(stream)
+
+    for row, record in enumerate(records, start=1):
+        if isinstance(record, str):
+            yield BatchInputRow(row=row, id=None, smi=None, error=record)
+            continue
+
+        record_id = record.pop("id", None)
+        try:
+            smi = batch_record_to_input(record)
+            error = sublimation_model_input_error(smi)
+        except (TypeError, ValueError) as e:
+            smi = None
+            error = str(e)
+        if error is not None:
+            smi = None
+        yield BatchInputRow(row=row, id=record_id, smi=smi, error=error)
+
+
+def batch_record_to_input(record: dict[str, Any]) -> SublimationModelInput:
+    # builds the input from one record, raising an exception if a field is unknown, missing, or can not be converted
+
+    fields = dict(_batch_input_defaults)
+    for name, value in record.items():
+        name = batch_input_aliases.get(name, name)
+        if name not in _batch_input_field_types:
+            raise ValueError(f"Unknown field '{name}'")
+        # empty csv cells leave the default
+        if value is None or value == "":
+            continue
+        fields[name] = _batch_input_field_types[name](value)
+
+    for field in dataclasses.fields(SublimationModelInput):
+        if field.default is dataclasses.MISSING and field.name not in fields:
+            raise ValueError(f"Missing field '{field.name}'")
+
+    smi = SublimationModelInput(**fields)
+
+    # heliocentric distances are taken to be positive, as on the command line
+    if not math.isfinite(smi.rh_au) or smi.rh_au == 0.0:
+        raise ValueError("Heliocentric distance must be a non-zero number!")
+    smi.rh_au = abs(smi.rh_au)
+
+    # fill in starting temperature based on the selected species
+    if smi.t_init_K is None:
+        smi.t_init_K = get_starting_temperature(smi.species)
+
+    return smi
+
+
+def _read_json_records(stream: TextIO) -> Iterator[dict[str, Any] | str]:
+    # gives the error message in place of the record for lines that are not a json object
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield f"Invalid json: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield "Expected a json object"
+            continue
+        yield record
+
+
+def _read_csv_records(stream: TextIO) -> Iterator[dict[str, Any] | str]:
+    reader = csv.DictReader(stream, skipinitialspace=True)
+    for record in reader:
+        # DictReader puts cells past the end of the header under None
+        if None in record:
+            yield "Row has more cells than the header"
+            continue
+        yield {k.strip(): v for k, v in record.items()}
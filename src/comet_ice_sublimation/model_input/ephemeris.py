@@ -0,0 +1,134 @@
+import csv
+import pathlib
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+# column names accepted in the header of a csv ephemeris, in the order used when there is no header
+ephemeris_columns = ("epoch", "rh", "ssl")
+
+# rows of each array of an .npz ephemeris held in memory at a time
+ephemeris_npz_chunk_rows = 65536
+
+
+@dataclass
+class EphemerisRow:
+    # the epoch is passed through to the output as given: a number, or the text of a csv column such as a date
+    epoch: float | str
+    rh_au: float
+    sub_solar_latitude: float
+
+
+def read_ephemeris(path: pathlib.Path) -> Iterator[EphemerisRow]:
+    """
+    Reads the epochs, heliocentric distances (AU) and sub-solar latitudes (degrees) of an ephemeris one row at a
+    time, so that long ephemerides are never held in memory at once: a .npy file is memory-mapped, and the arrays
+    of an .npz file are read in chunks of ephemeris_npz_chunk_rows.
+    A .csv file has these three columns, optionally with a header naming them epoch, rh, and ssl in any order,
+    possibly among other columns.  A .npy file holds an array with one row of three numbers per epoch, and an .npz
+    file holds arrays named epoch, rh, and ssl.
+    """
+
+    path = pathlib.Path(path)
+    if path.suffix == ".npy":
+        rows = _read_ephemeris_npy(path)
+    elif path.suffix == ".npz":
+        rows = _read_ephemeris_npz(path)
+    else:
+        rows = _read_ephemeris_csv(path)
+
+    for line, row in enumerate(rows, start=1):
+        if not np.isfinite(row.rh_au) or row.rh_au == 0.0:
+            raise ValueError(f"Ephemeris row {line}: invalid heliocentric distance!")
+        if not -90.0 <= row.sub_solar_latitude <= 90.0:
+            raise ValueError(
+                f"Ephemeris row {line}: sub-solar latitude must be between -90 degrees and +90 degrees!"
+            )
+        # heliocentric distances are taken to be positive, as on the command line
+        row.rh_au = abs(row.rh_au)
+        yield row
+
+
+def _read_ephemeris_csv(path: pathlib.Path) -> Iterator[EphemerisRow]:
+    with open(path, newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        columns = None
+        for values in reader:
+            if not values or values[0].lstrip().startswith("#"):
+                continue
+            if columns is None:
+                header = [value.strip().lower() for value in values]
+                if all(name in header for name in ephemeris_columns):
+                    columns = [header.index(name) for name in ephemeris_columns]
+                    continue
+                columns = list(range(len(ephemeris_columns)))
+
+            epoch, rh, ssl = (values[i].strip() for i in columns)
+            yield EphemerisRow(
+                epoch=_csv_epoch(epoch), rh_au=float(rh), sub_solar_latitude=float(ssl)
+            )
+
+
+def _csv_epoch(epoch: str) -> float | str:
+    try:
+        return float(epoch)
+    except ValueError:
+        return epoch
+
+
+def _read_ephemeris_npy(path: pathlib.Path) -> Iterator[EphemerisRow]:
+    # memory-mapped, so only the rows being read are loaded
+    ephemeris = np.load(path, mmap_mode="r")
+    if ephemeris.ndim != 2 or ephemeris.shape[1] != len(ephemeris_columns):
+        raise ValueError(
+            f"Ephemeris array must have one row of epoch, rh, ssl per epoch, not shape {ephemeris.shape}!"
+        )
+    for epoch, rh, ssl in ephemeris:
+        yield EphemerisRow(
+            epoch=float(epoch), rh_au=float(rh), sub_solar_latitude=float(ssl)
+        )
+
+
+def _read_ephemeris_npz(path: pathlib.Path) -> Iterator[EphemerisRow]:
+    # the arrays are read from the zip file, and decompressed, a chunk of rows at a time
+    with zipfile.ZipFile(path) as archive:
+        columns = [_npz_column_chunks(archive, name) for name in ephemeris_columns]
+        sizes = {size for size, _ in columns}
+        if len(sizes) != 1:
+            raise ValueError(
+                "Ephemeris arrays epoch, rh, and ssl must all have the same length!"
+            )
+        for epochs, rhs, ssls in zip(*(chunks for _, chunks in columns)):
+            for epoch, rh, ssl in zip(epochs, rhs, ssls):
+                yield EphemerisRow(
+                    epoch=epoch.item(), rh_au=float(rh), sub_solar_latitude=float(ssl)
+                )
+
+
+def _npz_column_chunks(
+    archive: zipfile.ZipFile, name: str
+) -> tuple[int, Iterator[np.ndarray]]:
+    # the length of the one dimensional array name in an .npz archive, and its values in chunks
+    try:
+        member = archive.open(f"{name}.npy")
+    except KeyError:
+        raise ValueError(f"Ephemeris has no array named {name}!") from None
+    version = np.lib.format.read_magic(member)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(member)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(member)
+    if len(shape) != 1 or dtype.hasobject:
+        raise ValueError(
+            f"Ephemeris array {name} must be a one dimensional array of numbers or text!"
+        )
+
+    def _chunks() -> Iterator[np.ndarray]:
+        with member:
+            for start in range(0, shape[0], ephemeris_npz_chunk_rows):
+                count = min(ephemeris_npz_chunk_rows, shape[0] - start)
+                yield np.frombuffer(member.read(count * dtype.itemsize), dtype=dtype)
+
+    return shape[0], _chunks()
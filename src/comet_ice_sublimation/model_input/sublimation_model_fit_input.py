@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from enum import StrEnum
+
+import numpy as np
+
+from ..molecular_species import *
+from .sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    default_energy_balance_tolerance,
+)
+
+# relative error of the modelled z_bar at which a fit is converged; z_bar is only as precise as the energy balance,
+# to a few times its tolerance, so this should be well above that
+default_fit_rtol = 1e-5
+default_max_fit_iterations = 50
+
+
+class FitParameter(StrEnum):
+    # the parameter of each observation that is fit to its target, the others being held at their given values
+    visual_albedo = "visual_albedo"
+    rh_au = "rh_au"
+    # the active area in cm^2 that gives the observed production rate: production_rates / z_bar
+    active_area = "active_area"
+
+
+@dataclass
+class SublimationModelFitInput:
+    # one fit for each observation: the arrays of albedos, distances, sub-solar latitudes, and targets are broadcast
+    # against each other, and the values given for the fitted parameter are where its fit starts
+    species: MolecularSpecies
+    parameter: FitParameter
+    visual_albedos: np.ndarray
+    infrared_albedos: np.ndarray
+    rh_aus: np.ndarray
+    sub_solar_latitudes: np.ndarray
+    num_latitude_gridpoints: int
+    t_init_K: float | None
+    # the target of each fit, either z_bar in molecules per cm^2 per second, or production rates in molecules per
+    # second along with the active areas in cm^2 that produce them, which are not needed when fitting the active area
+    z_bars: np.ndarray | None = None
+    production_rates: np.ndarray | None = None
+    active_areas_cm2: np.ndarray | None = None
+    energy_balance_table: EnergyBalanceTableMode = EnergyBalanceTableMode.off
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton
+    tolerance: float = default_energy_balance_tolerance
+    fit_rtol: float = default_fit_rtol
+    max_fit_iterations: int = default_max_fit_iterations
+
+
+def sublimation_model_fit_input_error(smfi: SublimationModelFitInput) -> str | None:
+    # describes the first problem found with the input, or None if there is none
+    if smfi.parameter == FitParameter.active_area:
+        if smfi.production_rates is None:
+            return "Fitting the active area needs production rates!"
+    elif smfi.z_bars is None and (
+        smfi.production_rates is None or smfi.active_areas_cm2 is None
+    ):
+        return "The target of the fit must be given as z_bars, or as production rates and active areas!"
+    if smfi.fit_rtol <= 0:
+        return "The relative tolerance of the fit must be positive!"
+    if smfi.max_fit_iterations < 1:
+        return "There must be at least one fit iteration!"
+    return None
@@ -1,8 +1,42 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from enum import StrEnum
 
 from ..molecular_species import *
 
 
+class EnergyBalanceTableMode(StrEnum):
+    # solve the energy balance by iteration at every latitude
+    off = "off"
+    # interpolate temperatures from a table of solutions, built once per species and infrared albedo
+    interpolate = "interpolate"
+    # interpolate, then take one Newton step from the interpolated temperature
+    polish = "polish"
+
+
+class EnergyBalanceSolver(StrEnum):
+    # Newton steps of half the computed step, clamped to at most 10 K
+    clamped_newton = "clamped-newton"
+    # full Newton steps, falling back to bisection whenever a step leaves the bracket around the solution
+    newton_bisection = "newton-bisection"
+    # Brent's method: inverse quadratic interpolation and secant steps, safeguarded by bisection
+    brent = "brent"
+
+
+class LatitudeQuadrature(StrEnum):
+    # trapezoid rule on num_latitude_gridpoints latitudes spaced evenly in sin(latitude)
+    trapezoid = "trapezoid"
+    # 15-point Gauss-Kronrod panels, about num_latitude_gridpoints nodes in all, split at the arctic latitudes
+    gauss_kronrod = "gauss-kronrod"
+    # Gauss-Kronrod panels, split until the estimated error of z_bar is below quadrature_rtol
+    adaptive = "adaptive"
+
+
+# the energy balance is solved when the net flux is below this fraction of the incident flux
+default_energy_balance_tolerance = 1e-6
+# relative error of z_bar that the adaptive quadrature aims for
+default_quadrature_rtol = 1e-6
+
+
 @dataclass
 class SublimationModelInput:
     species: MolecularSpecies
@@ -13,6 +47,17 @@ class SublimationModelInput:
     num_latitude_gridpoints: int
     t_init_K: float | None
     return_profile: bool
+    energy_balance_table: EnergyBalanceTableMode = EnergyBalanceTableMode.off
+    # start the energy balance iteration from the temperatures of already converged neighbouring points
+    continuation: bool = False
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton
+    tolerance: float = default_energy_balance_tolerance
+    quadrature: LatitudeQuadrature = LatitudeQuadrature.trapezoid
+    quadrature_rtol: float = default_quadrature_rtol
+    # return the per-latitude SolverTelemetry of the energy balance along with the result
+    return_telemetry: bool = False
+    # return the derivatives of z_bar with respect to the albedos, heliocentric distance, and sub-solar latitude
+    return_sensitivities: bool = False
 
     def __str__(self):
         if self.t_init_K is not None:
@@ -26,3 +71,20 @@ class SublimationModelInput:
             + f"Heliocentric distance:\t{self.rh_au:>6.2f} AU\tSubsolar latitude:\t{self.sub_solar_latitude:<6.2f} degrees\n"
             + f"Latitude gridpoints:\t{self.num_latitude_gridpoints:>5d}\t\tInitial temperature:\t{temperature_str:<}"
         )
+
+
+def sublimation_model_input_error(smi: SublimationModelInput) -> str | None:
+    # describes the first problem found with the input, or None if there is none
+    if smi.visual_albedo < 0.0 or smi.visual_albedo > 1.0:
+        return "Visual albedo must be between 0 and 1, inclusive!"
+    if smi.infrared_albedo < 0.0 or smi.infrared_albedo > 1.0:
+        return "Infrared albedo must be between 0 and 1, inclusive!"
+    if smi.sub_solar_latitude > 90.0 or smi.sub_solar_latitude < -90.0:
+        return "Sub-solar latitude must be between -90 degrees and +90 degrees!"
+    return None
+
+
+def sublimation_model_input_key(smi: SublimationModelInput) -> tuple:
+    # every field of the input is a hashable scalar, so the fields are their own key for telling identical inputs
+    # apart in memory; results kept across runs are keyed by model_input_cache_key instead
+    return tuple(getattr(smi, field.name) for field in fields(smi))
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from enum import StrEnum
+
+from ..molecular_species import *
+from .sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    default_energy_balance_tolerance,
+)
+
+# samples drawn and solved together, bounding the memory of the (sample, latitude) arrays
+default_monte_carlo_batch_size = 4096
+default_monte_carlo_quantile_levels = (0.025, 0.16, 0.5, 0.84, 0.975)
+
+# the range each parameter is drawn from, as (low, high, low included, high included): a normal distribution is
+# truncated to it, by drawing again any samples that fall outside.  An albedo of 1 absorbs nothing, and sublimates
+# nothing, so log10_z_bar would be -inf
+monte_carlo_parameter_ranges = {
+    "visual_albedo": (0.0, 1.0, True, False),
+    "infrared_albedo": (0.0, 1.0, True, False),
+    "rh_au": (0.0, float("inf"), False, False),
+    "sub_solar_latitude": (-90.0, 90.0, True, True),
+}
+
+
+def monte_carlo_parameter_in_range(name: str, value):
+    # for a float or an array of values
+    low, high, low_included, high_included = monte_carlo_parameter_ranges[name]
+    above = (value >= low) if low_included else (value > low)
+    below = (value <= high) if high_included else (value < high)
+    return above & below
+
+
+class DistributionKind(StrEnum):
+    fixed = "fixed"
+    uniform = "uniform"
+    normal = "normal"
+
+
+@dataclass(frozen=True)
+class ParameterDistribution:
+    kind: DistributionKind
+    # the value of a fixed parameter, the lower end of a uniform distribution, or the mean of a normal one
+    a: float
+    # the upper end of a uniform distribution, or the standard deviation of a normal one
+    b: float = 0.0
+
+    def __str__(self):
+        if self.kind == DistributionKind.fixed:
+            return f"{self.a:g}"
+        return f"{self.kind.value}:{self.a:g},{self.b:g}"
+
+
+def parse_parameter_distribution(text: str) -> ParameterDistribution:
+    """
+    Reads a distribution written as a single value, as uniform:low,high, or as normal:mean,sigma.
+    """
+
+    kind, separator, values = text.partition(":")
+    if not separator:
+        return ParameterDistribution(kind=DistributionKind.fixed, a=float(text))
+    try:
+        kind = DistributionKind(kind.strip().lower())
+    except ValueError:
+        raise ValueError(f"Unknown distribution '{kind}'") from None
+    a, separator, b = values.partition(",")
+    if kind == DistributionKind.fixed or not separator:
+        raise ValueError(
+            f"Expected {kind.value}:a,b for a {kind.value} distribution, not '{text}'"
+        )
+    return ParameterDistribution(kind=kind, a=float(a), b=float(b))
+
+
+@dataclass
+class SublimationModelMonteCarloInput:
+    # the model is run on num_samples draws of the parameters, each drawn independently from its distribution
+    species: MolecularSpecies
+    visual_albedo: ParameterDistribution
+    infrared_albedo: ParameterDistribution
+    rh_au: ParameterDistribution
+    sub_solar_latitude: ParameterDistribution
+    num_latitude_gridpoints: int
+    t_init_K: float | None
+    num_samples: int
+    # the same seed gives the same samples, however many workers draw them
+    seed: int | None = None
+    batch_size: int = default_monte_carlo_batch_size
+    quantile_levels: tuple[float, ...] = default_monte_carlo_quantile_levels
+    energy_balance_table: EnergyBalanceTableMode = EnergyBalanceTableMode.off
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton
+    tolerance: float = default_energy_balance_tolerance
+
+    def __str__(self):
+        return (
+            f"Species: {self.species.value}\n"
+            + f"Visual albedo:\t\t{self.visual_albedo}\n"
+            + f"Infrared albedo:\t{self.infrared_albedo}\n"
+            + f"Heliocentric distance:\t{self.rh_au} AU\n"
+            + f"Subsolar latitude:\t{self.sub_solar_latitude} degrees\n"
+            + f"Latitude gridpoints:\t{self.num_latitude_gridpoints:>5d}\t\tSamples:\t{self.num_samples}"
+        )
+
+
+def sublimation_model_monte_carlo_input_error(
+    smci: SublimationModelMonteCarloInput,
+) -> str | None:
+    # describes the first problem found with the input, or None if there is none
+    for name, (low, high, _, _) in monte_carlo_parameter_ranges.items():
+        distribution = getattr(smci, name)
+        if not monte_carlo_parameter_in_range(name, distribution.a):
+            what = {
+                DistributionKind.fixed: "value",
+                DistributionKind.uniform: "low end",
+                DistributionKind.normal: "mean",
+            }[distribution.kind]
+            return f"The {what} of {name} must be within {low:g} and {high:g}!"
+        if distribution.kind == DistributionKind.uniform and not (
+            distribution.a < distribution.b <= high
+        ):
+            return (
+                f"The uniform distribution of {name} must have low < high <= {high:g}!"
+            )
+        if distribution.kind == DistributionKind.normal and distribution.b < 0.0:
+            return f"The normal distribution of {name} must have a sigma of at least 0!"
+    if smci.num_samples < 1:
+        return "There must be at least one sample!"
+    if smci.batch_size < 1:
+        return "The batch size must be at least 1!"
+    if not all(0.0 < q < 1.0 for q in smci.quantile_levels):
+        return "Quantiles must be between 0 and 1!"
+    return None
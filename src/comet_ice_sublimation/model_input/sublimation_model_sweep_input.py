@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..molecular_species import *
+from .sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    default_energy_balance_tolerance,
+)
+
+
+@dataclass
+class SublimationModelSweepInput:
+    # one model is run for every combination of the values along these axes
+    species: MolecularSpecies
+    visual_albedos: np.ndarray
+    infrared_albedos: np.ndarray
+    rh_aus: np.ndarray
+    sub_solar_latitudes: np.ndarray
+    num_latitude_gridpoints: int
+    t_init_K: float | None
+    return_profile: bool
+    energy_balance_table: EnergyBalanceTableMode = EnergyBalanceTableMode.off
+    # start the energy balance iteration from the temperatures of already converged neighbouring points
+    continuation: bool = False
+    solver: EnergyBalanceSolver = EnergyBalanceSolver.clamped_newton
+    tolerance: float = default_energy_balance_tolerance
+
+    def __str__(self):
+        if self.t_init_K is not None:
+            temperature_str = f"{self.t_init_K:6.2f} K"
+        else:
+            temperature_str = "None"
+
+        return (
+            f"Species: {self.species.value}\n"
+            + f"Visual albedo:\t\t{_axis_str(self.visual_albedos)}\n"
+            + f"Infrared albedo:\t{_axis_str(self.infrared_albedos)}\n"
+            + f"Heliocentric distance:\t{_axis_str(self.rh_aus)} AU\n"
+            + f"Subsolar latitude:\t{_axis_str(self.sub_solar_latitudes)} degrees\n"
+            + f"Latitude gridpoints:\t{self.num_latitude_gridpoints:>5d}\t\tInitial temperature:\t{temperature_str:<}"
+        )
+
+
+def _axis_str(axis: np.ndarray) -> str:
+    axis = np.atleast_1d(axis)
+    if axis.size == 1:
+        return f"{axis[0]:6.2f}"
+    return f"{axis.size} values from {axis.min():6.2f} to {axis.max():6.2f}"
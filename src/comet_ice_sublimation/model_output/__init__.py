@@ -1 +1,8 @@
+from .solver_telemetry import *
+from .z_bar_sensitivities import *
 from .sublimation_model_output import *
+from .sublimation_model_sweep_output import *
+from .batch_output import *
+from .sublimation_model_fit_output import *
+from .sublimation_model_monte_carlo_output import *
+from .sublimation_model_multi_species_output import *
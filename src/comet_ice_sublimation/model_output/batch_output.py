@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from ..model_input.batch_input import BatchInputRow
+from .sublimation_model_output import SublimationModelResult
+
+
+@dataclass
+class BatchModelResult:
+    input_row: BatchInputRow
+    # exactly one of these is set: the result, or why the row could not be read or run
+    smr: SublimationModelResult | None
+    error: str | None
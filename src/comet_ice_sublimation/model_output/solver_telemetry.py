@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SolverTelemetry:
+    """
+    How the energy balance solve went at each latitude of the model, in the same order as the profile arrays of
+    SublimationModelResult.  Latitudes with no sunlight are not solved, and have a residual of nan.
+    For the adaptive quadrature these are the nodes of the final panels only, so the iterations spent on panels that
+    were later split are counted in SublimationModelResult.num_iterations but not here.
+    """
+
+    latitudes_rad: np.ndarray
+    # energy balance iterations, or function evaluations for the bracketing solvers
+    num_iterations: np.ndarray
+    # net flux out of the surface at the final temperature, as a fraction of the incident flux
+    residuals: np.ndarray
+    # steps clamped to 10 K by the clamped Newton iteration, or bisection steps of the bracketing solvers
+    num_clamped_steps: np.ndarray
+
+    @property
+    def sunlit(self) -> np.ndarray:
+        return np.isfinite(self.residuals)
+
+    @property
+    def max_iterations(self) -> int:
+        return int(self.num_iterations.max(initial=0))
+
+    @property
+    def mean_iterations(self) -> float:
+        sunlit = self.sunlit
+        if not sunlit.any():
+            return 0.0
+        return float(self.num_iterations[sunlit].mean())
+
+    @property
+    def slowest_latitude_rad(self) -> float:
+        # latitude that took the most iterations, nan if none were taken
+        if self.latitudes_rad.size == 0 or self.max_iterations == 0:
+            return np.nan
+        return float(self.latitudes_rad[np.argmax(self.num_iterations)])
+
+    @property
+    def max_residual(self) -> float:
+        sunlit = self.sunlit
+        if not sunlit.any():
+            return 0.0
+        return float(self.residuals[sunlit].max())
+
+    def summary(self) -> str:
+        return (
+            f"Energy balance iterations per latitude: max {self.max_iterations}"
+            f" at latitude {np.degrees(self.slowest_latitude_rad):6.4f},"
+            f" mean {self.mean_iterations:.1f} over {np.count_nonzero(self.sunlit)} sunlit latitudes;"
+            f" largest relative residual {self.max_residual:.2e};"
+            f" {int(self.num_clamped_steps.sum())} clamped steps"
+        )
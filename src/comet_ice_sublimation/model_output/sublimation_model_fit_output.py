@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SublimationModelFitResult:
+    # fitted value of the parameter for each observation, with the broadcast shape of the fit input, and nan where
+    # the fit failed: no value of the parameter reaches the target, or the energy balance did not converge
+    values: np.ndarray
+    # z_bar of the model at the fitted values, molecules per cm^2 per second
+    z_bar: np.ndarray
+    converged: np.ndarray
+    # number of forward evaluations of the model for each observation
+    num_fit_iterations: np.ndarray
+    # total energy balance iterations over every evaluation, when the energy balance was solved by iteration
+    num_iterations: int | None = None
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class MonteCarloConvergence:
+    # the estimates after each batch of samples, to show how quickly they settle: one entry per batch, with the
+    # quantiles having the quantile levels as their last dimension, and the number of samples drawn by then
+    num_samples: np.ndarray
+    mean: np.ndarray
+    standard_error: np.ndarray
+    quantiles: np.ndarray
+    quantile_standard_errors: np.ndarray
+
+
+@dataclass
+class SublimationModelMonteCarloResult:
+    # statistics of log10_z_bar over the samples, leaving out the num_failed whose energy balance did not converge
+    num_samples: int
+    num_failed: int
+    mean: float
+    std: float
+    # of the mean, std / sqrt(num_samples - num_failed)
+    standard_error: float
+    minimum: float
+    maximum: float
+    quantile_levels: np.ndarray
+    quantiles: np.ndarray
+    quantile_standard_errors: np.ndarray
+    convergence: MonteCarloConvergence
+    # the entropy the samples were drawn from, which is the seed of the input when one was given, so that a run
+    # without a seed can still be repeated
+    seed: int
+    # total energy balance iterations over every sample, when the energy balance was solved by iteration
+    num_iterations: int | None = None
@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+
+from ..molecular_species import MolecularSpecies
+from .sublimation_model_output import SublimationModelResult
+
+
+@dataclass
+class SublimationModelMultiSpeciesResult:
+    # the result of each species, in the order the species were given, all on the same latitudes
+    results: dict[MolecularSpecies, SublimationModelResult]
+
+    def __getitem__(self, species: MolecularSpecies) -> SublimationModelResult:
+        return self.results[species]
@@ -2,6 +2,9 @@ from dataclasses import dataclass
 
 import numpy as np
 
+from .solver_telemetry import SolverTelemetry
+from .z_bar_sensitivities import ZBarSensitivities
+
 
 @dataclass
 class SublimationModelResult:
@@ -13,3 +16,18 @@ class SublimationModelResult:
     latitudes_rad: np.ndarray | None
     zs: np.ndarray | None
     temps_K: np.ndarray | None
+
+    # estimated absolute error of z_bar from the integration over latitude
+    z_bar_error: np.float64 | None = None
+    # total energy balance iterations over all latitudes, when the energy balance was solved by iteration
+    num_iterations: int | None = None
+    # estimated number of iterations saved by continuation, compared to starting every latitude from t_init_K
+    num_iterations_saved: int | None = None
+    # number of latitudes in sunlight, each an energy balance problem, and the number of distinct problems among
+    # them that were actually solved, fewer when latitudes share their incident flux
+    num_energy_balance_problems: int | None = None
+    num_energy_balance_solves: int | None = None
+    # per-latitude iteration counts, residuals, and clamped steps, if the model was run with return_telemetry
+    telemetry: SolverTelemetry | None = None
+    # derivatives of z_bar with respect to the parameters, if the model was run with return_sensitivities
+    sensitivities: ZBarSensitivities | None = None
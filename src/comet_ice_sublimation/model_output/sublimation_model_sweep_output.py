@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SublimationModelSweepResult:
+    # total average sublimation rate of exposed surface, molecules per cm^2 per second,
+    # with dimensions (rh_au, sub_solar_latitude, visual_albedo, infrared_albedo) of the sweep input
+    z_bar: np.ndarray
+    # log base 10 of above z_bar
+    log10_z_bar: np.ndarray
+
+    # latitudes are the same for every point of the sweep
+    latitudes_rad: np.ndarray | None
+    # same dimensions as z_bar, with latitude added as the last dimension
+    zs: np.ndarray | None
+    temps_K: np.ndarray | None
+
+    # total energy balance iterations over the whole sweep, when the energy balance was solved by iteration
+    num_iterations: int | None = None
+    # estimated number of iterations saved by continuation, compared to starting every point from t_init_K
+    num_iterations_saved: int | None = None
@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ZBarSensitivities:
+    """
+    Derivatives of z_bar, in molecules per cm^2 per second, with respect to each parameter of the model, found by
+    differentiating the converged energy balance at every latitude and integrating over latitude with the model's own
+    quadrature.
+    """
+
+    visual_albedo: np.float64
+    infrared_albedo: np.float64
+    # per AU
+    rh_au: np.float64
+    # per degree
+    sub_solar_latitude: np.float64
@@ -1 +1,100 @@
-from .model_runner import *
+from typing import TYPE_CHECKING
+
+from ..lazy_imports import lazy_submodule_attributes
+
+# The runners are only imported when one of them is first used, so that a single run doesn't import the process
+# pools of the parallel and batch runners, or the cache
+_submodule_names = {
+    "adaptive_quadrature_max_panels": "model_runner",
+    "failed_latitudes_listed": "model_runner",
+    "run_sublimation_model": "model_runner",
+    "run_sublimation_model_multi_species": "model_runner",
+    "run_sublimation_models_vectorized": "model_runner",
+    "run_sublimation_model_sweep": "sweep_runner",
+    "run_light_curve": "light_curve_runner",
+    "batch_window_per_worker": "batch_runner",
+    "run_sublimation_model_batch": "batch_runner",
+    "chunks_per_worker": "parallel_runner",
+    "default_num_workers": "parallel_runner",
+    "latitude_gridpoints_per_chunk": "parallel_runner",
+    "run_sublimation_model_sweep_parallel": "parallel_runner",
+    "run_sublimation_models_parallel": "parallel_runner",
+    "run_sublimation_model_cached": "cached_runner",
+    "run_sublimation_model_multi_species_cached": "cached_runner",
+    "AsyncSublimationModelRunner": "async_runner",
+    "run_sublimation_model_async": "async_runner",
+    "fit_chunk_size": "fit_runner",
+    "fit_sublimation_models": "fit_runner",
+    "StreamingStatistics": "monte_carlo_runner",
+    "monte_carlo_histogram_bin_width": "monte_carlo_runner",
+    "run_sublimation_model_monte_carlo": "monte_carlo_runner",
+    "build_z_bar_table": "z_bar_table_builder",
+    "default_z_bar_table_check_points": "z_bar_table_builder",
+    "z_bar_table_input_error": "z_bar_table_builder",
+}
+
+# the names of _submodule_names, written out for type checkers; tests/test_lazy_imports.py checks they match
+__all__ = [
+    "adaptive_quadrature_max_panels",
+    "failed_latitudes_listed",
+    "run_sublimation_model",
+    "run_sublimation_model_multi_species",
+    "run_sublimation_models_vectorized",
+    "run_sublimation_model_sweep",
+    "run_light_curve",
+    "batch_window_per_worker",
+    "run_sublimation_model_batch",
+    "chunks_per_worker",
+    "default_num_workers",
+    "latitude_gridpoints_per_chunk",
+    "run_sublimation_model_sweep_parallel",
+    "run_sublimation_models_parallel",
+    "run_sublimation_model_cached",
+    "run_sublimation_model_multi_species_cached",
+    "AsyncSublimationModelRunner",
+    "run_sublimation_model_async",
+    "fit_chunk_size",
+    "fit_sublimation_models",
+    "StreamingStatistics",
+    "monte_carlo_histogram_bin_width",
+    "run_sublimation_model_monte_carlo",
+    "build_z_bar_table",
+    "default_z_bar_table_check_points",
+    "z_bar_table_input_error",
+]
+__getattr__, __dir__ = lazy_submodule_attributes(__name__, _submodule_names)
+
+if TYPE_CHECKING:
+    from .async_runner import AsyncSublimationModelRunner, run_sublimation_model_async
+    from .batch_runner import batch_window_per_worker, run_sublimation_model_batch
+    from .cached_runner import (
+        run_sublimation_model_cached,
+        run_sublimation_model_multi_species_cached,
+    )
+    from .fit_runner import fit_chunk_size, fit_sublimation_models
+    from .light_curve_runner import run_light_curve
+    from .monte_carlo_runner import (
+        StreamingStatistics,
+        monte_carlo_histogram_bin_width,
+        run_sublimation_model_monte_carlo,
+    )
+    from .model_runner import (
+        adaptive_quadrature_max_panels,
+        failed_latitudes_listed,
+        run_sublimation_model,
+        run_sublimation_model_multi_species,
+        run_sublimation_models_vectorized,
+    )
+    from .parallel_runner import (
+        chunks_per_worker,
+        default_num_workers,
+        latitude_gridpoints_per_chunk,
+        run_sublimation_model_sweep_parallel,
+        run_sublimation_models_parallel,
+    )
+    from .sweep_runner import run_sublimation_model_sweep
+    from .z_bar_table_builder import (
+        build_z_bar_table,
+        default_z_bar_table_check_points,
+        z_bar_table_input_error,
+    )
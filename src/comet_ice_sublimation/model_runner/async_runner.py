@@ -0,0 +1,169 @@
+import asyncio
+import collections
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+from comet_ice_sublimation.model_runner.parallel_runner import default_num_workers
+
+
+async def run_sublimation_model_async(
+    smi: SublimationModelInput, executor: Executor | None = None
+) -> SublimationModelResult:
+    # runs the model on executor, or the default executor of the event loop, without blocking the loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, run_sublimation_model, smi)
+
+
+class _InFlightModel:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.num_waiters = 0
+
+
+class AsyncSublimationModelRunner:
+    """
+    Runs models for asyncio code on an executor, so that the event loop carries on while they are solved.
+    Unless an executor is given, the runner makes its own pool of worker threads, or worker processes with
+    processes=True, and shuts it down on close; processes solve models in parallel, while threads only keep them
+    off the event loop.  At most max_concurrency models are sent to the executor at once, one per worker of its own
+    pool by default.
+    Awaiting a model that is already being run with an identical input waits on that run instead of starting
+    another, and all of them get the same result.  Cancelling a run only stops the model once every run waiting on
+    it has been cancelled, and a model that a worker has already started is left to finish.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        workers: int | None = None,
+        processes: bool = False,
+        max_concurrency: int | None = None,
+    ):
+        self._own_executor = executor is None
+        if executor is None:
+            if workers is None:
+                workers = default_num_workers()
+            executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+            executor = executor_class(max_workers=workers)
+            if max_concurrency is None:
+                max_concurrency = workers
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+
+        self._slots = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+        )
+        self._in_flight: dict[tuple, _InFlightModel] = {}
+
+    @property
+    def num_in_flight(self) -> int:
+        # distinct inputs waiting to be run or being run
+        return len(self._in_flight)
+
+    async def run(self, smi: SublimationModelInput) -> SublimationModelResult:
+        key = sublimation_model_input_key(smi)
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = _InFlightModel(asyncio.ensure_future(self._run_model(smi)))
+            self._in_flight[key] = in_flight
+            in_flight.task.add_done_callback(lambda _: self._forget(key, in_flight))
+
+        in_flight.num_waiters += 1
+        try:
+            # the shield keeps one waiter being cancelled from cancelling the run for the others
+            return await asyncio.shield(in_flight.task)
+        finally:
+            in_flight.num_waiters -= 1
+            if in_flight.num_waiters == 0 and not in_flight.task.done():
+                in_flight.task.cancel()
+                self._forget(key, in_flight)
+
+    async def run_many(
+        self,
+        smis: Iterable[SublimationModelInput] | AsyncIterable[SublimationModelInput],
+        ordered: bool = True,
+        window: int | None = None,
+    ) -> AsyncIterator[tuple[SublimationModelInput, SublimationModelResult]]:
+        """
+        Runs the model on each input, from an iterable or an async iterable, and yields each input along with its
+        result, in the same order as the inputs, or as soon as each is done with ordered=False.  At most window
+        inputs are read ahead of the results, twice max_concurrency by default, so a long or endless stream of inputs
+        is run in constant memory.  A model that fails raises its exception here, and the models still running are
+        cancelled, as they are when the iteration is stopped early.
+        """
+
+        if window is None:
+            window = (
+                2 * self.max_concurrency if self.max_concurrency is not None else 64
+            )
+
+        if isinstance(smis, AsyncIterable):
+            inputs = aiter(smis)
+        else:
+            inputs = _async_iter(smis)
+
+        pending = collections.deque()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        smi = await anext(inputs)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.append((smi, asyncio.ensure_future(self.run(smi))))
+                if not pending:
+                    return
+
+                if ordered:
+                    smi, task = pending.popleft()
+                    yield smi, await task
+                    continue
+
+                await asyncio.wait(
+                    [task for _, task in pending], return_when=asyncio.FIRST_COMPLETED
+                )
+                done = [(smi, task) for smi, task in pending if task.done()]
+                for item in done:
+                    pending.remove(item)
+                for smi, task in done:
+                    yield smi, task.result()
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def close(self) -> None:
+        for in_flight in list(self._in_flight.values()):
+            in_flight.task.cancel()
+        if self._own_executor:
+            # waits for the models the workers have already started, off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.executor.shutdown(wait=True, cancel_futures=True)
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def _run_model(self, smi: SublimationModelInput) -> SublimationModelResult:
+        if self._slots is None:
+            return await run_sublimation_model_async(smi, executor=self.executor)
+        # models still waiting for a slot when cancelled are never sent to the executor
+        async with self._slots:
+            return await run_sublimation_model_async(smi, executor=self.executor)
+
+    def _forget(self, key: tuple, in_flight: _InFlightModel) -> None:
+        # a later run with the same input may already have replaced this one
+        if self._in_flight.get(key) is in_flight:
+            del self._in_flight[key]
+
+
+async def _async_iter(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
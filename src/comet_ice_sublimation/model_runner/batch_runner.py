@@ -0,0 +1,123 @@
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from comet_ice_sublimation.model_input.batch_input import *
+from comet_ice_sublimation.model_output.batch_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+from comet_ice_sublimation.model_runner.parallel_runner import default_num_workers
+
+# Models sent to the workers ahead of the one whose result is due next, per worker: enough to keep every worker busy
+# while one slow model holds up the output, without reading far ahead of the results
+batch_window_per_worker = 16
+
+
+def run_sublimation_model_batch(
+    input_rows: Iterable[BatchInputRow],
+    workers: int | None = 1,
+    window: int | None = None,
+) -> Iterator[BatchModelResult]:
+    """
+    Runs the model on each row as the rows are read, and yields the results in the same order as the rows.
+    Rows that could not be read, and models that fail, give a result with an error message, and the batch carries
+    on.  With more than one worker, at most window models are read ahead of the next result to be yielded, so a long
+    or endless stream of inputs is run in constant memory.
+    """
+
+    if workers is None:
+        workers = default_num_workers()
+
+    if workers == 1:
+        for input_row in input_rows:
+            yield _run_batch_row(input_row)
+        return
+
+    if window is None:
+        window = workers * batch_window_per_worker
+
+    # the input is read and sent to the workers on another thread, so that results are handed back as soon as they
+    # are done even while the next row of the input is slow to arrive; the queue holds the rows in input order, and
+    # blocks the reader once it holds window of them
+    in_flight = queue.Queue(maxsize=window)
+    stop = threading.Event()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reader = threading.Thread(
+            target=_submit_batch_rows,
+            args=(input_rows, executor, in_flight, stop),
+            daemon=True,
+        )
+        reader.start()
+        try:
+            while (item := in_flight.get()) is not _end_of_batch:
+                if isinstance(item, Exception):
+                    raise item
+                yield _batch_row_result(*item)
+        finally:
+            # don't run the rest if the caller stops early
+            stop.set()
+            while not in_flight.empty():
+                item = in_flight.get_nowait()
+                if isinstance(item, tuple) and item[1] is not None:
+                    item[1].cancel()
+
+
+# put in the queue after the last row, or after an exception raised while reading the rows
+_end_of_batch = object()
+
+
+def _submit_batch_rows(
+    input_rows: Iterable[BatchInputRow],
+    executor: ProcessPoolExecutor,
+    in_flight: queue.Queue,
+    stop: threading.Event,
+) -> None:
+    try:
+        for input_row in input_rows:
+            future = None
+            if input_row.smi is not None:
+                future = executor.submit(run_sublimation_model, input_row.smi)
+            if not _put_unless_stopped(in_flight, (input_row, future), stop):
+                if future is not None:
+                    future.cancel()
+                return
+    except Exception as e:
+        _put_unless_stopped(in_flight, e, stop)
+    _put_unless_stopped(in_flight, _end_of_batch, stop)
+
+
+def _put_unless_stopped(in_flight: queue.Queue, item, stop: threading.Event) -> bool:
+    # waits for room in the queue, and gives up if the batch is stopped in the meantime
+    while not stop.is_set():
+        try:
+            in_flight.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _run_batch_row(input_row: BatchInputRow) -> BatchModelResult:
+    if input_row.smi is None:
+        return BatchModelResult(input_row=input_row, smr=None, error=input_row.error)
+    try:
+        smr = run_sublimation_model(smi=input_row.smi)
+    except Exception as e:
+        return BatchModelResult(input_row=input_row, smr=None, error=_error_message(e))
+    return BatchModelResult(input_row=input_row, smr=smr, error=None)
+
+
+def _batch_row_result(
+    input_row: BatchInputRow, future: Future | None
+) -> BatchModelResult:
+    if future is None:
+        return BatchModelResult(input_row=input_row, smr=None, error=input_row.error)
+    try:
+        smr = future.result()
+    except Exception as e:
+        return BatchModelResult(input_row=input_row, smr=None, error=_error_message(e))
+    return BatchModelResult(input_row=input_row, smr=smr, error=None)
+
+
+def _error_message(e: Exception) -> str:
+    return str(e) or type(e).__name__
@@ -0,0 +1,37 @@
+from comet_ice_sublimation.model_cache.model_cache import *
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_multi_species_output import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+
+
+def run_sublimation_model_cached(
+    smi: SublimationModelInput, cache: SublimationModelCache
+) -> SublimationModelResult:
+    # look the result up in the cache, and only run the model if it isn't there
+    smr = cache.get(smi=smi)
+    if smr is None:
+        smr = run_sublimation_model(smi=smi)
+        cache.put(smi=smi, smr=smr)
+    return smr
+
+
+def run_sublimation_model_multi_species_cached(
+    smis: list[SublimationModelInput], cache: SublimationModelCache
+) -> SublimationModelMultiSpeciesResult:
+    # look every species up in the cache, and only run the ones that aren't there, still together
+    results = {}
+    for smi in smis:
+        smr = cache.get(smi=smi)
+        if smr is not None:
+            results[smi.species] = smr
+    missing = {smi.species: smi for smi in smis if smi.species not in results}
+    if missing:
+        smsr = run_sublimation_model_multi_species(smis=list(missing.values()))
+        for species, smr in smsr.results.items():
+            cache.put(smi=missing[species], smr=smr)
+            results[species] = smr
+    # in the order the species were given, whichever were cached
+    return SublimationModelMultiSpeciesResult(
+        results={smi.species: results[smi.species] for smi in smis}
+    )
@@ -0,0 +1,345 @@
+import functools
+import logging
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.energy_balance.energy_balance_table import *
+from comet_ice_sublimation.model_input.sublimation_model_fit_input import *
+from comet_ice_sublimation.model_output.sublimation_model_fit_output import *
+from comet_ice_sublimation.surface_geometry.surface_geometry import *
+
+# observations whose energy balance is solved together, bounding the memory of the (observation, latitude) arrays
+fit_chunk_size = 2048
+
+# largest change of the log of the absorbed flux in one step, until the target is bracketed
+_max_log_flux_step = 2.0
+
+
+def fit_sublimation_models(smfi: SublimationModelFitInput) -> SublimationModelFitResult:
+    """
+    Fits the parameter named by smfi to the target z_bar, or production rate, of every observation.
+    The visual albedo and heliocentric distance only enter the model through the absorbed flux, (1 - Av) / rh^2,
+    which z_bar increases with, so each fit is a search for the one absorbed flux giving its target: a secant step
+    on log z_bar against the log of the absorbed flux, turning into the Illinois method once the target is
+    bracketed.  The observations sharing a sub-solar latitude are evaluated together, on one latitude grid, and the
+    energy balance of each evaluation starts from the temperatures of the one before.
+    The active area needs no search, as it is the production rate over z_bar at the given parameters.
+    """
+
+    error = sublimation_model_fit_input_error(smfi)
+    if error is not None:
+        raise ValueError(error)
+    assert smfi.t_init_K is not None
+
+    (
+        visual_albedos,
+        infrared_albedos,
+        rh_aus,
+        sub_solar_latitudes,
+        z_bars,
+        production_rates,
+        active_areas_cm2,
+    ) = (
+        np.array(a, dtype=np.float64).ravel()
+        for a in np.broadcast_arrays(
+            *(
+                np.nan if a is None else np.asarray(a, dtype=np.float64)
+                for a in (
+                    smfi.visual_albedos,
+                    smfi.infrared_albedos,
+                    smfi.rh_aus,
+                    smfi.sub_solar_latitudes,
+                    smfi.z_bars,
+                    smfi.production_rates,
+                    smfi.active_areas_cm2,
+                )
+            )
+        )
+    )
+    shape = np.broadcast_shapes(
+        *(
+            np.shape(a)
+            for a in (
+                smfi.visual_albedos,
+                smfi.infrared_albedos,
+                smfi.rh_aus,
+                smfi.sub_solar_latitudes,
+                smfi.z_bars,
+                smfi.production_rates,
+                smfi.active_areas_cm2,
+            )
+            if a is not None
+        )
+    )
+
+    if smfi.parameter != FitParameter.active_area and smfi.z_bars is None:
+        z_bars = production_rates / active_areas_cm2
+
+    if smfi.energy_balance_table != EnergyBalanceTableMode.off:
+        solve = functools.partial(
+            solve_energy_balance_tabulated,
+            species=smfi.species,
+            newton_polish=smfi.energy_balance_table == EnergyBalanceTableMode.polish,
+            solver=smfi.solver,
+            tolerance=smfi.tolerance,
+        )
+    else:
+        solve = functools.partial(
+            solve_energy_balance_array,
+            species=smfi.species,
+            solver=smfi.solver,
+            tolerance=smfi.tolerance,
+        )
+
+    values = np.full(visual_albedos.shape, np.nan)
+    z_bar = np.full(visual_albedos.shape, np.nan)
+    num_fit_iterations = np.zeros(visual_albedos.shape, dtype=np.int64)
+    num_iterations = 0
+    for sub_solar_latitude in np.unique(sub_solar_latitudes):
+        grid = make_latitude_grid(
+            sub_solar_latitude=sub_solar_latitude,
+            num_latitude_gridpoints=smfi.num_latitude_gridpoints,
+        )
+        rows = np.flatnonzero(sub_solar_latitudes == sub_solar_latitude)
+        for start in range(0, rows.size, fit_chunk_size):
+            chunk = rows[start : start + fit_chunk_size]
+            forward = _ForwardModel(
+                solve=solve,
+                grid=grid,
+                infrared_albedos=infrared_albedos[chunk],
+                t_init_K=smfi.t_init_K,
+            )
+            if smfi.parameter == FitParameter.active_area:
+                chunk_z_bar = forward.z_bar(
+                    np.arange(chunk.size), visual_albedos[chunk], rh_aus[chunk]
+                )
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    chunk_values = production_rates[chunk] / chunk_z_bar
+                chunk_values[~(chunk_z_bar > 0)] = np.nan
+                chunk_iterations = np.ones(chunk.size, dtype=np.int64)
+            else:
+                chunk_values, chunk_z_bar, chunk_iterations = _fit_absorbed_flux(
+                    smfi=smfi,
+                    forward=forward,
+                    visual_albedos=visual_albedos[chunk],
+                    rh_aus=rh_aus[chunk],
+                    z_bars=z_bars[chunk],
+                )
+            values[chunk] = chunk_values
+            z_bar[chunk] = chunk_z_bar
+            num_fit_iterations[chunk] = chunk_iterations
+            num_iterations += forward.num_iterations
+
+    converged = np.isfinite(values)
+    if not np.all(converged):
+        logging.warning(
+            f"Fit of {smfi.parameter.value} failed for {np.count_nonzero(~converged)} of {converged.size} observations"
+        )
+    logging.info(
+        f"Fit {converged.size} observations in {int(num_fit_iterations.max(initial=0))} evaluations at most,"
+        f" {num_fit_iterations.mean() if converged.size else 0:.1f} on average"
+    )
+
+    return SublimationModelFitResult(
+        values=values.reshape(shape),
+        z_bar=z_bar.reshape(shape),
+        converged=converged.reshape(shape),
+        num_fit_iterations=num_fit_iterations.reshape(shape),
+        num_iterations=num_iterations,
+    )
+
+
+class _ForwardModel:
+    """
+    z_bar of a chunk of observations on one latitude grid, evaluated for any subset of its rows at once.  The
+    temperatures found at each row are kept to start its next evaluation from.  Rows where the energy balance does not
+    converge give a z_bar of nan, and are left out of the solve of the others.
+    """
+
+    def __init__(
+        self, solve, grid: LatitudeGrid, infrared_albedos: np.ndarray, t_init_K: float
+    ):
+        self._solve = solve
+        self.grid = grid
+        self.infrared_albedos = infrared_albedos
+        self.t_init_K = t_init_K
+        self.temps_K = np.full(
+            (infrared_albedos.size, grid.latitudes_rad.size), np.float64(t_init_K)
+        )
+        self.num_iterations = 0
+
+    def z_bar(
+        self, rows: np.ndarray, visual_albedos: np.ndarray, rh_aus: np.ndarray
+    ) -> np.ndarray:
+        z_bar = np.full(rows.size, np.nan)
+        solving = np.arange(rows.size)
+        while solving.size > 0:
+            incident_solar_flux = incident_solar_flux_array(
+                visual_albedo=visual_albedos[solving, np.newaxis],
+                rh_au=rh_aus[solving, np.newaxis],
+                average_projection_factors=self.grid.average_projection_factors,
+            )
+            try:
+                sublimation_results = self._solve(
+                    infrared_albedo=self.infrared_albedos[rows[solving], np.newaxis],
+                    incident_solar_flux=incident_solar_flux,
+                    t_init_K=self.temps_K[rows[solving]],
+                )
+            except EnergyBalanceConvergenceError as e:
+                # solve the rest again without the observations that failed
+                failed = np.unique(e.indices // self.grid.latitudes_rad.size)
+                solving = np.delete(solving, failed)
+                continue
+
+            self.num_iterations += int(sublimation_results.num_iterations.sum())
+            lit = incident_solar_flux > 0
+            self.temps_K[rows[solving]] = np.where(
+                lit, sublimation_results.t_K, self.temps_K[rows[solving]]
+            )
+            # the same integration over sin(latitude) as run_sublimation_model
+            z_bar[solving] = (
+                np.trapezoid(
+                    sublimation_results.z,
+                    dx=np.float64(self.grid.delta_sin_latitude),
+                    axis=-1,
+                )
+                / 2.0
+            )
+            break
+        return z_bar
+
+
+def _fit_absorbed_flux(
+    smfi: SublimationModelFitInput,
+    forward: _ForwardModel,
+    visual_albedos: np.ndarray,
+    rh_aus: np.ndarray,
+    z_bars: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # fits the visual albedo or heliocentric distance of every row of the chunk to its z_bar, by a search on the log of
+    # the absorbed flux; returns the fitted values, nan where the fit failed, the z_bar at them, and the number of
+    # evaluations of each row
+    n = z_bars.size
+    fit_albedo = smfi.parameter == FitParameter.visual_albedo
+
+    # the largest absorbed flux reachable, at an albedo of 0, bounds the search for the albedo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_max = -2.0 * np.log(rh_aus) if fit_albedo else np.full(n, np.inf)
+        x = np.minimum(np.log((1.0 - visual_albedos) / rh_aus**2), x_max)
+        log_targets = np.log(z_bars)
+
+    def parameters(rows: np.ndarray, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if fit_albedo:
+            # at x_max exactly, so that the albedo is 0 rather than off by rounding
+            return (
+                np.where(
+                    x >= x_max[rows], 0.0, -np.expm1(x + 2.0 * np.log(rh_aus[rows]))
+                ),
+                rh_aus[rows],
+            )
+        return visual_albedos[rows], np.sqrt(1.0 - visual_albedos[rows]) * np.exp(
+            -x / 2.0
+        )
+
+    values = np.full(n, np.nan)
+    z_bar = np.full(n, np.nan)
+    num_fit_iterations = np.zeros(n, dtype=np.int64)
+    g = np.full(n, np.nan)
+    # the previous point, for secant steps before the target is bracketed
+    x_previous = np.full(n, np.nan)
+    g_previous = np.full(n, np.nan)
+    # the bracket, with g below 0 at x_low and above at x_high, and the end last moved for the Illinois method
+    x_low = np.full(n, -np.inf)
+    g_low = np.full(n, np.nan)
+    x_high = np.full(n, np.inf)
+    g_high = np.full(n, np.nan)
+    last_moved = np.zeros(n, dtype=np.int8)
+
+    tolerance = np.log1p(smfi.fit_rtol)
+    active = np.flatnonzero(np.isfinite(x) & np.isfinite(log_targets))
+    for iteration in range(smfi.max_fit_iterations):
+        if active.size == 0:
+            break
+        if iteration > 0:
+            x_next = _next_log_flux(
+                x=x[active],
+                g=g[active],
+                x_previous=x_previous[active],
+                g_previous=g_previous[active],
+                x_low=x_low[active],
+                g_low=g_low[active],
+                x_high=x_high[active],
+                g_high=g_high[active],
+                x_max=x_max[active],
+            )
+            x_previous[active], g_previous[active] = x[active], g[active]
+            x[active] = x_next
+
+        visual_albedo, rh_au = parameters(active, x[active])
+        active_z_bar = forward.z_bar(active, visual_albedo, rh_au)
+        num_fit_iterations[active] += 1
+        with np.errstate(divide="ignore"):
+            active_g = np.log(active_z_bar) - log_targets[active]
+        g[active] = active_g
+
+        # move the end of the bracket on the side of the new point, halving the other end's residual if the same
+        # end moved last time
+        below = active[active_g < 0]
+        above = active[active_g > 0]
+        g_high[below[last_moved[below] == -1]] /= 2.0
+        g_low[above[last_moved[above] == 1]] /= 2.0
+        x_low[below], g_low[below], last_moved[below] = x[below], g[below], -1
+        x_high[above], g_high[above], last_moved[above] = x[above], g[above], 1
+
+        # z_bar is only as precise as the energy balance, so a fit is also done once the bracket pins the absorbed
+        # flux down to within the tolerance, even if noise in z_bar keeps it from coming any closer to the target
+        done = (np.abs(active_g) <= tolerance) | (
+            x_high[active] - x_low[active] <= tolerance
+        )
+        values[active[done]] = visual_albedo[done] if fit_albedo else rh_au[done]
+        z_bar[active[done]] = active_z_bar[done]
+
+        # the energy balance failed, or the albedo is already 0 and the target is still out of reach
+        failed = np.isnan(active_z_bar) | (
+            (active_g < 0) & (x[active] >= x_max[active])
+        )
+        z_bar[active[failed & ~done]] = active_z_bar[failed & ~done]
+        active = active[~done & ~failed]
+
+    # the last z_bar of the fits that ran out of iterations
+    z_bar[active] = np.exp(g[active] + log_targets[active])
+    return values, z_bar, num_fit_iterations
+
+
+def _next_log_flux(
+    x: np.ndarray,
+    g: np.ndarray,
+    x_previous: np.ndarray,
+    g_previous: np.ndarray,
+    x_low: np.ndarray,
+    g_low: np.ndarray,
+    x_high: np.ndarray,
+    g_high: np.ndarray,
+    x_max: np.ndarray,
+) -> np.ndarray:
+    # the next log absorbed flux of each fit, from its last residual g = log(z_bar / target) at x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # a secant step, along a slope of 1 where there is no usable previous point, as z_bar goes as the absorbed flux
+        # once most of it goes into sublimation
+        slope = (g - g_previous) / (x - x_previous)
+        slope = np.where(np.isfinite(slope) & (slope > 0), slope, 1.0)
+        step = np.where(np.isfinite(g), -g / slope, _max_log_flux_step)
+        unbracketed = np.minimum(
+            x + np.clip(step, -_max_log_flux_step, _max_log_flux_step), x_max
+        )
+
+        # regula falsi within the bracket, or bisection where an end's residual is infinite, with z_bar zero there
+        bracketed = np.isfinite(x_low) & np.isfinite(x_high)
+        falsi = x_low - g_low * (x_high - x_low) / (g_high - g_low)
+        falsi = np.where(
+            np.isfinite(falsi) & (falsi > x_low) & (falsi < x_high),
+            falsi,
+            (x_low + x_high) / 2.0,
+        )
+    return np.where(bracketed, falsi, unbracketed)
@@ -0,0 +1,48 @@
+import dataclasses
+import logging
+from collections.abc import Iterable, Iterator
+
+from comet_ice_sublimation.energy_balance.continuation import *
+from comet_ice_sublimation.model_input.ephemeris import *
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+
+
+def run_light_curve(
+    smi: SublimationModelInput, ephemeris: Iterable[EphemerisRow]
+) -> Iterator[tuple[EphemerisRow, SublimationModelResult]]:
+    """
+    Runs the model described by smi at every epoch of the ephemeris, with the heliocentric distance and sub-solar
+    latitude of smi replaced by those of the epoch, and yields each result as soon as it is done.
+    Every epoch after the first starts the energy balance from the temperature profile of the one before it, which
+    is the only state kept between epochs, so ephemerides of any length run in constant memory.
+    """
+
+    t_init_profile = None
+    num_epochs = 0
+    num_iterations = 0
+    for row in ephemeris:
+        epoch_smi = dataclasses.replace(
+            smi,
+            rh_au=row.rh_au,
+            # latitudes are measured positive in the hemisphere facing the sun, so the model only depends on the
+            # size of the sub-solar latitude, and the profile carried forward stays continuous through an equinox
+            sub_solar_latitude=abs(row.sub_solar_latitude),
+            return_profile=True,
+        )
+        smr = run_sublimation_model(smi=epoch_smi, t_init_profile=t_init_profile)
+        t_init_profile = TemperatureProfile(
+            latitudes_rad=smr.latitudes_rad, temps_K=smr.temps_K
+        )
+
+        num_epochs += 1
+        num_iterations += smr.num_iterations or 0
+
+        if not smi.return_profile:
+            smr = dataclasses.replace(smr, latitudes_rad=None, zs=None, temps_K=None)
+        yield row, smr
+
+    logging.info(
+        f"Light curve of {num_epochs} epochs used {num_iterations} energy balance iterations"
+    )
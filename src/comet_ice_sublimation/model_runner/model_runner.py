@@ -1,65 +1,466 @@
+import dataclasses
+import functools
 import logging
 import math
 
-from comet_ice_sublimation.comet_ice_sublimation import *
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.continuation import *
 from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.energy_balance.energy_balance_table import *
+from comet_ice_sublimation.energy_balance.sensitivities import *
+from comet_ice_sublimation.energy_balance.unique_problems import *
 from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_multi_species_output import *
 from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.surface_geometry.latitude_quadrature import *
 from comet_ice_sublimation.surface_geometry.surface_geometry import *
 
+# the adaptive quadrature stops splitting panels once there are this many, and logs a warning if the estimated error
+# is still above quadrature_rtol
+adaptive_quadrature_max_panels = 1024
 
-def run_sublimation_model(smi: SublimationModelInput) -> SublimationModelResult:
+# number of latitudes named in the message when the energy balance does not converge
+failed_latitudes_listed = 8
 
-    # sub_solar_latitude = 0  ---> equator along sun-comet axis, north pole of comet perpendicular to sun-comet axis
-    # sub_solar_latitude = 90 ---> equator perpendicular to sun-comet axis, north pole of comet pointed at sun
 
-    # marks the 'arctic circle' latitude (in radians) of the comet:
-    #  above this latitude, permanent sunlight during a rotation
-    #  below this negative latitude, permanent darkness during a rotation
-    arctic_latitude_rad = (90 - smi.sub_solar_latitude) * math.pi / 180
+def run_sublimation_model(
+    smi: SublimationModelInput, t_init_profile: TemperatureProfile | None = None
+) -> SublimationModelResult:
+    """
+    Runs the model described by smi.  If t_init_profile is given, such as the temperatures of the same comet at a
+    nearby point of its orbit, the energy balance at each latitude starts from it instead of from smi.t_init_K.
+    If the energy balance does not converge, the EnergyBalanceConvergenceError raised gives the latitudes where it
+    did not.
+    """
 
-    # We are using a spherical coordinate system with the z-axis rotated so that the sub_solar_latitude falls on the sun-comet axis.
-    # Positive latitudes are taken by convention to be in the hemisphere pointed toward the sun.
+    t_init_K = smi.t_init_K
+    assert t_init_K is not None
 
-    # sample the latitudes by creating a linear space [-1, 1] and mapping that to latitudes
-    # this samples the equator more than the poles
-    sin_latitudes, delta_sin_latitude = np.linspace(
-        start=-1, stop=1, num=smi.num_latitude_gridpoints, endpoint=True, retstep=True
+    # the residuals take one more evaluation of the energy balance at every latitude, so they are only computed
+    # when they will be returned or logged
+    with_telemetry = smi.return_telemetry or logging.getLogger().isEnabledFor(
+        logging.INFO
     )
-    # latitudes in radians
-    latitudes = np.arcsin(sin_latitudes)
-    cos_latitudes = np.cos(latitudes)
-    tan_latitudes = np.tan(latitudes)
 
-    # see average_projection_factor function for explanation of these values
-    average_projection_factors = [
-        average_projection_factor(arctic_latitude_rad, lat, sin_lat, cos_lat, tan_lat)
-        for lat, sin_lat, cos_lat, tan_lat in zip(
-            latitudes, sin_latitudes, cos_latitudes, tan_latitudes
+    if smi.quadrature == LatitudeQuadrature.trapezoid:
+        grid = make_latitude_grid(
+            sub_solar_latitude=smi.sub_solar_latitude,
+            num_latitude_gridpoints=smi.num_latitude_gridpoints,
+        )
+        (
+            zbar,
+            zbar_error,
+            latitudes,
+            sublimation_results,
+            residuals,
+            num_iterations,
+            num_iterations_saved,
+            solve_counts,
+            sensitivities,
+        ) = _integrate_trapezoid(
+            smi=smi,
+            grid=grid,
+            t_init_K=_initial_temperatures(
+                t_init_K, t_init_profile, grid.latitudes_rad
+            ),
+            with_residuals=with_telemetry,
+        )
+    else:
+        (
+            zbar,
+            zbar_error,
+            latitudes,
+            sublimation_results,
+            residuals,
+            num_iterations,
+            num_iterations_saved,
+            solve_counts,
+            sensitivities,
+        ) = _integrate_panels(
+            smi=smi,
+            t_init_K=t_init_K,
+            t_init_profile=t_init_profile,
+            with_residuals=with_telemetry,
         )
-    ]
 
-    t_init_K = smi.t_init_K
-    assert t_init_K is not None
+    return _model_result(
+        smi=smi,
+        zbar=zbar,
+        zbar_error=zbar_error,
+        latitudes=latitudes,
+        sublimation_results=sublimation_results,
+        residuals=residuals,
+        num_iterations=num_iterations,
+        num_iterations_saved=num_iterations_saved,
+        solve_counts=solve_counts,
+        sensitivities=sensitivities,
+    )
 
-    sublimation_results = [
-        converge_energy_balance(
-            smi=smi, average_projection_factor=apf, t_init_K=t_init_K
+
+def run_sublimation_model_multi_species(
+    smis: list[SublimationModelInput],
+) -> SublimationModelMultiSpeciesResult:
+    """
+    Gives the same results as calling run_sublimation_model on every input, for models of different species that are
+    otherwise the same but for their starting temperatures, such as the H2O, CO2, and CO of one comet at one point of
+    its orbit.  With the trapezoid rule, the latitude grid and the incident flux on it are worked out once, and the
+    energy balance of each species is solved on them.  The Gauss-Kronrod panels of the other quadratures are placed
+    by the integrand, which depends on the species, so those models are run one at a time.
+    """
+
+    if not smis:
+        raise ValueError("At least one species must be given!")
+    if len({smi.species for smi in smis}) != len(smis):
+        raise ValueError("Each species can only be run once!")
+    first = smis[0]
+    if any(
+        dataclasses.replace(smi, species=first.species, t_init_K=first.t_init_K)
+        != first
+        for smi in smis
+    ):
+        raise ValueError(
+            "Models of several species must differ only in their species and starting temperatures!"
         )
-        for apf in average_projection_factors
-    ]
 
-    # sublimation rate as a function of latitude
-    z = np.array([x.z for x in sublimation_results])
+    if first.quadrature != LatitudeQuadrature.trapezoid:
+        return SublimationModelMultiSpeciesResult(
+            results={smi.species: run_sublimation_model(smi=smi) for smi in smis}
+        )
 
-    temperatures = np.array([x.t_K for x in sublimation_results])
+    grid = make_latitude_grid(
+        sub_solar_latitude=first.sub_solar_latitude,
+        num_latitude_gridpoints=first.num_latitude_gridpoints,
+    )
+    # the incident flux depends on the visual albedo and heliocentric distance, but not on the species
+    incident_solar_flux = incident_solar_flux_array(
+        visual_albedo=first.visual_albedo,
+        rh_au=first.rh_au,
+        average_projection_factors=grid.average_projection_factors,
+    )
 
-    for l, ti in zip(latitudes, temperatures):
-        logging.info(f"Lat: {l*180/np.pi:6.4f}\tT (K): {ti:6.4f}")
+    results = {}
+    for smi in smis:
+        assert smi.t_init_K is not None
+        (
+            zbar,
+            zbar_error,
+            latitudes,
+            sublimation_results,
+            residuals,
+            num_iterations,
+            num_iterations_saved,
+            solve_counts,
+            sensitivities,
+        ) = _integrate_trapezoid(
+            smi=smi,
+            grid=grid,
+            t_init_K=smi.t_init_K,
+            with_residuals=smi.return_telemetry
+            or logging.getLogger().isEnabledFor(logging.INFO),
+            incident_solar_flux=incident_solar_flux,
+        )
+        results[smi.species] = _model_result(
+            smi=smi,
+            zbar=zbar,
+            zbar_error=zbar_error,
+            latitudes=latitudes,
+            sublimation_results=sublimation_results,
+            residuals=residuals,
+            num_iterations=num_iterations,
+            num_iterations_saved=num_iterations_saved,
+            solve_counts=solve_counts,
+            sensitivities=sensitivities,
+        )
+
+    return SublimationModelMultiSpeciesResult(results=results)
+
+
+def run_sublimation_models_vectorized(
+    smis: list[SublimationModelInput],
+) -> list[SublimationModelResult]:
+    """
+    Gives the same results as calling run_sublimation_model on every input, in the same order, but solves the energy
+    balance of all of the models that share a latitude grid and solver settings at once, with one row per model.
+    This pays off for many small models, where the cost of each run is mostly the overhead of the array operations
+    rather than the work on each latitude, and any latitudes of the group with the same infrared albedo and incident
+    flux, such as those of duplicate models, are solved only once.  Models using continuation or Gauss-Kronrod
+    quadrature are run one at a time.  If the energy balance of any model of a group fails, the
+    EnergyBalanceConvergenceError raised has the message run_sublimation_model gives for the first of them, and the
+    positions in smis of every model of the group that failed as its indices.
+    """
+
+    results: dict[int, SublimationModelResult] = {}
+
+    # models can share a solve when everything but their albedos and heliocentric distance is the same
+    groups: dict[tuple, list[int]] = {}
+    for i, smi in enumerate(smis):
+        if smi.quadrature != LatitudeQuadrature.trapezoid or smi.continuation:
+            try:
+                results[i] = run_sublimation_model(smi=smi)
+            except EnergyBalanceConvergenceError as e:
+                raise EnergyBalanceConvergenceError(
+                    indices=np.array([i]),
+                    message=e.args[0],
+                    latitudes_rad=e.latitudes_rad,
+                ) from e
+            continue
+        key = (
+            smi.species,
+            smi.sub_solar_latitude,
+            smi.num_latitude_gridpoints,
+            smi.t_init_K,
+            smi.energy_balance_table,
+            smi.solver,
+            smi.tolerance,
+        )
+        groups.setdefault(key, []).append(i)
+
+    with_logging = logging.getLogger().isEnabledFor(logging.INFO)
+    for indices in groups.values():
+        group_smis = [smis[i] for i in indices]
+        smi = group_smis[0]
+        with_telemetry = with_logging or any(s.return_telemetry for s in group_smis)
+
+        grid = make_latitude_grid(
+            sub_solar_latitude=smi.sub_solar_latitude,
+            num_latitude_gridpoints=smi.num_latitude_gridpoints,
+        )
+
+        # dimensions (model, latitude)
+        incident_solar_flux = incident_solar_flux_array(
+            visual_albedo=np.array([s.visual_albedo for s in group_smis])[
+                :, np.newaxis
+            ],
+            rh_au=np.array([s.rh_au for s in group_smis])[:, np.newaxis],
+            average_projection_factors=grid.average_projection_factors,
+        )
+        infrared_albedo = np.array([s.infrared_albedo for s in group_smis])[
+            :, np.newaxis
+        ]
+        try:
+            sublimation_results, _, solved_indices = _solve_energy_balance(
+                smi=smi,
+                infrared_albedo=infrared_albedo,
+                incident_solar_flux=incident_solar_flux,
+                t_init_K=smi.t_init_K,
+            )
+        except EnergyBalanceConvergenceError as e:
+            # the failed points are rows of models and columns of latitudes, and the message is the one the first
+            # model that failed would give on its own
+            rows, columns = np.divmod(e.indices, grid.latitudes_rad.size)
+            failed_rows = np.unique(rows)
+            first_error = _latitude_convergence_error(
+                e,
+                indices=columns[rows == failed_rows[0]],
+                latitudes_rad=grid.latitudes_rad,
+            )
+            raise EnergyBalanceConvergenceError(
+                indices=np.array([indices[row] for row in failed_rows]),
+                message=first_error.args[0],
+                latitudes_rad=first_error.latitudes_rad,
+            ) from e
+
+        residuals = None
+        if with_telemetry:
+            residuals = _relative_residuals(
+                species=smi.species,
+                infrared_albedo=np.broadcast_to(
+                    infrared_albedo, incident_solar_flux.shape
+                ),
+                incident_solar_flux=incident_solar_flux,
+                t_K=sublimation_results.t_K,
+            )
 
+        # each distinct problem is counted against the first model that has it
+        row_num_solves = np.bincount(
+            solved_indices // grid.latitudes_rad.size, minlength=len(group_smis)
+        )
+        for row, (i, model_smi) in enumerate(zip(indices, group_smis)):
+            row_results = SublimationRateArrayResult(
+                z=sublimation_results.z[row],
+                t_K=sublimation_results.t_K[row],
+                num_iterations=sublimation_results.num_iterations[row],
+                num_clamped_steps=sublimation_results.num_clamped_steps[row],
+            )
+            zbar, zbar_error = _trapezoid_z_bar(grid, row_results.z)
+            results[i] = _model_result(
+                smi=model_smi,
+                zbar=zbar,
+                zbar_error=zbar_error,
+                latitudes=grid.latitudes_rad,
+                sublimation_results=row_results,
+                residuals=None if residuals is None else residuals[row],
+                num_iterations=int(row_results.num_iterations.sum()),
+                num_iterations_saved=None,
+                solve_counts=(
+                    int(np.count_nonzero(incident_solar_flux[row] > 0)),
+                    int(row_num_solves[row]),
+                ),
+                sensitivities=(
+                    _trapezoid_z_bar_sensitivities(
+                        smi=model_smi, grid=grid, t_K=row_results.t_K
+                    )
+                    if model_smi.return_sensitivities
+                    else None
+                ),
+            )
+
+    return [results[i] for i in range(len(smis))]
+
+
+def _integrate_trapezoid(
+    smi: SublimationModelInput,
+    grid: LatitudeGrid,
+    t_init_K: float | np.ndarray,
+    with_residuals: bool = False,
+    incident_solar_flux: np.ndarray | None = None,
+):
+    # the trapezoid rule counterpart of _integrate_panels, returning the same values, with the energy balance solved
+    # at all latitudes of the grid at once; the incident flux on the grid is worked out from smi unless given
+    sublimation_results, num_iterations_saved, residuals, solve_counts = (
+        _solve_latitudes(
+            smi=smi,
+            latitudes_rad=grid.latitudes_rad,
+            average_projection_factors=grid.average_projection_factors,
+            t_init_K=t_init_K,
+            with_residuals=with_residuals,
+            incident_solar_flux=incident_solar_flux,
+        )
+    )
+
+    zbar, zbar_error = _trapezoid_z_bar(grid, sublimation_results.z)
+    sensitivities = None
+    if smi.return_sensitivities:
+        sensitivities = _trapezoid_z_bar_sensitivities(
+            smi=smi, grid=grid, t_K=sublimation_results.t_K
+        )
+    return (
+        zbar,
+        zbar_error,
+        grid.latitudes_rad,
+        sublimation_results,
+        residuals,
+        int(sublimation_results.num_iterations.sum()),
+        num_iterations_saved,
+        solve_counts,
+        sensitivities,
+    )
+
+
+def _trapezoid_z_bar(
+    grid: LatitudeGrid, z: np.ndarray
+) -> tuple[np.float64, np.float64]:
     # integrate over the sine-of-latitude space from -1 to 1 - so divide by the length of the interval, 2,
     # for the average value
-    zbar = np.float64(np.trapezoid(z, dx=np.float64(delta_sin_latitude)) / 2.0)
+    zbar = np.float64(np.trapezoid(z, dx=np.float64(grid.delta_sin_latitude)) / 2.0)
+
+    # the error of the trapezoid rule goes as the square of the spacing, so comparing with the rule on every
+    # other latitude estimates it
+    coarse = np.unique(np.r_[0 : z.size : 2, z.size - 1])
+    coarse_zbar = np.trapezoid(z[coarse], x=grid.sin_latitudes[coarse]) / 2.0
+    return zbar, np.float64(abs(zbar - coarse_zbar) / 3.0)
+
+
+def _z_bar_sensitivities(
+    smi: SublimationModelInput,
+    latitudes_rad: np.ndarray,
+    average_projection_factors: np.ndarray,
+    t_K: np.ndarray,
+    integrate,
+) -> ZBarSensitivities:
+    # differentiates the solution at each latitude, and integrates the derivatives with integrate, which takes values
+    # at the latitudes to their average over the surface as z_bar is
+    sensitivities = sublimation_rate_sensitivities(
+        species=smi.species,
+        visual_albedo=smi.visual_albedo,
+        infrared_albedo=smi.infrared_albedo,
+        rh_au=smi.rh_au,
+        incident_solar_flux=incident_solar_flux_array(
+            visual_albedo=smi.visual_albedo,
+            rh_au=smi.rh_au,
+            average_projection_factors=average_projection_factors,
+        ),
+        incident_solar_flux_sub_solar_latitude_derivative=incident_solar_flux_array(
+            visual_albedo=smi.visual_albedo,
+            rh_au=smi.rh_au,
+            average_projection_factors=average_projection_factor_sub_solar_latitude_derivative_array(
+                sub_solar_latitude=smi.sub_solar_latitude,
+                latitudes_rad=latitudes_rad,
+            ),
+        ),
+        t_K=t_K,
+    )
+    return ZBarSensitivities(
+        **{
+            name: np.float64(integrate(derivatives))
+            for name, derivatives in sensitivities.items()
+        }
+    )
+
+
+def _trapezoid_z_bar_sensitivities(
+    smi: SublimationModelInput, grid: LatitudeGrid, t_K: np.ndarray
+) -> ZBarSensitivities:
+    # the grid doesn't move with the sub-solar latitude, so these are the exact derivatives of the trapezoid rule
+    return _z_bar_sensitivities(
+        smi=smi,
+        latitudes_rad=grid.latitudes_rad,
+        average_projection_factors=grid.average_projection_factors,
+        t_K=t_K,
+        integrate=lambda values: np.trapezoid(
+            values, dx=np.float64(grid.delta_sin_latitude)
+        )
+        / 2.0,
+    )
+
+
+def _model_result(
+    smi: SublimationModelInput,
+    zbar: np.float64,
+    zbar_error: np.float64,
+    latitudes: np.ndarray,
+    sublimation_results: SublimationRateArrayResult,
+    residuals: np.ndarray | None,
+    num_iterations: int,
+    num_iterations_saved: int | None,
+    solve_counts: tuple[int, int],
+    sensitivities: ZBarSensitivities | None = None,
+) -> SublimationModelResult:
+    # logs the solution at each latitude, and keeps the profiles and telemetry only if smi asks for them; solve_counts
+    # are the numbers of sunlit points where the energy balance was solved and of distinct problems among them
+
+    # sublimation rate and temperature as a function of latitude
+    z = sublimation_results.z
+    temperatures = sublimation_results.t_K
+
+    for l, ti in zip(latitudes, temperatures):
+        logging.info(f"Lat: {l*180/np.pi:6.4f}\tT (K): {ti:6.4f}")
+
+    if num_iterations_saved is not None:
+        logging.info(
+            f"Warm start used {num_iterations} iterations, saving about {num_iterations_saved}"
+        )
+
+    num_problems, num_solves = solve_counts
+    if num_solves < num_problems:
+        logging.info(
+            f"Solved {num_solves} distinct energy balance problems for {num_problems} sunlit latitudes"
+            f" ({num_problems / max(num_solves, 1):.2f}x deduplication)"
+        )
+
+    telemetry = None
+    if residuals is not None:
+        telemetry = SolverTelemetry(
+            latitudes_rad=latitudes,
+            num_iterations=sublimation_results.num_iterations,
+            residuals=residuals,
+            num_clamped_steps=sublimation_results.num_clamped_steps,
+        )
+        logging.info(telemetry.summary())
+        if not smi.return_telemetry:
+            telemetry = None
+
     zlog = np.log10(zbar)
 
     # Set these to None if the user isn't interested in them
@@ -74,4 +475,334 @@ def run_sublimation_model(smi: SublimationModelInput) -> SublimationModelResult:
         latitudes_rad=latitudes,
         zs=z,
         temps_K=temperatures,
+        num_iterations=num_iterations,
+        num_iterations_saved=num_iterations_saved,
+        z_bar_error=zbar_error,
+        num_energy_balance_problems=num_problems,
+        num_energy_balance_solves=num_solves,
+        telemetry=telemetry,
+        sensitivities=sensitivities,
+    )
+
+
+def _initial_temperatures(
+    t_init_K: float, t_init_profile: TemperatureProfile | None, latitudes: np.ndarray
+) -> float | np.ndarray:
+    if t_init_profile is None:
+        return t_init_K
+    return t_init_profile.initial_temperatures(latitudes, t_init_K)
+
+
+def _solve_latitudes(
+    smi: SublimationModelInput,
+    latitudes_rad: np.ndarray,
+    average_projection_factors: np.ndarray,
+    t_init_K: float | np.ndarray,
+    with_residuals: bool = False,
+    incident_solar_flux: np.ndarray | None = None,
+) -> tuple[SublimationRateArrayResult, int | None, np.ndarray | None, tuple[int, int]]:
+    # solves the energy balance at every latitude by the method chosen in smi, along with the estimated number of
+    # iterations saved by continuation, if it was used, the relative residuals at the final temperatures if
+    # asked for, and the number of sunlit latitudes along with the number of distinct problems solved for them;
+    # the incident flux, if already known, such as for another species, needn't be worked out again
+
+    flux = (
+        incident_solar_flux
+        if incident_solar_flux is not None
+        else incident_solar_flux_array(
+            visual_albedo=smi.visual_albedo,
+            rh_au=smi.rh_au,
+            average_projection_factors=average_projection_factors,
+        )
+    )
+
+    try:
+        sublimation_results, num_iterations_saved, solved_indices = (
+            _solve_energy_balance(
+                smi=smi,
+                infrared_albedo=smi.infrared_albedo,
+                incident_solar_flux=flux,
+                t_init_K=t_init_K,
+            )
+        )
+    except EnergyBalanceConvergenceError as e:
+        raise _latitude_convergence_error(
+            e, indices=e.indices, latitudes_rad=latitudes_rad
+        ) from e
+
+    residuals = None
+    if with_residuals:
+        residuals = _relative_residuals(
+            species=smi.species,
+            infrared_albedo=smi.infrared_albedo,
+            incident_solar_flux=flux,
+            t_K=sublimation_results.t_K,
+        )
+
+    solve_counts = (int(np.count_nonzero(flux > 0)), solved_indices.size)
+    return sublimation_results, num_iterations_saved, residuals, solve_counts
+
+
+def _latitude_convergence_error(
+    e: EnergyBalanceConvergenceError, indices: np.ndarray, latitudes_rad: np.ndarray
+) -> EnergyBalanceConvergenceError:
+    # e for a model whose points at the flat indices of latitudes_rad failed, listing their latitudes in the message
+    failed_latitudes_rad = np.sort(np.ravel(latitudes_rad)[indices])
+    listed = ", ".join(
+        f"{l:.4f}" for l in np.degrees(failed_latitudes_rad[:failed_latitudes_listed])
+    )
+    if failed_latitudes_rad.size > failed_latitudes_listed:
+        listed += f", ... ({failed_latitudes_rad.size} in all)"
+    return EnergyBalanceConvergenceError(
+        indices=indices,
+        message=f"{e.args[0].rstrip('.')} at latitudes {listed} degrees.",
+        latitudes_rad=failed_latitudes_rad,
+    )
+
+
+def _relative_residuals(
+    species: MolecularSpecies,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_K: np.ndarray,
+) -> np.ndarray:
+    # |net flux / incident flux| at the temperatures t_K, nan where there is no sunlight; an array of infrared
+    # albedos has the shape of incident_solar_flux
+    residuals = np.full(np.shape(incident_solar_flux), np.nan)
+    lit = incident_solar_flux > 0
+    ebr = energy_balance_residual_array(
+        species=species,
+        infrared_albedo=(
+            np.asarray(infrared_albedo)[lit]
+            if np.ndim(infrared_albedo)
+            else infrared_albedo
+        ),
+        incident_solar_flux=incident_solar_flux[lit],
+        t_K=t_K[lit],
+    )
+    residuals[lit] = np.abs(ebr.energy_balance_flux / incident_solar_flux[lit])
+    return residuals
+
+
+def _solve_energy_balance(
+    smi: SublimationModelInput,
+    infrared_albedo: float | np.ndarray,
+    incident_solar_flux: np.ndarray,
+    t_init_K: float | np.ndarray,
+) -> tuple[SublimationRateArrayResult, int | None, np.ndarray]:
+    # the infrared albedo is passed separately from smi, so that models with different albedos can be solved at once;
+    # also returns the flat indices of the points whose problems were solved, one for each distinct problem
+    if smi.energy_balance_table != EnergyBalanceTableMode.off:
+        sublimation_results, solved_indices = solve_unique_energy_balance_problems(
+            functools.partial(
+                solve_energy_balance_tabulated,
+                species=smi.species,
+                newton_polish=smi.energy_balance_table == EnergyBalanceTableMode.polish,
+                solver=smi.solver,
+                tolerance=smi.tolerance,
+            ),
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_init_K=t_init_K,
+        )
+        return sublimation_results, None, solved_indices
+
+    if not smi.continuation:
+        sublimation_results, solved_indices = solve_unique_energy_balance_problems(
+            functools.partial(
+                solve_energy_balance_array,
+                species=smi.species,
+                solver=smi.solver,
+                tolerance=smi.tolerance,
+            ),
+            infrared_albedo=infrared_albedo,
+            incident_solar_flux=incident_solar_flux,
+            t_init_K=t_init_K,
+        )
+        return sublimation_results, None, solved_indices
+
+    # continuation warm starts each latitude from its neighbour, so every sunlit latitude is solved
+
+    sublimation_results, cold_start_iterations = solve_energy_balance_continuation(
+        species=smi.species,
+        infrared_albedo=infrared_albedo,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+        solver=smi.solver,
+        tolerance=smi.tolerance,
+    )
+    num_iterations_saved = int(
+        round(
+            cold_start_iterations.estimate(sublimation_results.t_K).sum()
+            - sublimation_results.num_iterations.sum()
+        )
+    )
+    return (
+        sublimation_results,
+        num_iterations_saved,
+        np.flatnonzero(np.ravel(incident_solar_flux) > 0),
+    )
+
+
+def _integrate_panels(
+    smi: SublimationModelInput,
+    t_init_K: float,
+    t_init_profile: TemperatureProfile | None,
+    with_residuals: bool = False,
+):
+    """
+    Integrates the sublimation rate over the sunlit latitudes with Gauss-Kronrod panels, either a fixed number of
+    them or split adaptively.  Returns z_bar and its estimated error, the latitudes of the nodes in increasing order
+    with the energy balance solutions and residuals there, the iteration counts, and the numbers of
+    energy balance problems posed and of distinct ones solved, over every panel integrated.  Also returns the
+    sensitivities of z_bar if smi asks for them.  The panels move with the sub-solar latitude, but z is zero at the
+    edge of the sunlit latitudes and continuous across the other panel edges, so the panel rule on the derivatives at
+    the nodes approximates the derivative of the integral as closely as it does the integral.
+    """
+
+    edges = sunlit_latitude_breakpoints(smi.sub_solar_latitude)
+    if smi.quadrature == LatitudeQuadrature.gauss_kronrod:
+        lower, upper = split_panels(
+            edges,
+            num_panels=max(1, round(smi.num_latitude_gridpoints / num_panel_nodes)),
+        )
+    else:
+        lower, upper = edges[:-1], edges[1:]
+
+    # the panels integrated so far, and the ones waiting to be
+    panel_lower = np.empty(0)
+    panel_upper = np.empty(0)
+    panel_integrals = np.empty(0)
+    panel_errors = np.empty(0)
+    panel_latitudes = np.empty((0, num_panel_nodes))
+    panel_zs = np.empty((0, num_panel_nodes))
+    panel_temps_K = np.empty((0, num_panel_nodes))
+    panel_num_iterations = np.empty((0, num_panel_nodes), dtype=np.int64)
+    panel_num_clamped_steps = np.empty((0, num_panel_nodes), dtype=np.int64)
+    panel_residuals = np.empty((0, num_panel_nodes))
+
+    num_iterations = 0
+    num_iterations_saved = None
+    num_problems = 0
+    num_solves = 0
+    while True:
+        nodes = make_latitude_panel_nodes(
+            sub_solar_latitude=smi.sub_solar_latitude, lower=lower, upper=upper
+        )
+        sublimation_results, panel_iterations_saved, residuals, panel_solve_counts = (
+            _solve_latitudes(
+                smi=smi,
+                latitudes_rad=nodes.latitudes_rad.ravel(),
+                average_projection_factors=nodes.average_projection_factors.ravel(),
+                t_init_K=_initial_temperatures(
+                    t_init_K, t_init_profile, nodes.latitudes_rad.ravel()
+                ),
+                with_residuals=with_residuals,
+            )
+        )
+        zs = sublimation_results.z.reshape(nodes.sin_latitudes.shape)
+        integrals, errors = gauss_kronrod_panel_integrals(zs, lower=lower, upper=upper)
+
+        num_iterations += int(sublimation_results.num_iterations.sum())
+        num_problems += panel_solve_counts[0]
+        num_solves += panel_solve_counts[1]
+        if panel_iterations_saved is not None:
+            num_iterations_saved = (num_iterations_saved or 0) + panel_iterations_saved
+
+        panel_lower = np.concatenate([panel_lower, lower])
+        panel_upper = np.concatenate([panel_upper, upper])
+        panel_integrals = np.concatenate([panel_integrals, integrals])
+        panel_errors = np.concatenate([panel_errors, errors])
+        panel_latitudes = np.concatenate([panel_latitudes, nodes.latitudes_rad])
+        panel_zs = np.concatenate([panel_zs, zs])
+        panel_temps_K = np.concatenate(
+            [panel_temps_K, sublimation_results.t_K.reshape(zs.shape)]
+        )
+        panel_num_iterations = np.concatenate(
+            [panel_num_iterations, sublimation_results.num_iterations.reshape(zs.shape)]
+        )
+        panel_num_clamped_steps = np.concatenate(
+            [
+                panel_num_clamped_steps,
+                sublimation_results.num_clamped_steps.reshape(zs.shape),
+            ]
+        )
+        if residuals is not None:
+            panel_residuals = np.concatenate(
+                [panel_residuals, residuals.reshape(zs.shape)]
+            )
+
+        total = panel_integrals.sum()
+        total_error = panel_errors.sum()
+        if smi.quadrature != LatitudeQuadrature.adaptive:
+            break
+        allowed_error = smi.quadrature_rtol * abs(total)
+        if total_error <= allowed_error:
+            break
+
+        # split every panel whose error is more than its share of the allowed error, by width
+        split = panel_errors > allowed_error * (panel_upper - panel_lower) / (
+            edges[-1] - edges[0]
+        )
+        if panel_lower.size + np.count_nonzero(split) > adaptive_quadrature_max_panels:
+            logging.warning(
+                f"Adaptive quadrature stopped at {panel_lower.size} panels with an estimated relative error of"
+                f" {total_error / abs(total):.2e}"
+            )
+            break
+
+        middle = (panel_lower[split] + panel_upper[split]) / 2
+        lower = np.concatenate([panel_lower[split], middle])
+        upper = np.concatenate([middle, panel_upper[split]])
+
+        keep = ~split
+        panel_lower = panel_lower[keep]
+        panel_upper = panel_upper[keep]
+        panel_integrals = panel_integrals[keep]
+        panel_errors = panel_errors[keep]
+        panel_latitudes = panel_latitudes[keep]
+        panel_zs = panel_zs[keep]
+        panel_temps_K = panel_temps_K[keep]
+        panel_num_iterations = panel_num_iterations[keep]
+        panel_num_clamped_steps = panel_num_clamped_steps[keep]
+        if with_residuals:
+            panel_residuals = panel_residuals[keep]
+
+    order = np.argsort(panel_lower)
+
+    sensitivities = None
+    if smi.return_sensitivities:
+        sensitivities = _z_bar_sensitivities(
+            smi=smi,
+            latitudes_rad=panel_latitudes[order].ravel(),
+            average_projection_factors=make_latitude_panel_nodes(
+                sub_solar_latitude=smi.sub_solar_latitude,
+                lower=panel_lower[order],
+                upper=panel_upper[order],
+            ).average_projection_factors.ravel(),
+            t_K=panel_temps_K[order].ravel(),
+            integrate=lambda values: gauss_kronrod_panel_integrals(
+                values.reshape(order.size, num_panel_nodes),
+                lower=panel_lower[order],
+                upper=panel_upper[order],
+            )[0].sum()
+            / 2.0,
+        )
+
+    # the panels cover the sunlit part of [-1, 1] in sin(latitude), so divide by 2 for the average over the surface
+    return (
+        np.float64(total / 2.0),
+        np.float64(total_error / 2.0),
+        panel_latitudes[order].ravel(),
+        SublimationRateArrayResult(
+            z=panel_zs[order].ravel(),
+            t_K=panel_temps_K[order].ravel(),
+            num_iterations=panel_num_iterations[order].ravel(),
+            num_clamped_steps=panel_num_clamped_steps[order].ravel(),
+        ),
+        panel_residuals[order].ravel() if with_residuals else None,
+        num_iterations,
+        num_iterations_saved,
+        (num_problems, num_solves),
+        sensitivities,
     )
@@ -0,0 +1,360 @@
+import contextlib
+import functools
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.energy_balance.energy_balance_table import *
+from comet_ice_sublimation.model_input.sublimation_model_monte_carlo_input import *
+from comet_ice_sublimation.model_output.sublimation_model_monte_carlo_output import *
+from comet_ice_sublimation.model_runner.parallel_runner import default_num_workers
+from comet_ice_sublimation.surface_geometry.surface_geometry import *
+
+# width in dex of the histogram bins that the quantiles of log10_z_bar are found from, which bounds their error
+monte_carlo_histogram_bin_width = 1e-4
+
+
+class StreamingStatistics:
+    """
+    Count, mean, and variance of a stream of values, along with a histogram of fixed width bins to find their
+    quantiles from, updated a batch of values at a time without keeping them.  Statistics of separate streams merge
+    into those of both, as in Chan, Golub & LeVeque (1979), so batches can be summarized in any process and merged in
+    order, giving the same result however many processes there are.  Quantiles are within a bin width of the sample
+    quantiles of the inverted empirical distribution, the smallest value with a fraction q of the values at or below
+    it, which other definitions of sample quantiles agree with as the number of values grows.
+    """
+
+    def __init__(self, bin_width: float = monte_carlo_histogram_bin_width):
+        self.bin_width = bin_width
+        self.count = 0
+        self.mean = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        # sum of squared differences from the mean
+        self._m2 = 0.0
+        # index of each occupied bin, in increasing order, and the number of values in it
+        self._bins = np.zeros(0, dtype=np.int64)
+        self._bin_counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        batch = StreamingStatistics(bin_width=self.bin_width)
+        batch.count = values.size
+        batch.mean = float(values.mean())
+        batch.minimum = float(values.min())
+        batch.maximum = float(values.max())
+        batch._m2 = float(np.sum((values - batch.mean) ** 2))
+        batch._bins, batch._bin_counts = np.unique(
+            np.floor(values / self.bin_width).astype(np.int64), return_counts=True
+        )
+        self.merge(batch)
+
+    def merge(self, other: "StreamingStatistics") -> None:
+        if other.bin_width != self.bin_width:
+            raise ValueError("Statistics with different bin widths can't be merged")
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+        bins, inverse = np.unique(
+            np.concatenate([self._bins, other._bins]), return_inverse=True
+        )
+        bin_counts = np.zeros(bins.size, dtype=np.int64)
+        np.add.at(
+            bin_counts, inverse, np.concatenate([self._bin_counts, other._bin_counts])
+        )
+        self._bins, self._bin_counts = bins, bin_counts
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def standard_error(self) -> float:
+        return self.std / math.sqrt(self.count) if self.count > 1 else math.nan
+
+    def quantile(self, q: float | np.ndarray) -> np.ndarray:
+        # interpolating linearly through the bin each quantile falls in
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        cumulative = np.cumsum(self._bin_counts)
+        target = q * self.count
+        i = np.minimum(
+            np.searchsorted(cumulative, target, side="left"), self._bins.size - 1
+        )
+        bin_counts = self._bin_counts[i]
+        fraction = (target - (cumulative[i] - bin_counts)) / bin_counts
+        return np.clip(
+            (self._bins[i] + fraction) * self.bin_width, self.minimum, self.maximum
+        )
+
+    def quantile_standard_error(self, q: float | np.ndarray) -> np.ndarray:
+        # half the spread of the quantiles one binomial standard deviation, sqrt(q (1 - q) / n), either side of q,
+        # which needs nothing of the distribution but the histogram
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        s = np.sqrt(q * (1.0 - q) / self.count)
+        return (
+            self.quantile(np.minimum(q + s, 1.0))
+            - self.quantile(np.maximum(q - s, 0.0))
+        ) / 2.0
+
+
+def run_sublimation_model_monte_carlo(
+    smci: SublimationModelMonteCarloInput, workers: int | None = 1
+) -> SublimationModelMonteCarloResult:
+    """
+    Runs the model on smci.num_samples draws of the albedos, heliocentric distance, and sub-solar latitude from their
+    distributions, summarizing log10_z_bar of the samples as they are evaluated, without keeping them.
+    The samples are drawn and solved in batches of smci.batch_size, each from its own generator spawned from the seed,
+    so that the batches can be run across a pool of worker processes while the samples stay the same however many
+    workers there are.  The statistics are merged in the order of the batches, and recorded after each one to show
+    how they converge.  Passing workers=None uses one worker per available cpu.
+    """
+
+    error = sublimation_model_monte_carlo_input_error(smci)
+    if error is not None:
+        raise ValueError(error)
+    assert smci.t_init_K is not None
+
+    if (
+        smci.energy_balance_table != EnergyBalanceTableMode.off
+        and smci.infrared_albedo.kind != DistributionKind.fixed
+    ):
+        logging.warning(
+            "Energy balance tables are built for each distinct infrared albedo, so are slow with a distribution of them!"
+        )
+
+    seed_sequence = np.random.SeedSequence(smci.seed)
+    batch_sizes = [
+        min(smci.batch_size, smci.num_samples - start)
+        for start in range(0, smci.num_samples, smci.batch_size)
+    ]
+    batch_seeds = seed_sequence.spawn(len(batch_sizes))
+
+    statistics = StreamingStatistics()
+    num_failed = 0
+    num_iterations = 0
+    num_drawn = 0
+    history = []
+    quantile_levels = np.array(smci.quantile_levels, dtype=np.float64)
+
+    if workers is None:
+        workers = default_num_workers()
+    parallel = workers > 1 and len(batch_sizes) > 1
+    with contextlib.ExitStack() as stack:
+        # either map hands back the batches in the order they were submitted
+        if parallel:
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=min(workers, len(batch_sizes)))
+            )
+            batch_map = executor.map
+        else:
+            batch_map = map
+        for batch_size, (batch_statistics, batch_failed, batch_iterations) in zip(
+            batch_sizes,
+            batch_map(_run_monte_carlo_batch, repeat(smci), batch_seeds, batch_sizes),
+        ):
+            statistics.merge(batch_statistics)
+            num_failed += batch_failed
+            num_iterations += batch_iterations
+            num_drawn += batch_size
+            history.append(
+                (
+                    num_drawn,
+                    statistics.mean,
+                    statistics.standard_error,
+                    statistics.quantile(quantile_levels),
+                    statistics.quantile_standard_error(quantile_levels),
+                )
+            )
+            logging.debug(
+                f"{num_drawn} samples: mean log10_z_bar {statistics.mean:.6f} +/- {statistics.standard_error:.2e}"
+            )
+
+    if num_failed > 0:
+        logging.warning(
+            f"Energy balance did not converge for {num_failed} of {smci.num_samples} samples, which are left out"
+        )
+    logging.info(
+        f"Ran {smci.num_samples} samples in {len(batch_sizes)} batches,"
+        f" with {num_iterations} energy balance iterations"
+    )
+
+    counts, means, standard_errors, quantiles, quantile_standard_errors = zip(*history)
+    return SublimationModelMonteCarloResult(
+        num_samples=smci.num_samples,
+        num_failed=num_failed,
+        mean=statistics.mean if statistics.count > 0 else math.nan,
+        std=statistics.std,
+        standard_error=statistics.standard_error,
+        minimum=statistics.minimum,
+        maximum=statistics.maximum,
+        quantile_levels=quantile_levels,
+        quantiles=quantiles[-1],
+        quantile_standard_errors=quantile_standard_errors[-1],
+        convergence=MonteCarloConvergence(
+            num_samples=np.array(counts),
+            mean=np.array(means),
+            standard_error=np.array(standard_errors),
+            quantiles=np.stack(quantiles),
+            quantile_standard_errors=np.stack(quantile_standard_errors),
+        ),
+        seed=seed_sequence.entropy,
+        num_iterations=num_iterations,
+    )
+
+
+def _run_monte_carlo_batch(
+    smci: SublimationModelMonteCarloInput,
+    seed_sequence: np.random.SeedSequence,
+    num_samples: int,
+) -> tuple[StreamingStatistics, int, int]:
+    # statistics of log10_z_bar over one batch of samples, along with the number of samples that failed, and the
+    # number of energy balance iterations
+    rng = np.random.default_rng(seed_sequence)
+    samples = {
+        name: _draw_samples(
+            name=name, distribution=getattr(smci, name), rng=rng, size=num_samples
+        )
+        for name in monte_carlo_parameter_ranges
+    }
+
+    grid, average_projection_factors = _average_projection_factors(
+        sub_solar_latitudes=samples["sub_solar_latitude"],
+        num_latitude_gridpoints=smci.num_latitude_gridpoints,
+    )
+    incident_solar_flux = incident_solar_flux_array(
+        visual_albedo=samples["visual_albedo"][:, np.newaxis],
+        rh_au=samples["rh_au"][:, np.newaxis],
+        average_projection_factors=average_projection_factors,
+    )
+
+    if smci.energy_balance_table != EnergyBalanceTableMode.off:
+        solve = functools.partial(
+            solve_energy_balance_tabulated,
+            species=smci.species,
+            newton_polish=smci.energy_balance_table == EnergyBalanceTableMode.polish,
+            solver=smci.solver,
+            tolerance=smci.tolerance,
+        )
+    else:
+        solve = functools.partial(
+            solve_energy_balance_array,
+            species=smci.species,
+            solver=smci.solver,
+            tolerance=smci.tolerance,
+        )
+
+    log10_z_bar = np.full(num_samples, np.nan)
+    num_iterations = 0
+    solving = np.arange(num_samples)
+    while solving.size > 0:
+        try:
+            sublimation_results = solve(
+                infrared_albedo=samples["infrared_albedo"][solving, np.newaxis],
+                incident_solar_flux=incident_solar_flux[solving],
+                t_init_K=smci.t_init_K,
+            )
+        except EnergyBalanceConvergenceError as e:
+            # solve the rest again without the samples that failed
+            failed = np.unique(e.indices // smci.num_latitude_gridpoints)
+            solving = np.delete(solving, failed)
+            continue
+
+        num_iterations = int(sublimation_results.num_iterations.sum())
+        # the same integration over sin(latitude) as run_sublimation_model
+        z_bar = (
+            np.trapezoid(
+                sublimation_results.z, dx=np.float64(grid.delta_sin_latitude), axis=-1
+            )
+            / 2.0
+        )
+        with np.errstate(divide="ignore"):
+            log10_z_bar[solving] = np.log10(z_bar)
+        break
+
+    converged = np.isfinite(log10_z_bar)
+    statistics = StreamingStatistics()
+    statistics.update(log10_z_bar[converged])
+    return statistics, int(np.count_nonzero(~converged)), num_iterations
+
+
+def _draw_samples(
+    name: str,
+    distribution: ParameterDistribution,
+    rng: np.random.Generator,
+    size: int,
+) -> np.ndarray:
+    if distribution.kind == DistributionKind.fixed:
+        return np.full(size, distribution.a, dtype=np.float64)
+    if distribution.kind == DistributionKind.uniform:
+        return rng.uniform(distribution.a, distribution.b, size=size)
+
+    # truncated to the range of the parameter, by drawing again until every sample is within it
+    samples = rng.normal(distribution.a, distribution.b, size=size)
+    outside = np.flatnonzero(~monte_carlo_parameter_in_range(name, samples))
+    while outside.size > 0:
+        samples[outside] = rng.normal(distribution.a, distribution.b, size=outside.size)
+        outside = outside[~monte_carlo_parameter_in_range(name, samples[outside])]
+    return samples
+
+
+def _average_projection_factors(
+    sub_solar_latitudes: np.ndarray, num_latitude_gridpoints: int
+) -> tuple[LatitudeGrid, np.ndarray]:
+    # the latitude grid, which is the same for every sub-solar latitude, and the average projection factors of each
+    # sample on it.  z_bar is the same at a sub-solar latitude of either sign, which is the same body upside down, and
+    # the grid doesn't take negative ones, so each sample is run at the absolute value of its own
+    sub_solar_latitudes, inverse = np.unique(
+        np.abs(sub_solar_latitudes), return_inverse=True
+    )
+    grid = make_latitude_grid(
+        sub_solar_latitude=sub_solar_latitudes[0],
+        num_latitude_gridpoints=num_latitude_gridpoints,
+    )
+    if sub_solar_latitudes.size == 1:
+        return grid, np.broadcast_to(
+            grid.average_projection_factors, (inverse.size, num_latitude_gridpoints)
+        )
+
+    # the trigonometry of the grid is shared by every sub-solar latitude, so only the factors are worked out for each,
+    # rather than a whole grid
+    cos_latitudes = np.cos(grid.latitudes_rad)
+    tan_latitudes = np.tan(grid.latitudes_rad)
+    average_projection_factors = np.empty(
+        (sub_solar_latitudes.size, num_latitude_gridpoints)
+    )
+    for i, sub_solar_latitude in enumerate(sub_solar_latitudes):
+        if sub_solar_latitude == 0:
+            # with the mirrored factors of the grid, as run_sublimation_model has
+            average_projection_factors[i] = make_latitude_grid(
+                sub_solar_latitude=0.0, num_latitude_gridpoints=num_latitude_gridpoints
+            ).average_projection_factors
+            continue
+        average_projection_factors[i] = average_projection_factor_array(
+            (90 - float(sub_solar_latitude)) * math.pi / 180,
+            grid.latitudes_rad,
+            grid.sin_latitudes,
+            cos_latitudes,
+            tan_latitudes,
+        )
+    return grid, average_projection_factors[inverse]
@@ -0,0 +1,156 @@
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from comet_ice_sublimation.model_cache.model_cache import *
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.model_output.sublimation_model_sweep_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+from comet_ice_sublimation.model_runner.sweep_runner import *
+
+# Each task sent to a worker holds roughly this many latitudes to solve: small models are grouped together so that
+# the cost of sending work to another process is amortized, while large models are sent one per task
+latitude_gridpoints_per_chunk = 20000
+
+# Number of tasks per worker we aim for, so that workers that finish early can pick up more work
+chunks_per_worker = 4
+
+
+def default_num_workers() -> int:
+    # respect any cpu affinity we are restricted to, e.g. by a batch scheduler, where the platform has one
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run_sublimation_models_parallel(
+    smis: list[SublimationModelInput],
+    workers: int | None = None,
+    cache: SublimationModelCache | None = None,
+) -> list[SublimationModelResult]:
+    """
+    Runs run_sublimation_model on every input across a pool of worker processes,
+    returning the results in the same order as the inputs.
+    If a cache is given, only the inputs missing from it are sent to the workers, and their results are added to it.
+    """
+
+    if workers is None:
+        workers = default_num_workers()
+
+    if cache is None:
+        return _run_models_parallel(smis=smis, workers=workers)
+
+    cached_results = [cache.get(smi=smi) for smi in smis]
+    missing = [i for i, smr in enumerate(cached_results) if smr is None]
+    missing_results = _run_models_parallel(
+        smis=[smis[i] for i in missing], workers=workers
+    )
+    for i, smr in zip(missing, missing_results):
+        cache.put(smi=smis[i], smr=smr)
+
+    missing_results_by_index = dict(zip(missing, missing_results))
+    return [
+        smr if smr is not None else missing_results_by_index[i]
+        for i, smr in enumerate(cached_results)
+    ]
+
+
+def _run_models_parallel(
+    smis: list[SublimationModelInput], workers: int
+) -> list[SublimationModelResult]:
+
+    chunks = _chunk_model_inputs(smis=smis, workers=workers)
+
+    if workers == 1 or len(chunks) <= 1:
+        return _run_model_chunk(smis)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        # map hands back the results of the chunks in the order they were submitted
+        for chunk_results in executor.map(_run_model_chunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+
+def _run_model_chunk(
+    smis: list[SublimationModelInput],
+) -> list[SublimationModelResult]:
+    return [run_sublimation_model(smi=smi) for smi in smis]
+
+
+def _chunk_model_inputs(
+    smis: list[SublimationModelInput], workers: int
+) -> list[list[SublimationModelInput]]:
+    # split the inputs, in order, into chunks holding about the same number of latitude gridpoints
+    total_gridpoints = sum(smi.num_latitude_gridpoints for smi in smis)
+    gridpoints_per_chunk = min(
+        latitude_gridpoints_per_chunk,
+        max(1, total_gridpoints // (workers * chunks_per_worker)),
+    )
+
+    chunks = []
+    chunk = []
+    chunk_gridpoints = 0
+    for smi in smis:
+        chunk.append(smi)
+        chunk_gridpoints += smi.num_latitude_gridpoints
+        if chunk_gridpoints >= gridpoints_per_chunk:
+            chunks.append(chunk)
+            chunk = []
+            chunk_gridpoints = 0
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def run_sublimation_model_sweep_parallel(
+    smsi: SublimationModelSweepInput, workers: int | None = None
+) -> SublimationModelSweepResult:
+    """
+    Runs run_sublimation_model_sweep across a pool of worker processes by splitting the sweep along the
+    sub-solar latitude axis, so each worker still shares the latitude grid between the points it solves.
+    """
+
+    if workers is None:
+        workers = default_num_workers()
+
+    sub_solar_latitudes = np.atleast_1d(np.asarray(smsi.sub_solar_latitudes))
+    num_chunks = min(workers * chunks_per_worker, sub_solar_latitudes.size)
+    if workers == 1 or num_chunks <= 1:
+        return run_sublimation_model_sweep(smsi=smsi)
+
+    sub_sweeps = [
+        dataclasses.replace(smsi, sub_solar_latitudes=ssls)
+        for ssls in np.array_split(sub_solar_latitudes, num_chunks)
+    ]
+    with ProcessPoolExecutor(max_workers=min(workers, num_chunks)) as executor:
+        sub_results = list(executor.map(run_sublimation_model_sweep, sub_sweeps))
+
+    # stitch the pieces back together along the sub-solar latitude dimension, including the profiles if they were
+    # returned
+    def _concatenate(field: str) -> np.ndarray | None:
+        arrays = [getattr(r, field) for r in sub_results]
+        if arrays[0] is None:
+            return None
+        return np.concatenate(arrays, axis=1)
+
+    def _sum(field: str) -> int | None:
+        counts = [getattr(r, field) for r in sub_results]
+        if counts[0] is None:
+            return None
+        return sum(counts)
+
+    return SublimationModelSweepResult(
+        z_bar=np.concatenate([r.z_bar for r in sub_results], axis=1),
+        log10_z_bar=np.concatenate([r.log10_z_bar for r in sub_results], axis=1),
+        latitudes_rad=sub_results[0].latitudes_rad,
+        zs=_concatenate("zs"),
+        temps_K=_concatenate("temps_K"),
+        num_iterations=_sum("num_iterations"),
+        num_iterations_saved=_sum("num_iterations_saved"),
+    )
@@ -0,0 +1,160 @@
+import logging
+
+import numpy as np
+
+from comet_ice_sublimation.energy_balance.continuation import *
+from comet_ice_sublimation.energy_balance.energy_balance import *
+from comet_ice_sublimation.energy_balance.energy_balance_table import *
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import *
+from comet_ice_sublimation.model_output.sublimation_model_sweep_output import *
+from comet_ice_sublimation.surface_geometry.surface_geometry import *
+
+
+def run_sublimation_model_sweep(
+    smsi: SublimationModelSweepInput,
+) -> SublimationModelSweepResult:
+    """
+    Runs the model at every combination of the sweep axes, giving the same values as
+    calling run_sublimation_model at each combination.
+    The latitude grid is computed once per sub-solar latitude, and the energy balance for all of the
+    heliocentric distances and albedos at that sub-solar latitude is solved at once.
+    With continuation, the first sub-solar latitude is solved by continuation along latitude, and each following
+    sub-solar latitude starts from the temperatures of the one before it.
+    """
+
+    t_init_K = smsi.t_init_K
+    assert t_init_K is not None
+
+    rh_aus = np.atleast_1d(np.asarray(smsi.rh_aus, dtype=np.float64))
+    sub_solar_latitudes = np.atleast_1d(
+        np.asarray(smsi.sub_solar_latitudes, dtype=np.float64)
+    )
+    visual_albedos = np.atleast_1d(np.asarray(smsi.visual_albedos, dtype=np.float64))
+    infrared_albedos = np.atleast_1d(
+        np.asarray(smsi.infrared_albedos, dtype=np.float64)
+    )
+
+    sweep_shape = (
+        rh_aus.size,
+        sub_solar_latitudes.size,
+        visual_albedos.size,
+        infrared_albedos.size,
+    )
+    profile_shape = sweep_shape + (smsi.num_latitude_gridpoints,)
+
+    z_bar = np.empty(sweep_shape)
+    if smsi.return_profile:
+        zs = np.empty(profile_shape)
+        temps_K = np.empty(profile_shape)
+    else:
+        zs = None
+        temps_K = None
+
+    num_iterations = 0
+    estimated_cold_start_iterations = 0.0
+    cold_start_iterations = None
+    previous_temps_K = None
+
+    latitudes = None
+    for i_ssl, sub_solar_latitude in enumerate(sub_solar_latitudes):
+        grid = make_latitude_grid(
+            sub_solar_latitude=float(sub_solar_latitude),
+            num_latitude_gridpoints=smsi.num_latitude_gridpoints,
+        )
+        latitudes = grid.latitudes_rad
+
+        # dimensions (rh_au, visual_albedo, 1, latitude) - infrared albedo does not change the incident flux
+        incident_solar_flux = incident_solar_flux_array(
+            visual_albedo=visual_albedos[np.newaxis, :, np.newaxis, np.newaxis],
+            rh_au=rh_aus[:, np.newaxis, np.newaxis, np.newaxis],
+            average_projection_factors=grid.average_projection_factors,
+        )
+
+        # dimensions (rh_au, visual_albedo, infrared_albedo, latitude)
+        if (
+            smsi.energy_balance_table == EnergyBalanceTableMode.off
+            and smsi.continuation
+        ):
+            # after the first sub-solar latitude, start from the temperatures at the previous one, except at
+            # points that were in the dark there
+            if previous_temps_K is None:
+                continuation_t_init_K = t_init_K
+            else:
+                continuation_t_init_K = np.where(
+                    np.isfinite(previous_temps_K), previous_temps_K, t_init_K
+                )
+            sublimation_results, first_pass_iterations = (
+                solve_energy_balance_continuation(
+                    species=smsi.species,
+                    infrared_albedo=infrared_albedos[:, np.newaxis],
+                    incident_solar_flux=incident_solar_flux,
+                    t_init_K=continuation_t_init_K,
+                    solver=smsi.solver,
+                    tolerance=smsi.tolerance,
+                )
+            )
+            # only the first sub-solar latitude starts from t_init_K, so only it tells the cost of a cold start
+            if cold_start_iterations is None:
+                cold_start_iterations = first_pass_iterations
+        elif smsi.energy_balance_table == EnergyBalanceTableMode.off:
+            sublimation_results = solve_energy_balance_array(
+                species=smsi.species,
+                infrared_albedo=infrared_albedos[:, np.newaxis],
+                incident_solar_flux=incident_solar_flux,
+                t_init_K=t_init_K,
+                solver=smsi.solver,
+                tolerance=smsi.tolerance,
+            )
+        else:
+            sublimation_results = solve_energy_balance_tabulated(
+                species=smsi.species,
+                infrared_albedo=infrared_albedos[:, np.newaxis],
+                incident_solar_flux=incident_solar_flux,
+                t_init_K=t_init_K,
+                newton_polish=smsi.energy_balance_table
+                == EnergyBalanceTableMode.polish,
+                solver=smsi.solver,
+                tolerance=smsi.tolerance,
+            )
+
+        # integrate over the sine-of-latitude space from -1 to 1 - so divide by the length of the interval, 2,
+        # for the average value
+        z_bar[:, i_ssl] = (
+            np.trapezoid(
+                sublimation_results.z, dx=np.float64(grid.delta_sin_latitude), axis=-1
+            )
+            / 2.0
+        )
+
+        num_iterations += int(sublimation_results.num_iterations.sum())
+        if cold_start_iterations is not None:
+            estimated_cold_start_iterations += cold_start_iterations.estimate(
+                sublimation_results.t_K
+            ).sum()
+            previous_temps_K = sublimation_results.t_K
+
+        if zs is not None and temps_K is not None:
+            zs[:, i_ssl] = sublimation_results.z
+            temps_K[:, i_ssl] = sublimation_results.t_K
+
+    if not smsi.return_profile:
+        latitudes = None
+
+    num_iterations_saved = None
+    if cold_start_iterations is not None:
+        num_iterations_saved = int(
+            round(estimated_cold_start_iterations - num_iterations)
+        )
+        logging.info(
+            f"Warm start used {num_iterations} iterations, saving about {num_iterations_saved}"
+        )
+
+    return SublimationModelSweepResult(
+        z_bar=z_bar,
+        log10_z_bar=np.log10(z_bar),
+        latitudes_rad=latitudes,
+        zs=zs,
+        temps_K=temps_K,
+        num_iterations=num_iterations,
+        num_iterations_saved=num_iterations_saved,
+    )
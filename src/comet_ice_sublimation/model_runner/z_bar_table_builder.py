@@ -0,0 +1,174 @@
+import dataclasses
+import pathlib
+
+import numpy as np
+
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import *
+from comet_ice_sublimation.model_runner.model_runner import (
+    run_sublimation_models_vectorized,
+)
+from comet_ice_sublimation.model_runner.parallel_runner import (
+    run_sublimation_model_sweep_parallel,
+)
+from comet_ice_sublimation.model_saver.binary_output import save_sweep_npy
+from comet_ice_sublimation.z_bar_table.z_bar_table import *
+from comet_ice_sublimation.z_bar_table.z_bar_table import _table_coordinates
+
+# cells of the table whose centers the interpolation is checked at, against the model, when a table is built
+default_z_bar_table_check_points = 1000
+
+
+def z_bar_table_input_error(smsi: SublimationModelSweepInput) -> str | None:
+    # describes the first problem found with the axes of a table, or None if there is none
+    axes = {
+        "heliocentric distances": smsi.rh_aus,
+        "sub-solar latitudes": smsi.sub_solar_latitudes,
+        "visual albedos": smsi.visual_albedos,
+        "infrared albedos": smsi.infrared_albedos,
+    }
+    for name, axis in axes.items():
+        if np.unique(axis).size != np.size(axis):
+            return f"The {name} of a table must all be different!"
+    if np.any(np.asarray(smsi.rh_aus) <= 0.0):
+        return "Heliocentric distances must be positive!"
+    if np.any(np.asarray(smsi.sub_solar_latitudes) < 0.0) or np.any(
+        np.asarray(smsi.sub_solar_latitudes) > 90.0
+    ):
+        return "Sub-solar latitudes of a table must be between 0 and 90, inclusive!"
+    if np.any(np.asarray(smsi.visual_albedos) < 0.0) or np.any(
+        np.asarray(smsi.visual_albedos) >= 1.0
+    ):
+        return "Visual albedos of a table must be at least 0 and less than 1!"
+    if np.any(np.asarray(smsi.infrared_albedos) < 0.0) or np.any(
+        np.asarray(smsi.infrared_albedos) > 1.0
+    ):
+        return "Infrared albedos must be between 0 and 1, inclusive!"
+    return None
+
+
+def build_z_bar_table(
+    smsi: SublimationModelSweepInput,
+    output_path: pathlib.Path,
+    workers: int | None = 1,
+    num_check_points: int = default_z_bar_table_check_points,
+    seed: int = 0,
+) -> ZBarTable:
+    """
+    Runs the sweep smsi, sorted along each axis, and saves its log10_z_bar as a table in the directory output_path,
+    which load_z_bar_table memory-maps.  The error of interpolating the table is measured by running the model at the
+    centers, in the coordinates the table is interpolated in, of num_check_points randomly chosen cells, which are
+    where interpolation is furthest from the nodes, and is saved with the table.  Latitude profiles are not kept.
+    """
+
+    error = z_bar_table_input_error(smsi)
+    if error is not None:
+        raise ValueError(error)
+
+    smsi = dataclasses.replace(
+        smsi,
+        rh_aus=np.unique(np.asarray(smsi.rh_aus, dtype=np.float64)),
+        sub_solar_latitudes=np.unique(
+            np.asarray(smsi.sub_solar_latitudes, dtype=np.float64)
+        ),
+        visual_albedos=np.unique(np.asarray(smsi.visual_albedos, dtype=np.float64)),
+        infrared_albedos=np.unique(np.asarray(smsi.infrared_albedos, dtype=np.float64)),
+        return_profile=False,
+    )
+    smsr = run_sublimation_model_sweep_parallel(smsi=smsi, workers=workers)
+
+    table = ZBarTable(smsi=smsi, log10_z_bar=smsr.log10_z_bar, interpolation_errors={})
+    interpolation_errors = _measure_interpolation_errors(
+        table=table, num_check_points=num_check_points, seed=seed
+    )
+
+    save_sweep_npy(
+        smsi=smsi,
+        smsr=smsr,
+        output_path=output_path,
+        extra_metadata={
+            z_bar_table_metadata_name: {
+                "interpolation_errors": {
+                    method.value: dataclasses.asdict(errors)
+                    for method, errors in interpolation_errors.items()
+                }
+            }
+        },
+    )
+    return load_z_bar_table(output_path)
+
+
+def _measure_interpolation_errors(
+    table: ZBarTable, num_check_points: int, seed: int
+) -> dict[InterpolationMethod, InterpolationErrors]:
+    smsi = table.smsi
+    axes = [
+        smsi.rh_aus,
+        smsi.sub_solar_latitudes,
+        smsi.visual_albedos,
+        smsi.infrared_albedos,
+    ]
+    # only axes with more than one node have cells to check between them
+    if num_check_points < 1 or all(axis.size == 1 for axis in axes):
+        return {}
+
+    # from the table coordinates back to the model parameters, in the order of _table_coordinates
+    from_table_coordinates = [
+        lambda x: 10.0**x,
+        lambda x: x,
+        lambda x: 1.0 - 10.0 ** (-x),
+        lambda x: x,
+    ]
+    rng = np.random.default_rng(seed)
+    check_points = []
+    for axis, nodes, inverse in zip(
+        axes, _table_coordinates(*axes), from_table_coordinates
+    ):
+        if axis.size == 1:
+            check_points.append(np.full(num_check_points, axis[0]))
+            continue
+        cell = rng.integers(0, nodes.size - 1, size=num_check_points)
+        check_points.append(inverse(0.5 * (nodes[cell] + nodes[cell + 1])))
+    rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos = check_points
+
+    smis = [
+        SublimationModelInput(
+            species=smsi.species,
+            visual_albedo=float(visual_albedo),
+            infrared_albedo=float(infrared_albedo),
+            rh_au=float(rh_au),
+            sub_solar_latitude=float(sub_solar_latitude),
+            num_latitude_gridpoints=smsi.num_latitude_gridpoints,
+            t_init_K=smsi.t_init_K,
+            return_profile=False,
+            energy_balance_table=smsi.energy_balance_table,
+            solver=smsi.solver,
+            tolerance=smsi.tolerance,
+        )
+        for rh_au, sub_solar_latitude, visual_albedo, infrared_albedo in zip(
+            rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos
+        )
+    ]
+    log10_z_bar = np.array(
+        [smr.log10_z_bar for smr in run_sublimation_models_vectorized(smis=smis)]
+    )
+
+    interpolation_errors = {}
+    for method in InterpolationMethod:
+        errors = np.abs(
+            table.log10_z_bar(
+                rh_au=rh_aus,
+                sub_solar_latitude=sub_solar_latitudes,
+                visual_albedo=visual_albedos,
+                infrared_albedo=infrared_albedos,
+                method=method,
+            )
+            - log10_z_bar
+        )
+        interpolation_errors[method] = InterpolationErrors(
+            num_check_points=num_check_points,
+            max=float(np.max(errors)),
+            p99=float(np.quantile(errors, 0.99)),
+            rms=float(np.sqrt(np.mean(errors**2))),
+        )
+    return interpolation_errors
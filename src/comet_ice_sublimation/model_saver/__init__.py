@@ -1 +1,2 @@
 from .model_saver import *
+from .binary_output import *
@@ -0,0 +1,287 @@
+import dataclasses
+import json
+import pathlib
+from typing import Any, Literal
+
+import numpy as np
+
+from comet_ice_sublimation.model_input.sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    LatitudeQuadrature,
+    SublimationModelInput,
+)
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import (
+    SublimationModelSweepInput,
+)
+from comet_ice_sublimation.model_output.solver_telemetry import SolverTelemetry
+from comet_ice_sublimation.model_output.z_bar_sensitivities import ZBarSensitivities
+from comet_ice_sublimation.model_output.sublimation_model_multi_species_output import (
+    SublimationModelMultiSpeciesResult,
+)
+from comet_ice_sublimation.model_output.sublimation_model_output import (
+    SublimationModelResult,
+)
+from comet_ice_sublimation.model_output.sublimation_model_sweep_output import (
+    SublimationModelSweepResult,
+)
+from comet_ice_sublimation.molecular_species import *
+
+# the ways np.load can memory-map an array
+MmapMode = Literal["r+", "r", "w+", "c"]
+
+# Binary output keeps every array of the input and result as a numpy array under the name of its field, and every
+# other input field in a json metadata record, so that nothing is converted to lists or copied on the way out.
+# Results that are None are left out, and the arrays of nested results such as the solver telemetry are kept under
+# the name of the result field and their own, joined by a dot.
+
+binary_output_version = 1
+
+# name of the metadata record: a member of an npz file, or a file in a sweep directory
+binary_metadata_name = "metadata"
+sweep_index_file_name = "index.json"
+
+# dimensions of the sweep result arrays, and the input fields holding the value along each of them
+sweep_dimensions = ["rh_au", "sub_solar_latitude", "visual_albedo", "infrared_albedo"]
+sweep_axis_fields = [
+    "rh_aus",
+    "sub_solar_latitudes",
+    "visual_albedos",
+    "infrared_albedos",
+]
+
+_enum_fields = {
+    "species": MolecularSpecies,
+    "energy_balance_table": EnergyBalanceTableMode,
+    "solver": EnergyBalanceSolver,
+    "quadrature": LatitudeQuadrature,
+}
+
+_nested_result_fields = {
+    "telemetry": SolverTelemetry,
+    "sensitivities": ZBarSensitivities,
+}
+
+
+def save_model_npz(
+    smi: SublimationModelInput, smr: SublimationModelResult, output_path: pathlib.Path
+) -> None:
+    metadata, arrays = _split_fields(smi, smr)
+    _save_npz(output_path=output_path, metadata=metadata, arrays=arrays)
+
+
+def load_model_npz(
+    path: pathlib.Path,
+) -> tuple[SublimationModelInput, SublimationModelResult]:
+    metadata, arrays = _load_npz(path)
+    return _join_fields(SublimationModelInput, SublimationModelResult, metadata, arrays)
+
+
+def save_multi_species_npz(
+    smis: list[SublimationModelInput],
+    smsr: SublimationModelMultiSpeciesResult,
+    output_path: pathlib.Path,
+) -> None:
+    # the fields of each species are kept as those of a single model, under the name of the species and a slash
+    metadata = {"version": binary_output_version, "species": [], "models": {}}
+    arrays = {}
+    for smi in smis:
+        species_metadata, species_arrays = _split_fields(smi, smsr[smi.species])
+        species_metadata.pop("version")
+        metadata["species"].append(smi.species.value)
+        metadata["models"][smi.species.value] = species_metadata
+        arrays.update(
+            {
+                f"{smi.species.value}/{name}": array
+                for name, array in species_arrays.items()
+            }
+        )
+    _save_npz(output_path=output_path, metadata=metadata, arrays=arrays)
+
+
+def load_multi_species_npz(
+    path: pathlib.Path,
+) -> tuple[list[SublimationModelInput], SublimationModelMultiSpeciesResult]:
+    metadata, arrays = _load_npz(path)
+    smis = []
+    results = {}
+    for species in metadata["species"]:
+        prefix = f"{species}/"
+        smi, smr = _join_fields(
+            SublimationModelInput,
+            SublimationModelResult,
+            metadata["models"][species],
+            {
+                name.removeprefix(prefix): array
+                for name, array in arrays.items()
+                if name.startswith(prefix)
+            },
+        )
+        smis.append(smi)
+        results[smi.species] = smr
+    return smis, SublimationModelMultiSpeciesResult(results=results)
+
+
+def save_sweep_npz(
+    smsi: SublimationModelSweepInput,
+    smsr: SublimationModelSweepResult,
+    output_path: pathlib.Path,
+) -> None:
+    metadata, arrays = _split_fields(smsi, smsr)
+    metadata["dimensions"] = sweep_dimensions
+    _save_npz(output_path=output_path, metadata=metadata, arrays=arrays)
+
+
+def save_sweep_npy(
+    smsi: SublimationModelSweepInput,
+    smsr: SublimationModelSweepResult,
+    output_path: pathlib.Path,
+    extra_metadata: dict[str, Any] | None = None,
+) -> None:
+    """
+    Saves a sweep as a directory holding one .npy file per array, which load_sweep can memory-map, along with an
+    index.json of the other input fields, the dimensions of the result arrays and the input arrays giving the
+    parameter values along each of them, and the file, shape, and dtype of every array.  Any extra_metadata is
+    added to the index as it is, for readers other than load_sweep.
+    """
+
+    metadata, arrays = _split_fields(smsi, smsr)
+    metadata.update(extra_metadata or {})
+
+    output_path = pathlib.Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    metadata["dimensions"] = sweep_dimensions
+    metadata["axes"] = dict(zip(sweep_dimensions, sweep_axis_fields))
+    metadata["arrays"] = {}
+    for name, array in arrays.items():
+        # np.save writes contiguous arrays straight from their memory
+        np.save(output_path / f"{name}.npy", array, allow_pickle=False)
+        metadata["arrays"][name] = {
+            "file": f"{name}.npy",
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+        }
+
+    with open(output_path / sweep_index_file_name, "w") as index_file:
+        json.dump(metadata, index_file, indent=2, default=_json_scalar)
+
+
+def load_sweep(
+    path: pathlib.Path, mmap_mode: MmapMode | None = "r"
+) -> tuple[SublimationModelSweepInput, SublimationModelSweepResult]:
+    """
+    Loads a sweep saved by save_sweep_npy or save_sweep_npz.  The arrays of a .npy directory are memory-mapped with
+    mmap_mode, so only the parts that are used are read from disk; npz files are always read into memory.
+    """
+
+    path = pathlib.Path(path)
+    if path.is_dir():
+        with open(path / sweep_index_file_name) as index_file:
+            metadata = json.load(index_file)
+        arrays = {
+            name: np.load(path / entry["file"], mmap_mode=mmap_mode)
+            for name, entry in metadata.pop("arrays").items()
+        }
+    else:
+        metadata, arrays = _load_npz(path)
+
+    return _join_fields(
+        SublimationModelSweepInput, SublimationModelSweepResult, metadata, arrays
+    )
+
+
+def _split_fields(
+    model_input, model_result
+) -> tuple[dict[str, Any], dict[str, np.ndarray]]:
+    # numbers and arrays of the result, and arrays of the input, go into arrays; the rest of the input goes into
+    # metadata
+    metadata = {"version": binary_output_version}
+    arrays = {}
+
+    for field in dataclasses.fields(model_input):
+        value = getattr(model_input, field.name)
+        if isinstance(value, np.ndarray):
+            arrays[field.name] = value
+        else:
+            metadata[field.name] = value
+
+    for field in dataclasses.fields(model_result):
+        value = getattr(model_result, field.name)
+        if field.name in _nested_result_fields and value is not None:
+            for nested_field in dataclasses.fields(value):
+                arrays[f"{field.name}.{nested_field.name}"] = np.asarray(
+                    getattr(value, nested_field.name)
+                )
+        elif value is not None:
+            arrays[field.name] = np.asarray(value)
+
+    return metadata, arrays
+
+
+def _join_fields(input_class, result_class, metadata, arrays):
+    input_fields = {}
+    for field in dataclasses.fields(input_class):
+        if field.name in arrays:
+            input_fields[field.name] = arrays[field.name]
+        elif field.name in metadata:
+            value = metadata[field.name]
+            if field.name in _enum_fields and value is not None:
+                value = _enum_fields[field.name](value)
+            input_fields[field.name] = value
+
+    result_fields = {}
+    for field in dataclasses.fields(result_class):
+        if field.name in _nested_result_fields:
+            nested_class = _nested_result_fields[field.name]
+            nested_fields = {
+                nested_field.name: _result_value(
+                    arrays.get(f"{field.name}.{nested_field.name}")
+                )
+                for nested_field in dataclasses.fields(nested_class)
+            }
+            if all(value is not None for value in nested_fields.values()):
+                result_fields[field.name] = nested_class(**nested_fields)
+            continue
+        result_fields[field.name] = _result_value(arrays.get(field.name))
+
+    return input_class(**input_fields), result_class(**result_fields)
+
+
+def _result_value(value: np.ndarray | None) -> Any:
+    if value is not None and value.ndim == 0:
+        # counts come back as python ints, and the rest as numpy scalars as in a fresh result
+        return int(value) if value.dtype.kind in "iu" else value[()]
+    return value
+
+
+def _save_npz(
+    output_path: pathlib.Path, metadata: dict[str, Any], arrays: dict[str, np.ndarray]
+) -> None:
+    # uncompressed, so that arrays are written out in chunks rather than copied whole; passing a file keeps numpy
+    # from adding .npz to the name
+    with open(output_path, "wb") as npz_file:
+        np.savez(
+            npz_file,
+            allow_pickle=False,
+            **{
+                binary_metadata_name: np.array(
+                    json.dumps(metadata, default=_json_scalar)
+                )
+            },
+            **arrays,
+        )
+
+
+def _load_npz(path: pathlib.Path) -> tuple[dict[str, Any], dict[str, np.ndarray]]:
+    with np.load(path, allow_pickle=False) as npz:
+        metadata = json.loads(str(npz[binary_metadata_name]))
+        arrays = {name: npz[name] for name in npz.files if name != binary_metadata_name}
+    return metadata, arrays
+
+
+def _json_scalar(value: Any) -> Any:
+    # numpy scalars in the input, such as a num_latitude_gridpoints of np.int64
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Can not save {type(value).__name__} in metadata")
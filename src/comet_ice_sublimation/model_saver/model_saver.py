@@ -1,15 +1,35 @@
-import copy
 import csv
 import json
 import pathlib
-from dataclasses import asdict
+from dataclasses import fields, is_dataclass
+from typing import Any, TextIO
 
+import numpy as np
+
+from comet_ice_sublimation.model_input.ephemeris import EphemerisRow
+from comet_ice_sublimation.model_output.batch_output import BatchModelResult
 from comet_ice_sublimation.model_input.sublimation_model_input import (
     SublimationModelInput,
 )
+from comet_ice_sublimation.model_input.sublimation_model_monte_carlo_input import (
+    SublimationModelMonteCarloInput,
+)
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import (
+    SublimationModelSweepInput,
+)
+from comet_ice_sublimation.model_output.sublimation_model_multi_species_output import (
+    SublimationModelMultiSpeciesResult,
+)
 from comet_ice_sublimation.model_output.sublimation_model_output import (
     SublimationModelResult,
 )
+from comet_ice_sublimation.model_output.sublimation_model_monte_carlo_output import (
+    SublimationModelMonteCarloResult,
+)
+from comet_ice_sublimation.model_output.sublimation_model_sweep_output import (
+    SublimationModelSweepResult,
+)
+from comet_ice_sublimation.model_saver.binary_output import *
 from comet_ice_sublimation.parse_arguments import ModelOutputStorageFormat
 
 
@@ -19,63 +39,102 @@ def save_model(
     output_path: pathlib.Path,
     out_format: ModelOutputStorageFormat,
 ) -> None:
-    out_dict = {**asdict(smi), **asdict(smr)}
-
-    # we don't need to save this
-    out_dict.pop("return_profile")
-
     if out_format == ModelOutputStorageFormat.json:
         _save_model_json(smi=smi, smr=smr, output_path=output_path)
+    elif out_format == ModelOutputStorageFormat.npz:
+        save_model_npz(smi=smi, smr=smr, output_path=output_path)
     else:
         if (
             smr.latitudes_rad is not None
             or smr.zs is not None
             or smr.temps_K is not None
+            or smr.telemetry is not None
         ):
             print(
-                "Warning: writing to csv with temperature profile information! Consider using json instead."
+                "Warning: writing to csv with temperature profile information! Consider using json or npz instead."
             )
         _save_model_csv(smi=smi, smr=smr, output_path=output_path)
 
 
-def _save_model_json(
-    smi: SublimationModelInput, smr: SublimationModelResult, output_path: pathlib.Path
+def save_multi_species(
+    smis: list[SublimationModelInput],
+    smsr: SublimationModelMultiSpeciesResult,
+    output_path: pathlib.Path,
+    out_format: ModelOutputStorageFormat,
 ) -> None:
+    # every species in one file: a json object keyed by species, a csv row for each, or an npz of the arrays of each
+    if out_format == ModelOutputStorageFormat.npz:
+        save_multi_species_npz(smis=smis, smsr=smsr, output_path=output_path)
+        return
+
+    out_dicts = {
+        smi.species.value: model_result_dict(smi, smsr[smi.species]) for smi in smis
+    }
+    if out_format == ModelOutputStorageFormat.json:
+        with open(output_path, "w") as json_file:
+            json.dump(out_dicts, json_file)
+        return
+
+    if any(
+        smr.latitudes_rad is not None
+        or smr.zs is not None
+        or smr.temps_K is not None
+        or smr.telemetry is not None
+        for smr in smsr.results.values()
+    ):
+        print(
+            "Warning: writing to csv with temperature profile information! Consider using json or npz instead."
+        )
+    with open(output_path, "w") as csv_file:
+        writer = csv.DictWriter(
+            csv_file, fieldnames=list(next(iter(out_dicts.values())).keys())
+        )
+        writer.writeheader()
+        writer.writerows(out_dicts.values())
+    return
+
+
+def model_result_dict(model_input, model_result) -> dict[str, Any]:
+    # a shallow dict of the fields of both, unlike asdict, which deep copies the profile arrays, with arrays as
+    # lists for json and csv
+    out_dict = {
+        field.name: getattr(model, field.name)
+        for model in (model_input, model_result)
+        for field in fields(model)
+    }
 
-    smr_cp = copy.deepcopy(smr)
-    if smr_cp.latitudes_rad is not None:
-        smr_cp.latitudes_rad = smr_cp.latitudes_rad.tolist()
-    if smr_cp.zs is not None:
-        smr_cp.zs = smr_cp.zs.tolist()
-    if smr_cp.temps_K is not None:
-        smr_cp.temps_K = smr_cp.temps_K.tolist()
+    # we don't need to save these
+    out_dict.pop("return_profile", None)
+    out_dict.pop("return_telemetry", None)
+    out_dict.pop("return_sensitivities", None)
 
-    out_dict = {**asdict(smi), **asdict(smr_cp)}
+    return {k: _output_value(v) for k, v in out_dict.items()}
 
-    # we don't need to save this
-    out_dict.pop("return_profile")
 
+def _output_value(value: Any) -> Any:
+    # arrays and numpy scalars as python lists and numbers, and nested results such as the solver telemetry as dicts
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if is_dataclass(value):
+        return {
+            field.name: _output_value(getattr(value, field.name))
+            for field in fields(value)
+        }
+    return value
+
+
+def _save_model_json(
+    smi: SublimationModelInput, smr: SublimationModelResult, output_path: pathlib.Path
+) -> None:
     with open(output_path, "w") as json_file:
-        json.dump(out_dict, json_file)
+        json.dump(model_result_dict(smi, smr), json_file)
     return
 
 
 def _save_model_csv(
     smi: SublimationModelInput, smr: SublimationModelResult, output_path: pathlib.Path
 ) -> None:
-
-    smr_cp = copy.deepcopy(smr)
-    if smr_cp.latitudes_rad is not None:
-        smr_cp.latitudes_rad = smr_cp.latitudes_rad.tolist()
-    if smr_cp.zs is not None:
-        smr_cp.zs = smr_cp.zs.tolist()
-    if smr_cp.temps_K is not None:
-        smr_cp.temps_K = smr_cp.temps_K.tolist()
-
-    out_dict = {**asdict(smi), **asdict(smr_cp)}
-
-    # we don't need to save this
-    out_dict.pop("return_profile")
+    out_dict = model_result_dict(smi, smr)
 
     fieldnames = list(out_dict.keys())
     with open(output_path, "w") as csv_file:
@@ -83,3 +142,207 @@ def _save_model_csv(
         writer.writeheader()
         writer.writerow(out_dict)
     return
+
+
+def save_sweep(
+    smsi: SublimationModelSweepInput,
+    smsr: SublimationModelSweepResult,
+    output_path: pathlib.Path,
+    out_format: ModelOutputStorageFormat,
+) -> None:
+    if out_format == ModelOutputStorageFormat.json:
+        _save_sweep_json(smsi=smsi, smsr=smsr, output_path=output_path)
+    elif out_format == ModelOutputStorageFormat.npz:
+        save_sweep_npz(smsi=smsi, smsr=smsr, output_path=output_path)
+    elif out_format == ModelOutputStorageFormat.npy:
+        save_sweep_npy(smsi=smsi, smsr=smsr, output_path=output_path)
+    else:
+        if (
+            smsr.latitudes_rad is not None
+            or smsr.zs is not None
+            or smsr.temps_K is not None
+        ):
+            print(
+                "Warning: temperature profile information is not written to csv! Consider using json or npy instead."
+            )
+        _save_sweep_csv(smsi=smsi, smsr=smsr, output_path=output_path)
+
+
+def save_monte_carlo(
+    smci: SublimationModelMonteCarloInput,
+    smcr: SublimationModelMonteCarloResult,
+    output_path: pathlib.Path,
+) -> None:
+    # json only, as the distributions of the input and the convergence of the result are nested
+    with open(output_path, "w") as json_file:
+        json.dump(model_result_dict(smci, smcr), json_file)
+    return
+
+
+def _save_sweep_json(
+    smsi: SublimationModelSweepInput,
+    smsr: SublimationModelSweepResult,
+    output_path: pathlib.Path,
+) -> None:
+
+    # every field of the sweep input and result is either a scalar or an array
+    with open(output_path, "w") as json_file:
+        json.dump(model_result_dict(smsi, smsr), json_file)
+    return
+
+
+def _save_sweep_csv(
+    smsi: SublimationModelSweepInput,
+    smsr: SublimationModelSweepResult,
+    output_path: pathlib.Path,
+) -> None:
+
+    # one row per point of the sweep, in the same order as the dimensions of z_bar
+    fieldnames = [
+        "species",
+        "visual_albedo",
+        "infrared_albedo",
+        "rh_au",
+        "sub_solar_latitude",
+        "num_latitude_gridpoints",
+        "t_init_K",
+        "z_bar",
+        "log10_z_bar",
+    ]
+    with open(output_path, "w") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(fieldnames)
+        for (i_rh, i_ssl, i_av, i_air), z_bar in np.ndenumerate(smsr.z_bar):
+            writer.writerow(
+                [
+                    smsi.species,
+                    smsi.visual_albedos[i_av],
+                    smsi.infrared_albedos[i_air],
+                    smsi.rh_aus[i_rh],
+                    smsi.sub_solar_latitudes[i_ssl],
+                    smsi.num_latitude_gridpoints,
+                    smsi.t_init_K,
+                    z_bar,
+                    smsr.log10_z_bar[i_rh, i_ssl, i_av, i_air],
+                ]
+            )
+    return
+
+
+class LightCurveWriter:
+    """
+    Writes the results of a light curve one epoch at a time as they are produced, flushing after each, as csv
+    rows or as json objects, one per line.  Latitude profiles are only written to json.
+    """
+
+    fieldnames = [
+        "epoch",
+        "species",
+        "visual_albedo",
+        "infrared_albedo",
+        "rh_au",
+        "sub_solar_latitude",
+        "z_bar",
+        "log10_z_bar",
+        "z_bar_error",
+        "num_iterations",
+    ]
+
+    def __init__(
+        self,
+        smi: SublimationModelInput,
+        output_path: pathlib.Path,
+        out_format: ModelOutputStorageFormat,
+    ):
+        self.smi = smi
+        self.out_format = out_format
+        if out_format == ModelOutputStorageFormat.csv and smi.return_profile:
+            print(
+                "Warning: temperature profile information is not written to csv! Consider using json instead."
+            )
+
+        self._file = open(output_path, "w", newline="")
+        if out_format == ModelOutputStorageFormat.csv:
+            self._csv_writer = csv.writer(self._file)
+            self._csv_writer.writerow(self.fieldnames)
+
+    def write(self, row: EphemerisRow, smr: SublimationModelResult) -> None:
+        values = [
+            row.epoch,
+            self.smi.species,
+            self.smi.visual_albedo,
+            self.smi.infrared_albedo,
+            row.rh_au,
+            row.sub_solar_latitude,
+            smr.z_bar,
+            smr.log10_z_bar,
+            smr.z_bar_error,
+            smr.num_iterations,
+        ]
+        if self.out_format == ModelOutputStorageFormat.csv:
+            self._csv_writer.writerow(values)
+        else:
+            out_dict = {
+                k: v.item() if isinstance(v, np.generic) else v
+                for k, v in zip(self.fieldnames, values)
+            }
+            for k in ["latitudes_rad", "zs", "temps_K"]:
+                if getattr(smr, k) is not None:
+                    out_dict[k] = getattr(smr, k).tolist()
+            self._file.write(json.dumps(out_dict) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BatchResultWriter:
+    """
+    Writes the results of a batch to a stream one row at a time as they are produced, flushing after each, as csv
+    rows or as json objects, one per line.  Rows that failed are written with their error message in place of the
+    results.  Latitude profiles are only written to json.
+    """
+
+    fieldnames = [
+        "row",
+        "id",
+        "species",
+        "visual_albedo",
+        "infrared_albedo",
+        "rh_au",
+        "sub_solar_latitude",
+        "num_latitude_gridpoints",
+        "z_bar",
+        "log10_z_bar",
+        "z_bar_error",
+        "num_iterations",
+        "num_energy_balance_problems",
+        "num_energy_balance_solves",
+        "error",
+    ]
+
+    def __init__(self, stream: TextIO, out_format: ModelOutputStorageFormat):
+        self._stream = stream
+        self.out_format = out_format
+        if out_format == ModelOutputStorageFormat.csv:
+            self._csv_writer = csv.DictWriter(stream, fieldnames=self.fieldnames)
+            self._csv_writer.writeheader()
+
+    def write(self, result: BatchModelResult) -> None:
+        out_dict = {"row": result.input_row.row, "id": result.input_row.id}
+        if result.smr is not None:
+            out_dict |= model_result_dict(result.input_row.smi, result.smr)
+        else:
+            out_dict["error"] = result.error
+
+        if self.out_format == ModelOutputStorageFormat.csv:
+            self._csv_writer.writerow({k: out_dict.get(k) for k in self.fieldnames})
+        else:
+            self._stream.write(json.dumps(out_dict) + "\n")
+        self._stream.flush()
@@ -0,0 +1,434 @@
+import collections
+import dataclasses
+import http.server
+import json
+import logging
+import os
+import pathlib
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+import numpy as np
+
+from comet_ice_sublimation.model_cache.model_cache import *
+from comet_ice_sublimation.model_input.batch_input import batch_record_to_input
+from comet_ice_sublimation.model_input.sublimation_model_input import *
+from comet_ice_sublimation.model_output.sublimation_model_output import *
+from comet_ice_sublimation.model_runner.model_runner import *
+from comet_ice_sublimation.model_saver.model_saver import model_result_dict
+
+default_server_port = 8765
+default_max_batch_size = 256
+default_batch_wait_ms = 2.0
+default_result_cache_size = 4096
+
+# number of the most recent requests that the latency percentiles are taken over
+latency_window = 4096
+throughput_window_s = 60.0
+
+
+class ModelServerStats:
+    """
+    Counts of the models run by a SublimationModelServer, and their latencies from being submitted to their result
+    being ready, over the most recent latency_window of them.  Safe to update and read from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.num_requests = 0
+        self.num_errors = 0
+        self.num_batches = 0
+        self.num_batched_requests = 0
+        self.num_models_solved = 0
+        # sunlit latitudes of the models solved, and the distinct energy balance problems solved for them
+        self.num_energy_balance_problems = 0
+        self.num_energy_balance_solves = 0
+        self.result_cache_hits = 0
+        self.result_cache_misses = 0
+        # (time the result was ready, latency in seconds) of the most recent requests
+        self._recent = collections.deque(maxlen=latency_window)
+        self.disk_cache_stats = None
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.num_requests += 1
+
+    def record_batch(
+        self,
+        batch_size: int,
+        num_solved: int,
+        num_hits: int,
+        num_misses: int,
+        num_problems: int = 0,
+        num_solves: int = 0,
+    ) -> None:
+        with self._lock:
+            self.num_batches += 1
+            self.num_batched_requests += batch_size
+            self.num_models_solved += num_solved
+            self.num_energy_balance_problems += num_problems
+            self.num_energy_balance_solves += num_solves
+            self.result_cache_hits += num_hits
+            self.result_cache_misses += num_misses
+
+    def record_done(self, submitted_at: float, failed: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if failed:
+                self.num_errors += 1
+            self._recent.append((now, now - submitted_at))
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            recent = np.array(self._recent, dtype=np.float64).reshape(-1, 2)
+            stats = {
+                "uptime_s": now - self.start_time,
+                "requests": self.num_requests,
+                "errors": self.num_errors,
+                "batches": self.num_batches,
+                "mean_batch_size": self.num_batched_requests / max(self.num_batches, 1),
+                "models_solved": self.num_models_solved,
+                "energy_balance_problems": self.num_energy_balance_problems,
+                "energy_balance_solves": self.num_energy_balance_solves,
+                "deduplication_ratio": self.num_energy_balance_problems
+                / max(self.num_energy_balance_solves, 1),
+                "result_cache_hits": self.result_cache_hits,
+                "result_cache_misses": self.result_cache_misses,
+                "disk_cache": self.disk_cache_stats,
+            }
+
+        # requests answered per second over the last throughput_window_s
+        window_s = min(throughput_window_s, stats["uptime_s"])
+        num_answered = int(np.count_nonzero(recent[:, 0] >= now - window_s))
+        stats["throughput_per_s"] = num_answered / max(window_s, 1e-9)
+
+        stats["latency_ms"] = None
+        if recent.shape[0] > 0:
+            p50, p90, p99 = (1e3 * np.percentile(recent[:, 1], [50, 90, 99])).tolist()
+            stats["latency_ms"] = {
+                "p50": p50,
+                "p90": p90,
+                "p99": p99,
+                "max": 1e3 * float(recent[:, 1].max()),
+            }
+        return stats
+
+
+@dataclasses.dataclass
+class _PendingModel:
+    smi: SublimationModelInput
+    future: Future
+    submitted_at: float
+
+
+# put in the request queue to stop the batcher
+_stop_batcher = object()
+
+
+class SublimationModelServer:
+    """
+    Runs models submitted from any number of threads on one batcher thread, which waits up to batch_wait_ms after
+    the first model of a batch for others to arrive, and runs them together with run_sublimation_models_vectorized.
+    Identical inputs in a batch are run once, and the results of the last result_cache_size distinct inputs are kept
+    in memory, as well as in a SublimationModelCache in cache_dir if one is given.  The latitude grids and energy
+    balance tables stay cached in the process between batches.
+    """
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path | None = None,
+        max_batch_size: int = default_max_batch_size,
+        batch_wait_ms: float = default_batch_wait_ms,
+        result_cache_size: int = default_result_cache_size,
+    ):
+        self.cache_dir = cache_dir
+        self.max_batch_size = max_batch_size
+        self.batch_wait_s = batch_wait_ms / 1e3
+        self.result_cache_size = result_cache_size
+        self.stats = ModelServerStats()
+
+        self._requests = queue.Queue()
+        self._results = collections.OrderedDict()
+        self._batcher = threading.Thread(
+            target=self._run_batcher, name="model-batcher", daemon=True
+        )
+        self._batcher.start()
+
+    def submit(self, smi: SublimationModelInput) -> Future:
+        future = Future()
+        self.stats.record_request()
+        self._requests.put(_PendingModel(smi, future, time.monotonic()))
+        return future
+
+    def run(self, smi: SublimationModelInput) -> SublimationModelResult:
+        return self.submit(smi).result()
+
+    def close(self) -> None:
+        self._requests.put(_stop_batcher)
+        self._batcher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _run_batcher(self) -> None:
+        # the sqlite connection of the cache can only be used on the thread that opened it
+        cache = (
+            SublimationModelCache(cache_dir=self.cache_dir)
+            if self.cache_dir is not None
+            else None
+        )
+        try:
+            stopping = False
+            while not stopping:
+                pending = self._requests.get()
+                if pending is _stop_batcher:
+                    break
+                batch = [pending]
+                deadline = time.monotonic() + self.batch_wait_s
+                while len(batch) < self.max_batch_size:
+                    try:
+                        pending = self._requests.get(
+                            timeout=max(deadline - time.monotonic(), 0.0)
+                        )
+                    except queue.Empty:
+                        break
+                    if pending is _stop_batcher:
+                        stopping = True
+                        break
+                    batch.append(pending)
+                self._run_batch(batch, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+            # requests submitted after close are not run
+            while not self._requests.empty():
+                pending = self._requests.get_nowait()
+                if pending is not _stop_batcher:
+                    pending.future.cancel()
+
+    def _run_batch(
+        self, batch: list[_PendingModel], cache: SublimationModelCache | None
+    ) -> None:
+        # requests with the same input share one run
+        waiting = collections.defaultdict(list)
+        inputs = {}
+        for pending in batch:
+            if not pending.future.set_running_or_notify_cancel():
+                continue
+            key = sublimation_model_input_key(pending.smi)
+            waiting[key].append(pending)
+            inputs.setdefault(key, pending.smi)
+
+        results = {}
+        for key, smi in inputs.items():
+            smr = self._results.get(key)
+            if smr is None and cache is not None:
+                smr = cache.get(smi=smi)
+            if smr is not None:
+                self._results[key] = smr
+                self._results.move_to_end(key)
+                results[key] = smr
+        num_hits = len(results)
+
+        to_solve = [key for key in inputs if key not in results]
+        errors = {}
+        if to_solve:
+            remaining = to_solve
+            while remaining:
+                try:
+                    smrs = run_sublimation_models_vectorized(
+                        [inputs[key] for key in remaining]
+                    )
+                    results |= dict(zip(remaining, smrs))
+                    remaining = []
+                except EnergyBalanceConvergenceError as e:
+                    # only the models that failed are run on their own, for their own errors, and the rest are
+                    # solved together again
+                    failed = {remaining[i] for i in e.indices}
+                    for key in failed:
+                        try:
+                            results[key] = run_sublimation_model(inputs[key])
+                        except Exception as model_error:
+                            errors[key] = model_error
+                    remaining = [key for key in remaining if key not in failed]
+                except Exception:
+                    # run each on its own, so a model that fails doesn't fail the others
+                    for key in remaining:
+                        try:
+                            results[key] = run_sublimation_model(inputs[key])
+                        except Exception as model_error:
+                            errors[key] = model_error
+                    remaining = []
+
+            for key in to_solve:
+                if key not in results:
+                    continue
+                self._results[key] = results[key]
+                if cache is not None:
+                    cache.put(smi=inputs[key], smr=results[key])
+            while len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+
+        solved = [results[key] for key in to_solve if key in results]
+        self.stats.record_batch(
+            batch_size=len(batch),
+            num_solved=len(to_solve),
+            num_hits=num_hits,
+            num_misses=len(to_solve),
+            num_problems=sum(smr.num_energy_balance_problems or 0 for smr in solved),
+            num_solves=sum(smr.num_energy_balance_solves or 0 for smr in solved),
+        )
+        if cache is not None:
+            self.stats.disk_cache_stats = cache.stats()
+
+        for key, pendings in waiting.items():
+            for pending in pendings:
+                if key in errors:
+                    pending.future.set_exception(errors[key])
+                else:
+                    pending.future.set_result(results[key])
+                self.stats.record_done(pending.submitted_at, failed=key in errors)
+        logging.debug(
+            f"Batch of {len(batch)} requests: {len(inputs)} distinct inputs, {num_hits} cached,"
+            f" {len(to_solve)} solved, {len(errors)} failed"
+        )
+
+
+def run_model_records(
+    model_server: SublimationModelServer, records: list[Any]
+) -> list[tuple[dict[str, Any], int]]:
+    """
+    Runs the model on each record, which gives the fields of a model input as in a batch, and returns the record of
+    each result, as save_model writes it in json, along with its http status.  Every record is submitted before
+    waiting on any, so that they are solved in the same batch.  An optional "id" field is passed through.
+    """
+
+    # the future of each valid record, or the error message of an invalid one
+    submitted = []
+    for record in records:
+        if not isinstance(record, dict):
+            submitted.append((None, None, "Model input must be a json object"))
+            continue
+        record = dict(record)
+        record_id = record.pop("id", None)
+        try:
+            smi = batch_record_to_input(record)
+            error = sublimation_model_input_error(smi)
+        except (TypeError, ValueError) as e:
+            error = str(e)
+        if error is not None:
+            submitted.append((record_id, None, error))
+        else:
+            submitted.append((record_id, smi, model_server.submit(smi)))
+
+    out_records = []
+    for record_id, smi, future in submitted:
+        if smi is None:
+            out_records.append(({"id": record_id, "error": future}, 400))
+            continue
+        try:
+            smr = future.result()
+        except Exception as e:
+            out_records.append(
+                ({"id": record_id, "error": str(e) or type(e).__name__}, 500)
+            )
+            continue
+        out_records.append(({"id": record_id} | model_result_dict(smi, smr), 200))
+    return out_records
+
+
+class _ModelRequestHandler(http.server.BaseHTTPRequestHandler):
+    # keep connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path == "/stats":
+            self._send_json(self.server.model_server.stats.as_dict())
+        else:
+            self._send_json({"error": f"Unknown path {self.path}"}, status=404)
+
+    def do_POST(self) -> None:
+        if self.path != "/run":
+            self._send_json({"error": f"Unknown path {self.path}"}, status=404)
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            self._send_json({"error": f"Invalid json: {e}"}, status=400)
+            return
+
+        # a list of inputs gives a list of results, each with its own error if it failed
+        if isinstance(payload, list):
+            out_records = run_model_records(self.server.model_server, payload)
+            self._send_json([out_record for out_record, _ in out_records])
+        else:
+            [(out_record, status)] = run_model_records(
+                self.server.model_server, [payload]
+            )
+            self._send_json(out_record, status=status)
+
+    def _send_json(self, value: Any, status: int = 200) -> None:
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # the client address is empty on unix sockets
+        logging.debug(format % args)
+
+
+class _ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+def make_model_http_server(
+    model_server: SublimationModelServer,
+    port: int = default_server_port,
+    socket_path: pathlib.Path | None = None,
+) -> socketserver.BaseServer:
+    """
+    Builds an http server for model_server, listening on socket_path if it is given and on port of localhost
+    otherwise, that answers POST /run with the result of a json model input, or a list of them, and GET /stats with
+    the stats of the server.  Call serve_forever on it to handle requests, one thread per connection.
+    """
+
+    if socket_path is None:
+        http_server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", port), _ModelRequestHandler
+        )
+    else:
+        socket_path = pathlib.Path(socket_path)
+        _remove_stale_socket(socket_path)
+        http_server = _ThreadingUnixHTTPServer(str(socket_path), _ModelRequestHandler)
+    http_server.model_server = model_server
+    return http_server
+
+
+def _remove_stale_socket(socket_path: pathlib.Path) -> None:
+    # a socket file left behind by a server that was killed is removed, but one that is still being served is not
+    if not socket_path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise OSError(f"A server is already listening on {socket_path}")
@@ -1,15 +1,46 @@
 import argparse
+import math
 import pathlib
 from dataclasses import dataclass
 from enum import StrEnum
+from typing import TYPE_CHECKING
 
-from comet_ice_sublimation.model_input import *
+# numpy is only imported by the functions that build sweeps, so that --help and argument errors don't wait for it
+from comet_ice_sublimation.model_input.batch_input import BatchInputFormat
+from comet_ice_sublimation.model_input.sublimation_model_input import (
+    EnergyBalanceSolver,
+    EnergyBalanceTableMode,
+    LatitudeQuadrature,
+    SublimationModelInput,
+    default_energy_balance_tolerance,
+    default_quadrature_rtol,
+    sublimation_model_input_error,
+)
+from comet_ice_sublimation.model_input.sublimation_model_monte_carlo_input import (
+    ParameterDistribution,
+    SublimationModelMonteCarloInput,
+    default_monte_carlo_batch_size,
+    default_monte_carlo_quantile_levels,
+    parse_parameter_distribution,
+    sublimation_model_monte_carlo_input_error,
+)
 from comet_ice_sublimation.molecular_species import *
 
+if TYPE_CHECKING:
+    import numpy as np
+
+    from comet_ice_sublimation.model_input.sublimation_model_sweep_input import (
+        SublimationModelSweepInput,
+    )
+
 
 class ModelOutputStorageFormat(StrEnum):
     csv = "csv"
     json = "json"
+    # numpy arrays in one uncompressed .npz file
+    npz = "npz"
+    # a directory of .npy files that can be memory-mapped, with an index.json (sweeps only)
+    npy = "npy"
 
 
 @dataclass
@@ -20,7 +51,8 @@ class ModelOutputConfig:
 
 @dataclass
 class SublimationModelArguments:
-    species: MolecularSpecies
+    # one or more, run together on the same latitude grid and incident flux
+    species: list[MolecularSpecies]
     visual_albedo: float
     infrared_albedo: float
     heliocentric_distance: float
@@ -30,6 +62,115 @@ class SublimationModelArguments:
     return_profile: bool
     output_config: ModelOutputConfig | None
     verbosity: int
+    energy_balance_table: EnergyBalanceTableMode
+    continuation: bool
+    solver: EnergyBalanceSolver
+    tolerance: float
+    quadrature: LatitudeQuadrature
+    quadrature_rtol: float
+    return_telemetry: bool
+    return_sensitivities: bool
+    cache_dir: pathlib.Path | None
+
+
+@dataclass
+class SublimationSweepArguments:
+    species: MolecularSpecies
+    visual_albedos: "np.ndarray"
+    infrared_albedos: "np.ndarray"
+    heliocentric_distances: "np.ndarray"
+    sub_solar_latitudes: "np.ndarray"
+    num_latitude_gridpoints: int
+    initial_temperature_kelvin: float | None
+    return_profile: bool
+    output_config: ModelOutputConfig | None
+    verbosity: int
+    energy_balance_table: EnergyBalanceTableMode
+    continuation: bool
+    solver: EnergyBalanceSolver
+    tolerance: float
+    workers: int | None
+
+
+@dataclass
+class LightCurveArguments:
+    species: MolecularSpecies
+    ephemeris_path: pathlib.Path
+    visual_albedo: float
+    infrared_albedo: float
+    num_latitude_gridpoints: int
+    initial_temperature_kelvin: float | None
+    return_profile: bool
+    output_config: ModelOutputConfig | None
+    verbosity: int
+    energy_balance_table: EnergyBalanceTableMode
+    continuation: bool
+    solver: EnergyBalanceSolver
+    tolerance: float
+    quadrature: LatitudeQuadrature
+    quadrature_rtol: float
+
+
+@dataclass
+class BatchArguments:
+    input_path: pathlib.Path | None
+    input_format: BatchInputFormat
+    output_path: pathlib.Path | None
+    output_format: ModelOutputStorageFormat
+    verbosity: int
+    workers: int | None
+    window: int | None
+
+
+@dataclass
+class MonteCarloArguments:
+    species: MolecularSpecies
+    visual_albedo: ParameterDistribution
+    infrared_albedo: ParameterDistribution
+    heliocentric_distance: ParameterDistribution
+    sub_solar_latitude: ParameterDistribution
+    num_latitude_gridpoints: int
+    initial_temperature_kelvin: float | None
+    num_samples: int
+    seed: int | None
+    batch_size: int
+    quantile_levels: tuple[float, ...]
+    output_path: pathlib.Path | None
+    verbosity: int
+    energy_balance_table: EnergyBalanceTableMode
+    solver: EnergyBalanceSolver
+    tolerance: float
+    workers: int | None
+
+
+@dataclass
+class BuildTableArguments:
+    species: MolecularSpecies
+    visual_albedos: "np.ndarray"
+    infrared_albedos: "np.ndarray"
+    heliocentric_distances: "np.ndarray"
+    sub_solar_latitudes: "np.ndarray"
+    num_latitude_gridpoints: int
+    initial_temperature_kelvin: float | None
+    output_path: pathlib.Path
+    num_check_points: int
+    seed: int
+    verbosity: int
+    energy_balance_table: EnergyBalanceTableMode
+    solver: EnergyBalanceSolver
+    tolerance: float
+    workers: int | None
+
+
+@dataclass
+class ServeArguments:
+    port: int
+    socket_path: pathlib.Path | None
+    cache_dir: pathlib.Path | None
+    max_batch_size: int
+    batch_wait_ms: float
+    result_cache_size: int
+    verbosity: int
 
 
 description1 = (
@@ -45,15 +186,132 @@ description2 = (
 )
 
 
+table_help = (
+    "Interpolate surface temperatures from a precomputed table instead of solving the energy balance at"
+    " every latitude. 'polish' also takes a single Newton step from the interpolated temperature."
+    " The estimated error of the table is logged at verbosity 1."
+)
+
+continuation_help = (
+    "Solve the energy balance on every few latitudes first, and start the iteration at the remaining latitudes"
+    " from the temperatures of their solved neighbours."
+)
+
+solver_help = (
+    "Method used to solve the energy balance at each latitude: damped Newton steps of at most 10 K"
+    " (clamped-newton), Newton steps safeguarded by bisection (newton-bisection), or Brent's method (brent)."
+)
+
+quadrature_help = (
+    "Rule used to integrate the production over latitude: the trapezoid rule on --nlat latitudes (trapezoid),"
+    " Gauss-Kronrod panels with about --nlat nodes in all (gauss-kronrod), or panels refined until the"
+    " estimated error is below --quadrature-rtol (adaptive)."
+)
+
+subcommands_epilog = (
+    "Other modes are run by giving their name in place of the species:\n"
+    "  comet_ice sweep ...\tRun the model over a grid of parameters\n"
+    "  comet_ice light-curve ...\tRun the model at every epoch of an ephemeris\n"
+    "  comet_ice batch ...\tRun the model on a stream of json or csv inputs\n"
+    "  comet_ice monte-carlo ...\tRun the model on random draws of uncertain parameters\n"
+    "  comet_ice build-table ...\tTabulate Zbar over a grid of parameters for fast interpolation\n"
+    "  comet_ice serve ...\tRun the model on json inputs sent over http\n"
+    "Pass --help after the mode name for its options."
+)
+
+
+def _model_arguments() -> argparse.ArgumentParser:
+    # options of the latitude grid and energy balance solve, shared by every mode that runs the model
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--nlat", metavar="n", type=int, default=181, help="Number of latitude steps"
+    )
+    parser.add_argument(
+        "--table",
+        choices=[x.value for x in EnergyBalanceTableMode],
+        default="off",
+        help=table_help,
+    )
+    parser.add_argument(
+        "--solver",
+        choices=[x.value for x in EnergyBalanceSolver],
+        default=EnergyBalanceSolver.clamped_newton.value,
+        help=solver_help,
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=default_energy_balance_tolerance,
+        help="The energy balance is solved when the net flux is below this fraction of the incident flux",
+    )
+    return parser
+
+
+def _latitude_profile_arguments() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--profiles",
+        type=bool,
+        default=False,
+        help="Return temperatures and sublimation rates as function of latitude",
+    )
+    parser.add_argument(
+        "--continuation",
+        action="store_true",
+        help=continuation_help,
+    )
+    return parser
+
+
+def _quadrature_arguments() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--quadrature",
+        choices=[x.value for x in LatitudeQuadrature],
+        default=LatitudeQuadrature.trapezoid.value,
+        help=quadrature_help,
+    )
+    parser.add_argument(
+        "--quadrature-rtol",
+        type=float,
+        default=default_quadrature_rtol,
+        help="Relative error in z_bar that adaptive quadrature refines the latitude panels to",
+    )
+    return parser
+
+
+def _verbosity_arguments(quiet_output: str) -> argparse.ArgumentParser:
+    # quiet_output says what a mode shows when it doesn't log
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--verbosity",
+        "-v",
+        metavar="verbosity",
+        type=int,
+        default=0,
+        help=f"By default (verbosity = 0), {quiet_output}."
+        " A verbosity of 1 will output the logger messages as well.",
+    )
+    return parser
+
+
 def parse_arguments() -> SublimationModelArguments:
     parser = argparse.ArgumentParser(
         description="\n\n".join([description1, description2]),
+        epilog=subcommands_epilog,
         formatter_class=argparse.RawTextHelpFormatter,
+        parents=[
+            _model_arguments(),
+            _latitude_profile_arguments(),
+            _quadrature_arguments(),
+            _verbosity_arguments("only the final result will be displayed in stdout"),
+        ],
     )
     parser.add_argument(
         "species",
         choices=MolecularSpecies.all_species(),
-        help="Ice species to consider.",
+        nargs="+",
+        help="Ice species to consider. Several species are run together, sharing the latitude grid and incident flux.",
     )
     parser.add_argument(
         "--Av",
@@ -79,9 +337,6 @@ def parse_arguments() -> SublimationModelArguments:
         type=float,
         required=True,
     )
-    parser.add_argument(
-        "--nlat", metavar="n", type=int, default=181, help="Number of latitude steps"
-    )
     parser.add_argument(
         "--temp",
         metavar="temperature",
@@ -94,25 +349,32 @@ def parse_arguments() -> SublimationModelArguments:
         "CO: 60 K\n",
     )
     parser.add_argument(
-        "--profiles",
-        type=bool,
-        default=False,
-        help="Return temperatures and sublimation rates as function of latitude",
+        "--telemetry",
+        action="store_true",
+        help="Save the energy balance iterations, final residual, and clamped steps at every latitude with the"
+        " results.  A summary of these is logged at verbosity 1 either way.",
+    )
+    parser.add_argument(
+        "--sensitivities",
+        action="store_true",
+        help="Print and save the derivatives of Zbar with respect to Av, Air, rh, and ssl, found analytically from"
+        " the converged energy balance at about the cost of one more iteration",
     )
     parser.add_argument(
         "-o", metavar="filename", dest="filename", help="Save results to this file name"
     )
     parser.add_argument(
-        "--format", choices=["json", "csv"], default="json", help="output file format"
+        "--format",
+        choices=["json", "csv", "npz"],
+        default="json",
+        help="output file format",
     )
+
     parser.add_argument(
-        "--verbosity",
-        "-v",
-        metavar="verbosity",
-        type=int,
-        default=0,
-        help="By default (verbosity = 0), only the final result will be displayed in stdout."
-        " A verbosity of 1 will output the logger messages as well.",
+        "--cache-dir",
+        metavar="directory",
+        default=None,
+        help="Keep results in a cache in this directory, and reuse them when the model is run with the same input",
     )
 
     args = parser.parse_args()
@@ -124,7 +386,8 @@ def parse_arguments() -> SublimationModelArguments:
         )
 
     return SublimationModelArguments(
-        species=MolecularSpecies(args.species),
+        # in the order given, running a species given twice only once
+        species=list(dict.fromkeys(MolecularSpecies(s) for s in args.species)),
         visual_albedo=args.Av,
         infrared_albedo=args.Air,
         heliocentric_distance=abs(args.rh),
@@ -134,15 +397,24 @@ def parse_arguments() -> SublimationModelArguments:
         return_profile=args.profiles,
         output_config=output_config,
         verbosity=args.verbosity,
+        energy_balance_table=EnergyBalanceTableMode(args.table),
+        continuation=args.continuation,
+        solver=EnergyBalanceSolver(args.solver),
+        tolerance=args.tolerance,
+        quadrature=LatitudeQuadrature(args.quadrature),
+        quadrature_rtol=args.quadrature_rtol,
+        return_telemetry=args.telemetry,
+        return_sensitivities=args.sensitivities,
+        cache_dir=pathlib.Path(args.cache_dir) if args.cache_dir is not None else None,
     )
 
 
 def sublimation_model_input_from_args(
-    args: SublimationModelArguments,
+    args: SublimationModelArguments, species: MolecularSpecies
 ) -> SublimationModelInput | None:
 
     smi = SublimationModelInput(
-        species=args.species,
+        species=species,
         visual_albedo=args.visual_albedo,
         infrared_albedo=args.infrared_albedo,
         rh_au=abs(args.heliocentric_distance),
@@ -150,20 +422,803 @@ def sublimation_model_input_from_args(
         num_latitude_gridpoints=args.num_latitude_gridpoints,
         t_init_K=args.initial_temperature_kelvin,
         return_profile=args.return_profile,
+        energy_balance_table=args.energy_balance_table,
+        continuation=args.continuation,
+        solver=args.solver,
+        tolerance=args.tolerance,
+        quadrature=args.quadrature,
+        quadrature_rtol=args.quadrature_rtol,
+        return_telemetry=args.return_telemetry,
+        return_sensitivities=args.return_sensitivities,
+    )
+
+    error = sublimation_model_input_error(smi)
+    if error is not None:
+        print(error)
+        return None
+
+    # fill in starting temperature based on the selected species
+    if smi.t_init_K is None:
+        smi.t_init_K = get_starting_temperature(smi.species)
+
+    return smi
+
+
+sweep_axis_help = (
+    "One or more values, each either a number or start:stop:num for num evenly spaced values"
+    " from start to stop, inclusive, or start:stop:num:log for num values evenly spaced in their logarithm."
+)
+
+
+def _parse_sweep_axis(values: list[str]) -> "np.ndarray":
+    import numpy as np
+
+    # raises ValueError describing the first value that can't be read
+    axis = []
+    for value in values:
+        if ":" in value:
+            try:
+                start, stop, num, *spacing = value.split(":")
+                start, stop, num = float(start), float(stop), int(num)
+            except ValueError:
+                raise ValueError(
+                    f"Expected a number or start:stop:num for a sweep axis, not '{value}'"
+                ) from None
+            if spacing == ["log"]:
+                axis_values = np.geomspace(start, stop, num)
+            elif not spacing:
+                axis_values = np.linspace(start, stop, num)
+            else:
+                raise ValueError(f"Unknown spacing '{':'.join(spacing)}' in '{value}'")
+            axis.extend(axis_values.tolist())
+        else:
+            try:
+                axis.append(float(value))
+            except ValueError:
+                raise ValueError(
+                    f"Expected a number or start:stop:num for a sweep axis, not '{value}'"
+                ) from None
+    return np.array(axis)
+
+
+def parse_sweep_arguments(argv: list[str] | None = None) -> SublimationSweepArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice sweep",
+        description="Runs the model on every combination of the given heliocentric distances,"
+        " sub-solar latitudes, and albedos.\n\n" + sweep_axis_help,
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[
+            _model_arguments(),
+            _latitude_profile_arguments(),
+            _verbosity_arguments("only the final results will be displayed in stdout"),
+        ],
+    )
+    parser.add_argument(
+        "species",
+        choices=MolecularSpecies.all_species(),
+        help="Ice species to consider.",
+    )
+    parser.add_argument(
+        "--Av",
+        metavar="visual_albedo",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--Air",
+        metavar="infrared_albedo",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--rh",
+        metavar="heliocentric_distance",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--ssl",
+        metavar="sub_solar_latitude",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--temp",
+        metavar="temperature",
+        type=float,
+        default=None,
+        help="Not passing a starting temperature will default to a species dependent starting value",
+    )
+    parser.add_argument(
+        "-o", metavar="filename", dest="filename", help="Save results to this file name"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "csv", "npz", "npy"],
+        default="json",
+        help="output file format: npy writes a directory of arrays that can be memory-mapped",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="n",
+        type=int,
+        default=1,
+        help="Number of worker processes to split the sweep across."
+        " Passing 0 uses one worker per available cpu.",
+    )
+
+    args = parser.parse_args(argv)
+
+    import numpy as np
+
+    try:
+        axes = [_parse_sweep_axis(a) for a in (args.Av, args.Air, args.rh, args.ssl)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    output_config: ModelOutputConfig | None = None
+    if args.filename is not None:
+        output_config = ModelOutputConfig(
+            output_path=pathlib.Path(args.filename), output_format=args.format
+        )
+
+    return SublimationSweepArguments(
+        species=MolecularSpecies(args.species),
+        visual_albedos=axes[0],
+        infrared_albedos=axes[1],
+        heliocentric_distances=np.abs(axes[2]),
+        sub_solar_latitudes=axes[3],
+        num_latitude_gridpoints=args.nlat,
+        initial_temperature_kelvin=args.temp,
+        return_profile=args.profiles,
+        output_config=output_config,
+        verbosity=args.verbosity,
+        energy_balance_table=EnergyBalanceTableMode(args.table),
+        continuation=args.continuation,
+        solver=EnergyBalanceSolver(args.solver),
+        tolerance=args.tolerance,
+        workers=args.workers if args.workers > 0 else None,
+    )
+
+
+def sublimation_model_sweep_input_from_args(
+    args: SublimationSweepArguments,
+) -> "SublimationModelSweepInput | None":
+    import numpy as np
+
+    from comet_ice_sublimation.model_input.sublimation_model_sweep_input import (
+        SublimationModelSweepInput,
+    )
+
+    smsi = SublimationModelSweepInput(
+        species=args.species,
+        visual_albedos=args.visual_albedos,
+        infrared_albedos=args.infrared_albedos,
+        rh_aus=np.abs(args.heliocentric_distances),
+        sub_solar_latitudes=args.sub_solar_latitudes,
+        num_latitude_gridpoints=args.num_latitude_gridpoints,
+        t_init_K=args.initial_temperature_kelvin,
+        return_profile=args.return_profile,
+        energy_balance_table=args.energy_balance_table,
+        continuation=args.continuation,
+        solver=args.solver,
+        tolerance=args.tolerance,
     )
 
-    if smi.visual_albedo < 0.0 or smi.visual_albedo > 1.0:
+    if np.any(smsi.visual_albedos < 0.0) or np.any(smsi.visual_albedos > 1.0):
         print(f"Visual albedo must be between 0 and 1, inclusive!")
         return None
-    if smi.infrared_albedo < 0.0 or smi.infrared_albedo > 1.0:
+    if np.any(smsi.infrared_albedos < 0.0) or np.any(smsi.infrared_albedos > 1.0):
         print(f"Infrared albedo must be between 0 and 1, inclusive!")
         return None
-    if smi.sub_solar_latitude > 90.0 or smi.sub_solar_latitude < -90.0:
+    if np.any(smsi.sub_solar_latitudes > 90.0) or np.any(
+        smsi.sub_solar_latitudes < -90.0
+    ):
         print(f"Sub-solar latitude must be between -90 degrees and +90 degrees!")
         return None
 
+    # fill in starting temperature based on the selected species
+    if smsi.t_init_K is None:
+        smsi.t_init_K = get_starting_temperature(smsi.species)
+
+    return smsi
+
+
+ephemeris_help = (
+    "Ephemeris file with the epoch, heliocentric distance (AU) and sub-solar latitude (degrees) of each point of the"
+    " orbit: a .csv file with these three columns, optionally under a header naming them epoch, rh, and ssl, a .npy"
+    " array with one row per epoch, or an .npz file with arrays named epoch, rh, and ssl."
+)
+
+
+def parse_light_curve_arguments(
+    argv: list[str] | None = None,
+) -> LightCurveArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice light-curve",
+        description="Runs the model at every epoch of an ephemeris in one process, starting each epoch from the"
+        " temperatures of the one before it, and prints or saves each result as soon as it is done.",
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[
+            _model_arguments(),
+            _latitude_profile_arguments(),
+            _quadrature_arguments(),
+            _verbosity_arguments("only the results will be displayed in stdout"),
+        ],
+    )
+    parser.add_argument(
+        "species",
+        choices=MolecularSpecies.all_species(),
+        help="Ice species to consider.",
+    )
+    parser.add_argument("ephemeris", help=ephemeris_help)
+    parser.add_argument(
+        "--Av",
+        metavar="visual_albedo",
+        type=float,
+        required=True,
+    )
+    parser.add_argument(
+        "--Air",
+        metavar="infrared_albedo",
+        type=float,
+        required=True,
+    )
+    parser.add_argument(
+        "--temp",
+        metavar="temperature",
+        type=float,
+        default=None,
+        help="Starting temperature of the first epoch. Not passing a starting temperature will default to a"
+        " species dependent starting value",
+    )
+    parser.add_argument(
+        "-o",
+        metavar="filename",
+        dest="filename",
+        help="Save results to this file name, one row per epoch",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "csv"],
+        default="json",
+        help="output file format: json writes one object per line",
+    )
+
+    args = parser.parse_args(argv)
+
+    output_config: ModelOutputConfig | None = None
+    if args.filename is not None:
+        output_config = ModelOutputConfig(
+            output_path=pathlib.Path(args.filename), output_format=args.format
+        )
+
+    return LightCurveArguments(
+        species=MolecularSpecies(args.species),
+        ephemeris_path=pathlib.Path(args.ephemeris),
+        visual_albedo=args.Av,
+        infrared_albedo=args.Air,
+        num_latitude_gridpoints=args.nlat,
+        initial_temperature_kelvin=args.temp,
+        return_profile=args.profiles,
+        output_config=output_config,
+        verbosity=args.verbosity,
+        energy_balance_table=EnergyBalanceTableMode(args.table),
+        continuation=args.continuation,
+        solver=EnergyBalanceSolver(args.solver),
+        tolerance=args.tolerance,
+        quadrature=LatitudeQuadrature(args.quadrature),
+        quadrature_rtol=args.quadrature_rtol,
+    )
+
+
+def light_curve_input_from_args(
+    args: LightCurveArguments,
+) -> SublimationModelInput | None:
+
+    # the heliocentric distance and sub-solar latitude are filled in from the ephemeris at each epoch
+    smi = SublimationModelInput(
+        species=args.species,
+        visual_albedo=args.visual_albedo,
+        infrared_albedo=args.infrared_albedo,
+        rh_au=math.nan,
+        sub_solar_latitude=math.nan,
+        num_latitude_gridpoints=args.num_latitude_gridpoints,
+        t_init_K=args.initial_temperature_kelvin,
+        return_profile=args.return_profile,
+        energy_balance_table=args.energy_balance_table,
+        continuation=args.continuation,
+        solver=args.solver,
+        tolerance=args.tolerance,
+        quadrature=args.quadrature,
+        quadrature_rtol=args.quadrature_rtol,
+    )
+
+    # the nan sub-solar latitude passes the range check
+    error = sublimation_model_input_error(smi)
+    if error is not None:
+        print(error)
+        return None
+    if not args.ephemeris_path.is_file():
+        print(f"Ephemeris file {args.ephemeris_path} not found!")
+        return None
+
     # fill in starting temperature based on the selected species
     if smi.t_init_K is None:
         smi.t_init_K = get_starting_temperature(smi.species)
 
     return smi
+
+
+batch_description = (
+    "Reads model inputs from a file or stdin, one per row, runs the model on each as it is read, and writes the"
+    " results in the same order as the inputs as they are done.\n\n"
+    "Each row gives the fields of a model input by name, either as json objects, one per line, or as csv under a"
+    " header row. Fields are named as in SublimationModelInput or as the options of the single model command:"
+    " species, Av, Air, rh, ssl, and optionally nlat, temp, profiles, table, continuation, solver, tolerance,"
+    " quadrature, and quadrature_rtol. An optional id field is copied to the results.\n\n"
+    "Rows that can not be read or run give an error record, and the batch carries on."
+)
+
+
+def parse_batch_arguments(argv: list[str] | None = None) -> BatchArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice batch",
+        description=batch_description,
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[_verbosity_arguments("only warnings are logged to stderr")],
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="File of model inputs. Reads stdin if omitted or -",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=[x.value for x in BatchInputFormat],
+        default=None,
+        help="Format of the inputs: json objects, one per line, or csv."
+        " Defaults to csv for .csv files and json otherwise",
+    )
+    parser.add_argument(
+        "-o",
+        metavar="filename",
+        dest="filename",
+        help="Save results to this file name instead of writing them to stdout",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "csv"],
+        default="json",
+        help="output file format: json writes one object per line",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="n",
+        type=int,
+        default=1,
+        help="Number of worker processes to run the models on."
+        " Passing 0 uses one worker per available cpu.",
+    )
+    parser.add_argument(
+        "--window",
+        metavar="n",
+        type=int,
+        default=None,
+        help="Most models read ahead of the next result to be written, when running on more than one worker."
+        " Defaults to 16 per worker.",
+    )
+
+    args = parser.parse_args(argv)
+
+    input_path = None if args.input == "-" else pathlib.Path(args.input)
+    if args.input_format is not None:
+        input_format = BatchInputFormat(args.input_format)
+    elif input_path is not None and input_path.suffix == ".csv":
+        input_format = BatchInputFormat.csv
+    else:
+        input_format = BatchInputFormat.json
+
+    return BatchArguments(
+        input_path=input_path,
+        input_format=input_format,
+        output_path=pathlib.Path(args.filename) if args.filename is not None else None,
+        output_format=ModelOutputStorageFormat(args.format),
+        verbosity=args.verbosity,
+        workers=args.workers if args.workers > 0 else None,
+        window=args.window,
+    )
+
+
+serve_description = (
+    "Runs a server on localhost, or on a unix socket, that runs the model on json inputs sent to it over http, so"
+    " that other programs can run models without starting Python each time.\n\n"
+    "POST /run takes a json object giving the fields of a model input as in a batch, or a list of them, and answers"
+    " with the results as written by -o in json, or a list of them. An optional id field is copied to the results."
+    " GET /stats answers with the number of requests, batches, and cache hits, and the latency and throughput of"
+    " recent requests.\n\n"
+    "Requests that arrive together are run as one batch, and the results of recent inputs are kept in memory."
+)
+
+
+def parse_serve_arguments(argv: list[str] | None = None) -> ServeArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice serve",
+        description=serve_description,
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[_verbosity_arguments("only warnings are logged to stderr")],
+    )
+    parser.add_argument(
+        "--port",
+        metavar="port",
+        type=int,
+        default=8765,
+        help="Port on 127.0.0.1 to listen on. Passing 0 picks a free port",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="path",
+        default=None,
+        help="Listen on a unix socket at this path instead of a port",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="directory",
+        default=None,
+        help="Also keep results in a cache in this directory, which outlives the server",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        metavar="n",
+        type=int,
+        default=256,
+        help="Most models run together in one batch",
+    )
+    parser.add_argument(
+        "--batch-wait-ms",
+        metavar="ms",
+        type=float,
+        default=2.0,
+        help="Time to wait after the first request of a batch for others to arrive",
+    )
+    parser.add_argument(
+        "--result-cache-size",
+        metavar="n",
+        type=int,
+        default=4096,
+        help="Number of results of distinct inputs kept in memory",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.max_batch_size < 1:
+        parser.error("--max-batch-size must be at least 1")
+    if args.batch_wait_ms < 0.0:
+        parser.error("--batch-wait-ms can not be negative")
+
+    return ServeArguments(
+        port=args.port,
+        socket_path=pathlib.Path(args.socket) if args.socket is not None else None,
+        cache_dir=pathlib.Path(args.cache_dir) if args.cache_dir is not None else None,
+        max_batch_size=args.max_batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        result_cache_size=args.result_cache_size,
+        verbosity=args.verbosity,
+    )
+
+
+monte_carlo_description = (
+    "Runs the model on random draws of the albedos, heliocentric distance, and sub-solar latitude, and reports the"
+    " mean, standard deviation, and quantiles of log10 Zbar over the draws, with their standard errors, along with"
+    " how they settled as the draws were added.\n\n"
+    "Each parameter is given as a single value, as uniform:low,high, or as normal:mean,sigma. Normal distributions"
+    " are cut off at the limits of the parameter: albedos in [0, 1), distances above 0, and sub-solar latitudes"
+    " within 90 degrees. Zbar is the same at a sub-solar latitude of either sign, so negative draws are run at"
+    " their absolute value.\n\n"
+    "The same seed gives the same draws and results, however many workers are used."
+)
+
+
+def _parameter_distribution_argument(text: str) -> ParameterDistribution:
+    try:
+        return parse_parameter_distribution(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def parse_monte_carlo_arguments(argv: list[str] | None = None) -> MonteCarloArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice monte-carlo",
+        description=monte_carlo_description,
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[
+            _model_arguments(),
+            _verbosity_arguments("only the final results will be displayed in stdout"),
+        ],
+    )
+    parser.add_argument(
+        "species",
+        choices=MolecularSpecies.all_species(),
+        help="Ice species to consider.",
+    )
+    parser.add_argument(
+        "--Av",
+        metavar="visual_albedo",
+        type=_parameter_distribution_argument,
+        required=True,
+    )
+    parser.add_argument(
+        "--Air",
+        metavar="infrared_albedo",
+        type=_parameter_distribution_argument,
+        required=True,
+    )
+    parser.add_argument(
+        "--rh",
+        metavar="heliocentric_distance",
+        type=_parameter_distribution_argument,
+        required=True,
+    )
+    parser.add_argument(
+        "--ssl",
+        metavar="sub_solar_latitude",
+        type=_parameter_distribution_argument,
+        required=True,
+    )
+    parser.add_argument(
+        "--temp",
+        metavar="temperature",
+        type=float,
+        default=None,
+        help="Not passing a starting temperature will default to a species dependent starting value",
+    )
+    parser.add_argument(
+        "--samples",
+        "-n",
+        metavar="n",
+        type=int,
+        default=100000,
+        help="Number of draws to run the model on",
+    )
+    parser.add_argument(
+        "--seed",
+        metavar="seed",
+        type=int,
+        default=None,
+        help="Seed of the random draws. Without one, the seed used is printed so that the run can be repeated",
+    )
+    parser.add_argument(
+        "--batch-size",
+        metavar="n",
+        type=int,
+        default=default_monte_carlo_batch_size,
+        help="Number of draws solved together",
+    )
+    parser.add_argument(
+        "--quantiles",
+        metavar="q",
+        type=float,
+        nargs="+",
+        default=list(default_monte_carlo_quantile_levels),
+        help="Quantiles of log10 Zbar to report",
+    )
+    parser.add_argument(
+        "-o",
+        metavar="filename",
+        dest="filename",
+        help="Save the statistics and their convergence to this json file",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="n",
+        type=int,
+        default=1,
+        help="Number of worker processes to split the batches of draws across."
+        " Passing 0 uses one worker per available cpu.",
+    )
+
+    args = parser.parse_args(argv)
+
+    return MonteCarloArguments(
+        species=MolecularSpecies(args.species),
+        visual_albedo=args.Av,
+        infrared_albedo=args.Air,
+        heliocentric_distance=args.rh,
+        sub_solar_latitude=args.ssl,
+        num_latitude_gridpoints=args.nlat,
+        initial_temperature_kelvin=args.temp,
+        num_samples=args.samples,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        quantile_levels=tuple(args.quantiles),
+        output_path=pathlib.Path(args.filename) if args.filename is not None else None,
+        verbosity=args.verbosity,
+        energy_balance_table=EnergyBalanceTableMode(args.table),
+        solver=EnergyBalanceSolver(args.solver),
+        tolerance=args.tolerance,
+        workers=args.workers if args.workers > 0 else None,
+    )
+
+
+def monte_carlo_input_from_args(
+    args: MonteCarloArguments,
+) -> SublimationModelMonteCarloInput | None:
+
+    smci = SublimationModelMonteCarloInput(
+        species=args.species,
+        visual_albedo=args.visual_albedo,
+        infrared_albedo=args.infrared_albedo,
+        rh_au=args.heliocentric_distance,
+        sub_solar_latitude=args.sub_solar_latitude,
+        num_latitude_gridpoints=args.num_latitude_gridpoints,
+        t_init_K=args.initial_temperature_kelvin,
+        num_samples=args.num_samples,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        quantile_levels=args.quantile_levels,
+        energy_balance_table=args.energy_balance_table,
+        solver=args.solver,
+        tolerance=args.tolerance,
+    )
+
+    error = sublimation_model_monte_carlo_input_error(smci)
+    if error is not None:
+        print(error)
+        return None
+
+    # fill in starting temperature based on the selected species
+    if smci.t_init_K is None:
+        smci.t_init_K = get_starting_temperature(smci.species)
+
+    return smci
+
+
+build_table_description = (
+    "Runs the model on every combination of the given heliocentric distances, sub-solar latitudes, and albedos, and"
+    " saves log10 Zbar as a table to the output directory, which can be memory-mapped and interpolated to any point"
+    " within it by comet_ice_sublimation.z_bar_table.load_z_bar_table.\n\n"
+    "The table is interpolated in log10 rh, the sub-solar latitude, -log10(1 - Av), and Air, so distances are best"
+    " spaced evenly in their logarithm. Sub-solar latitudes are from 0 to 90 degrees, as Zbar is the same at either"
+    " sign. After building, the interpolation is checked against the model at the centers of --check randomly"
+    " chosen cells of the table, and the errors found are printed and saved with it.\n\n"
+    + sweep_axis_help
+)
+
+
+def parse_build_table_arguments(
+    argv: list[str] | None = None,
+) -> BuildTableArguments:
+    parser = argparse.ArgumentParser(
+        prog="comet_ice build-table",
+        description=build_table_description,
+        formatter_class=argparse.RawTextHelpFormatter,
+        parents=[
+            _model_arguments(),
+            _verbosity_arguments("only the final results will be displayed in stdout"),
+        ],
+    )
+    parser.add_argument(
+        "species",
+        choices=MolecularSpecies.all_species(),
+        help="Ice species to consider.",
+    )
+    parser.add_argument(
+        "--Av",
+        metavar="visual_albedo",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--Air",
+        metavar="infrared_albedo",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--rh",
+        metavar="heliocentric_distance",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--ssl",
+        metavar="sub_solar_latitude",
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "--temp",
+        metavar="temperature",
+        type=float,
+        default=None,
+        help="Not passing a starting temperature will default to a species dependent starting value",
+    )
+    parser.add_argument(
+        "--check",
+        metavar="n",
+        type=int,
+        default=1000,
+        help="Number of cells of the table to check the interpolation error at. Passing 0 skips the check",
+    )
+    parser.add_argument(
+        "--seed",
+        metavar="seed",
+        type=int,
+        default=0,
+        help="Seed of the choice of cells to check",
+    )
+    parser.add_argument(
+        "-o",
+        metavar="directory",
+        dest="directory",
+        required=True,
+        help="Save the table to this directory",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="n",
+        type=int,
+        default=1,
+        help="Number of worker processes to split the sweep across."
+        " Passing 0 uses one worker per available cpu.",
+    )
+
+    args = parser.parse_args(argv)
+
+    try:
+        axes = [_parse_sweep_axis(a) for a in (args.Av, args.Air, args.rh, args.ssl)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    return BuildTableArguments(
+        species=MolecularSpecies(args.species),
+        visual_albedos=axes[0],
+        infrared_albedos=axes[1],
+        heliocentric_distances=axes[2],
+        sub_solar_latitudes=axes[3],
+        num_latitude_gridpoints=args.nlat,
+        initial_temperature_kelvin=args.temp,
+        output_path=pathlib.Path(args.directory),
+        num_check_points=args.check,
+        seed=args.seed,
+        verbosity=args.verbosity,
+        energy_balance_table=EnergyBalanceTableMode(args.table),
+        solver=EnergyBalanceSolver(args.solver),
+        tolerance=args.tolerance,
+        workers=args.workers if args.workers > 0 else None,
+    )
+
+
+def build_table_input_from_args(
+    args: BuildTableArguments,
+) -> "SublimationModelSweepInput | None":
+    from comet_ice_sublimation.model_input.sublimation_model_sweep_input import (
+        SublimationModelSweepInput,
+    )
+    from comet_ice_sublimation.model_runner import z_bar_table_input_error
+
+    smsi = SublimationModelSweepInput(
+        species=args.species,
+        visual_albedos=args.visual_albedos,
+        infrared_albedos=args.infrared_albedos,
+        rh_aus=args.heliocentric_distances,
+        sub_solar_latitudes=args.sub_solar_latitudes,
+        num_latitude_gridpoints=args.num_latitude_gridpoints,
+        t_init_K=args.initial_temperature_kelvin,
+        return_profile=False,
+        energy_balance_table=args.energy_balance_table,
+        solver=args.solver,
+        tolerance=args.tolerance,
+    )
+
+    error = z_bar_table_input_error(smsi)
+    if error is not None:
+        print(error)
+        return None
+
+    # fill in starting temperature based on the selected species
+    if smsi.t_init_K is None:
+        smsi.t_init_K = get_starting_temperature(smsi.species)
+
+    return smsi
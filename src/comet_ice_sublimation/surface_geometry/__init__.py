@@ -1 +1,8 @@
-from .surface_geometry import average_projection_factor
+from .surface_geometry import (
+    average_projection_factor,
+    average_projection_factor_array,
+    average_projection_factor_sub_solar_latitude_derivative_array,
+    LatitudeGrid,
+    make_latitude_grid,
+)
+from .latitude_quadrature import *
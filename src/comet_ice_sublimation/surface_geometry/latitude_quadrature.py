@@ -0,0 +1,151 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .surface_geometry import average_projection_factor_array
+
+# 15-point Gauss-Kronrod rule on [-1, 1], which extends the 7-point Gauss-Legendre rule at every other node, from
+# QUADPACK (qk15): integrating with both gives an error estimate without evaluating anywhere else
+_kronrod_half_nodes = np.array(
+    [
+        0.991455371120812639206854697526329,
+        0.949107912342758524526189684047851,
+        0.864864423359769072789712788640926,
+        0.741531185599394439863864773280788,
+        0.586087235467691130294144845693013,
+        0.405845151377397166906606412076961,
+        0.207784955007898467600689403773245,
+        0.000000000000000000000000000000000,
+    ]
+)
+_kronrod_half_weights = np.array(
+    [
+        0.022935322010529224963732008058970,
+        0.063092092629978553290700663189204,
+        0.104790010322250183839876322541518,
+        0.140653259715525918745189590510238,
+        0.169004726639267902826583426598550,
+        0.190350578064785409913256402421014,
+        0.204432940075298892414161999234649,
+        0.209482141084727828012999174891714,
+    ]
+)
+_gauss_half_weights = np.array(
+    [
+        0.0,
+        0.129484966168869693270611432679082,
+        0.0,
+        0.279705391489276667901467771423780,
+        0.0,
+        0.381830050505118944950369775488975,
+        0.0,
+        0.417959183673469387755102040816327,
+    ]
+)
+
+# nodes in increasing order, so that the latitudes of consecutive panels are also in increasing order
+kronrod_nodes = np.concatenate([-_kronrod_half_nodes, _kronrod_half_nodes[-2::-1]])
+kronrod_weights = np.concatenate([_kronrod_half_weights, _kronrod_half_weights[-2::-1]])
+gauss_weights = np.concatenate([_gauss_half_weights, _gauss_half_weights[-2::-1]])
+num_panel_nodes = kronrod_nodes.size
+
+
+def sunlit_latitude_breakpoints(sub_solar_latitude: float) -> np.ndarray:
+    """
+    Edges of the panels in sin(latitude) that the sunlit part of the surface is split into, so that every panel is
+    smooth inside: the average projection factor has kinks at the arctic latitudes, and is zero below
+    -arctic_latitude_rad, so that part is left out.
+    """
+
+    # see make_latitude_grid for the arctic latitude
+    arctic_latitude_rad = (90 - sub_solar_latitude) * math.pi / 180
+    sin_arctic_latitude = min(math.sin(arctic_latitude_rad), 1.0)
+
+    edges = [-sin_arctic_latitude, sin_arctic_latitude, 1.0]
+    return np.unique(np.asarray(edges, dtype=np.float64))
+
+
+def split_panels(edges: np.ndarray, num_panels: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Splits the panels between consecutive edges into about num_panels equal-width panels in total, with each one
+    split into a number of panels in proportion to its width, and at least one.  Returns the lower and upper
+    edges of the panels.
+    """
+
+    widths = np.diff(edges)
+    splits = np.maximum(1, np.rint(num_panels * widths / widths.sum()).astype(int))
+
+    lower = np.concatenate(
+        [edges[i] + widths[i] * np.arange(n) / n for i, n in enumerate(splits)]
+    )
+    upper = np.concatenate(
+        [edges[i] + widths[i] * np.arange(1, n + 1) / n for i, n in enumerate(splits)]
+    )
+    return lower, upper
+
+
+@dataclass
+class LatitudePanelNodes:
+    # Gauss-Kronrod nodes in sin(latitude) for each panel, with dimensions (panel, node)
+    sin_latitudes: np.ndarray
+    latitudes_rad: np.ndarray
+    # see average_projection_factor for explanation of these values
+    average_projection_factors: np.ndarray
+    # edges of the panels in sin(latitude)
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def make_latitude_panel_nodes(
+    sub_solar_latitude: float, lower: np.ndarray, upper: np.ndarray
+) -> LatitudePanelNodes:
+
+    arctic_latitude_rad = (90 - sub_solar_latitude) * math.pi / 180
+
+    half_widths = (upper - lower)[:, np.newaxis] / 2
+    centers = (upper + lower)[:, np.newaxis] / 2
+    sin_latitudes = centers + half_widths * kronrod_nodes
+
+    latitudes = np.arcsin(sin_latitudes)
+    average_projection_factors = average_projection_factor_array(
+        arctic_latitude_rad,
+        latitudes.ravel(),
+        sin_latitudes.ravel(),
+        np.cos(latitudes).ravel(),
+        np.tan(latitudes).ravel(),
+    ).reshape(sin_latitudes.shape)
+
+    return LatitudePanelNodes(
+        sin_latitudes=sin_latitudes,
+        latitudes_rad=latitudes,
+        average_projection_factors=average_projection_factors,
+        lower=lower,
+        upper=upper,
+    )
+
+
+def gauss_kronrod_panel_integrals(
+    values: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Integrals over each panel of values sampled at the nodes of make_latitude_panel_nodes, with dimensions
+    (panel, node), and estimates of their absolute errors.  The error estimate is the difference between the
+    Kronrod and Gauss results, scaled as in QUADPACK.
+    """
+
+    half_widths = (upper - lower) / 2
+
+    kronrod = half_widths * (values @ kronrod_weights)
+    gauss = half_widths * (values @ gauss_weights)
+
+    # QUADPACK scales the raw difference down when it is small compared to the variation of the integrand,
+    # since the Kronrod result is then much more accurate than the Gauss result it is compared with
+    mean = (values @ kronrod_weights)[:, np.newaxis] / 2
+    variation = half_widths * (np.abs(values - mean) @ kronrod_weights)
+    error = np.abs(kronrod - gauss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = variation * np.minimum(1.0, (200 * error / variation) ** 1.5)
+    error = np.where((variation > 0) & (error > 0), scaled, error)
+
+    return kronrod, error
@@ -1,13 +1,21 @@
 import math
-from functools import cache
+from dataclasses import dataclass
+from functools import lru_cache
 
+import numpy as np
 
 # "Vaporization of Comet Nuclei: Light Curves and Life Times", Cowan & A'Hearn, 1979
 # DOI: 10.1007/BF00897085
 
 
+# Number of latitude grids kept in memory by make_latitude_grid, along with the cache size of average_projection_factor:
+# these are bounded so that long-lived processes running many different models don't grow without limit
+latitude_grid_cache_size = 64
+average_projection_factor_cache_size = 65536
+
+
 # this is purely geometric, depending on only the arctic latitude and the choice of latitude grid
-@cache
+@lru_cache(maxsize=average_projection_factor_cache_size)
 def average_projection_factor(
     arctic_latitude_rad: float,
     latitude_rad: float,
@@ -47,3 +55,152 @@ def average_projection_factor(
         apf = x1 + x2
 
     return apf
+
+
+def average_projection_factor_array(
+    arctic_latitude_rad: float,
+    latitudes_rad: np.ndarray,
+    sin_lat: np.ndarray,
+    cos_lat: np.ndarray,
+    tan_lat: np.ndarray,
+) -> np.ndarray:
+    """
+    Array version of average_projection_factor, for every latitude of a grid at once.
+    """
+
+    apf = np.zeros_like(latitudes_rad)
+
+    # permanent sunlight above the arctic latitude
+    day = latitudes_rad > arctic_latitude_rad
+    apf[day] = sin_lat[day] * math.cos(arctic_latitude_rad)
+
+    # between the arctic circles, the latitude rotates in and out of sunlight; below -arctic_latitude_rad apf stays zero
+    day_night = (latitudes_rad > -arctic_latitude_rad) & ~day
+    if np.any(day_night):
+        x1_argument = -tan_lat[day_night] * (1 / math.tan(arctic_latitude_rad))
+        x2_argument = -tan_lat[day_night] / math.tan(arctic_latitude_rad)
+        if np.any(np.abs(x1_argument) > 1) or np.any(np.abs(x2_argument) > 1):
+            # same as the error math.acos raises in average_projection_factor
+            raise ValueError("math domain error")
+
+        x1 = (
+            math.cos(arctic_latitude_rad)
+            * sin_lat[day_night]
+            * np.arccos(x1_argument)
+            / math.pi
+        )
+        x2 = (
+            math.sin(arctic_latitude_rad)
+            * cos_lat[day_night]
+            * np.sin(np.arccos(x2_argument))
+            / math.pi
+        )
+        apf[day_night] = x1 + x2
+
+    return apf
+
+
+def average_projection_factor_sub_solar_latitude_derivative_array(
+    sub_solar_latitude: float, latitudes_rad: np.ndarray
+) -> np.ndarray:
+    """
+    Derivative of the average projection factors at latitudes_rad with respect to the sub-solar latitude, per degree.
+    The average projection factor is the integral over the hour angle, up to sunset, of the cosine of the incident
+    sunlight, which is zero at sunset, so only the integrand changes with the arctic latitude and not the limit.
+    """
+
+    arctic_latitude_rad = (90 - sub_solar_latitude) * math.pi / 180
+    sin_lat = np.sin(latitudes_rad)
+    cos_lat = np.cos(latitudes_rad)
+
+    # sunset hour angle: pi in permanent sunlight, 0 in permanent darkness
+    hour_angle = np.zeros_like(latitudes_rad)
+    hour_angle[latitudes_rad > arctic_latitude_rad] = math.pi
+    day_night = (latitudes_rad > -arctic_latitude_rad) & (
+        latitudes_rad <= arctic_latitude_rad
+    )
+    hour_angle[day_night] = np.arccos(
+        np.clip(
+            -np.tan(latitudes_rad[day_night]) / math.tan(arctic_latitude_rad), -1, 1
+        )
+    )
+
+    # derivative with respect to the arctic latitude, which falls as the sub-solar latitude rises
+    d_apf_d_arctic_latitude = (
+        cos_lat * math.cos(arctic_latitude_rad) * np.sin(hour_angle)
+        - sin_lat * math.sin(arctic_latitude_rad) * hour_angle
+    ) / math.pi
+    return -d_apf_d_arctic_latitude * math.pi / 180
+
+
+@dataclass
+class LatitudeGrid:
+    # latitudes are sampled uniformly in sin(latitude) over [-1, 1], with this spacing
+    sin_latitudes: np.ndarray
+    delta_sin_latitude: float
+    latitudes_rad: np.ndarray
+    # see average_projection_factor for explanation of these values
+    average_projection_factors: np.ndarray
+
+
+def make_latitude_grid(
+    sub_solar_latitude: float, num_latitude_gridpoints: int
+) -> LatitudeGrid:
+    """
+    Builds the latitude grid and average projection factors for a model, or returns the same read-only grid
+    from a previous call with the same sub-solar latitude and number of gridpoints.
+    At a sub-solar latitude of 0 the southern factors are copies of the northern ones, so that mirrored latitudes
+    are the same energy balance problem; the southern factors computed directly differ in the last bit, so z_bar
+    at that latitude can differ in its last bit from a grid without the mirroring.
+    """
+    return _make_latitude_grid(float(sub_solar_latitude), int(num_latitude_gridpoints))
+
+
+@lru_cache(maxsize=latitude_grid_cache_size)
+def _make_latitude_grid(
+    sub_solar_latitude: float, num_latitude_gridpoints: int
+) -> LatitudeGrid:
+
+    # sub_solar_latitude = 0  ---> equator along sun-comet axis, north pole of comet perpendicular to sun-comet axis
+    # sub_solar_latitude = 90 ---> equator perpendicular to sun-comet axis, north pole of comet pointed at sun
+
+    # marks the 'arctic circle' latitude (in radians) of the comet:
+    #  above this latitude, permanent sunlight during a rotation
+    #  below this negative latitude, permanent darkness during a rotation
+    arctic_latitude_rad = (90 - sub_solar_latitude) * math.pi / 180
+
+    # We are using a spherical coordinate system with the z-axis rotated so that the sub_solar_latitude falls on the sun-comet axis.
+    # Positive latitudes are taken by convention to be in the hemisphere pointed toward the sun.
+
+    # sample the latitudes by creating a linear space [-1, 1] and mapping that to latitudes
+    # this samples the equator more than the poles
+    sin_latitudes, delta_sin_latitude = np.linspace(
+        start=-1, stop=1, num=num_latitude_gridpoints, endpoint=True, retstep=True
+    )
+    # latitudes in radians
+    latitudes = np.arcsin(sin_latitudes)
+    cos_latitudes = np.cos(latitudes)
+    tan_latitudes = np.tan(latitudes)
+
+    average_projection_factors = average_projection_factor_array(
+        arctic_latitude_rad, latitudes, sin_latitudes, cos_latitudes, tan_latitudes
+    )
+    if sub_solar_latitude == 0:
+        # the hemispheres are lit alike, but rounding in the northern and southern halves differs in the last bit;
+        # taking the northern factor for both makes mirrored latitudes the same energy balance problem, solved once
+        mirror = np.maximum(
+            np.arange(num_latitude_gridpoints),
+            np.arange(num_latitude_gridpoints)[::-1],
+        )
+        average_projection_factors = average_projection_factors[mirror]
+
+    # the grid is shared between every caller asking for the same one, so it can't be changed
+    for array in (sin_latitudes, latitudes, average_projection_factors):
+        array.flags.writeable = False
+
+    return LatitudeGrid(
+        sin_latitudes=sin_latitudes,
+        delta_sin_latitude=float(delta_sin_latitude),
+        latitudes_rad=latitudes,
+        average_projection_factors=average_projection_factors,
+    )
@@ -0,0 +1 @@
+from .z_bar_table import *
@@ -0,0 +1,207 @@
+import json
+import math
+import pathlib
+from dataclasses import dataclass
+from enum import StrEnum
+
+import numpy as np
+
+from comet_ice_sublimation.model_input.sublimation_model_sweep_input import *
+from comet_ice_sublimation.model_saver.binary_output import (
+    MmapMode,
+    load_sweep,
+    sweep_index_file_name,
+)
+
+# key of the table's own metadata in the index of the sweep directory it is saved as
+z_bar_table_metadata_name = "z_bar_table"
+
+# queries interpolated together, bounding the memory of the (query, node, node, node, node) arrays of table values
+z_bar_table_query_chunk_size = 8192
+
+
+class InterpolationMethod(StrEnum):
+    # tensor product Lagrange interpolation through the 2 or 4 nearest nodes along each axis
+    linear = "linear"
+    cubic = "cubic"
+
+
+_nodes_per_axis = {InterpolationMethod.linear: 2, InterpolationMethod.cubic: 4}
+
+
+# The table is interpolated in the coordinates that log10_z_bar is closest to linear in, in the order of the
+# dimensions of a sweep: log10 of the heliocentric distance, the sub-solar latitude, -log10 of the fraction of
+# visible light absorbed, which with the distance sets the incident flux, and the infrared albedo.  z_bar is the same
+# at sub-solar latitudes of either sign.
+def _table_coordinates(
+    rh_au: np.ndarray,
+    sub_solar_latitude: np.ndarray,
+    visual_albedo: np.ndarray,
+    infrared_albedo: np.ndarray,
+) -> list[np.ndarray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return [
+            np.log10(rh_au),
+            np.abs(sub_solar_latitude),
+            -np.log10(1.0 - visual_albedo),
+            np.asarray(infrared_albedo, dtype=np.float64),
+        ]
+
+
+@dataclass
+class InterpolationErrors:
+    # errors of the interpolated log10_z_bar, in dex, against the model at the centers of randomly chosen cells of the
+    # table, where interpolation is furthest from the nodes; the relative error of z_bar is ln(10) times these
+    num_check_points: int
+    max: float
+    p99: float
+    rms: float
+
+
+class ZBarTable:
+    """
+    log10_z_bar of one species tabulated on a grid of heliocentric distances, sub-solar latitudes, and albedos, as
+    built by build_z_bar_table, and interpolated to any values within the grid.  Tables saved as a directory of .npy
+    files are memory-mapped, so processes loading the same table share the one copy in the page cache, and only the
+    parts of it that are queried are read from disk.
+    """
+
+    def __init__(
+        self,
+        smsi: SublimationModelSweepInput,
+        log10_z_bar: np.ndarray,
+        interpolation_errors: dict[InterpolationMethod, InterpolationErrors],
+    ):
+        self.smsi = smsi
+        self.interpolation_errors = interpolation_errors
+        # the nodes of each axis in its table coordinate, and the table flattened, which is a view of a memory-mapped
+        # table rather than a copy
+        self._nodes = _table_coordinates(
+            rh_au=np.atleast_1d(smsi.rh_aus),
+            sub_solar_latitude=np.atleast_1d(smsi.sub_solar_latitudes),
+            visual_albedo=np.atleast_1d(smsi.visual_albedos),
+            infrared_albedo=np.atleast_1d(smsi.infrared_albedos),
+        )
+        self._shape = tuple(nodes.size for nodes in self._nodes)
+        self._strides = np.cumprod((self._shape[1:] + (1,))[::-1])[::-1]
+        self._log10_z_bar = log10_z_bar.reshape(-1)
+
+    @property
+    def species(self):
+        return self.smsi.species
+
+    def log10_z_bar(
+        self,
+        rh_au: float | np.ndarray,
+        sub_solar_latitude: float | np.ndarray,
+        visual_albedo: float | np.ndarray,
+        infrared_albedo: float | np.ndarray,
+        method: InterpolationMethod = InterpolationMethod.linear,
+    ) -> np.ndarray:
+        """
+        Interpolates log10_z_bar at every combination of the arguments, which are broadcast against each other.
+        Points outside the grid give nan.  Along an axis with fewer nodes than the method needs, the interpolation
+        drops to as many as there are, and an axis with a single node only matches that value.
+        """
+
+        arrays = np.broadcast_arrays(
+            *(
+                np.asarray(a, dtype=np.float64)
+                for a in (rh_au, sub_solar_latitude, visual_albedo, infrared_albedo)
+            )
+        )
+        shape = arrays[0].shape
+        coordinates = [
+            c.ravel() for c in _table_coordinates(*(a.ravel() for a in arrays))
+        ]
+
+        num_nodes = _nodes_per_axis[InterpolationMethod(method)]
+        out = np.empty(math.prod(shape))
+        for start in range(0, out.size, z_bar_table_query_chunk_size):
+            chunk = slice(start, start + z_bar_table_query_chunk_size)
+            out[chunk] = self._interpolate(
+                [c[chunk] for c in coordinates], num_nodes=num_nodes
+            )
+        return out.reshape(shape)
+
+    def z_bar(
+        self,
+        rh_au: float | np.ndarray,
+        sub_solar_latitude: float | np.ndarray,
+        visual_albedo: float | np.ndarray,
+        infrared_albedo: float | np.ndarray,
+        method: InterpolationMethod = InterpolationMethod.linear,
+    ) -> np.ndarray:
+        return 10.0 ** self.log10_z_bar(
+            rh_au=rh_au,
+            sub_solar_latitude=sub_solar_latitude,
+            visual_albedo=visual_albedo,
+            infrared_albedo=infrared_albedo,
+            method=method,
+        )
+
+    def _interpolate(self, coordinates: list[np.ndarray], num_nodes: int) -> np.ndarray:
+        # the flat index into the table of every combination of the nodes used along each axis, with dimensions
+        # (query, axis 0 node, ..., axis 3 node), and the weights of the nodes along each axis
+        flat_index = np.zeros(
+            (coordinates[0].size,) + (1,) * len(coordinates), dtype=np.int64
+        )
+        weights = []
+        inside = np.ones(coordinates[0].size, dtype=bool)
+        for axis, (nodes, x) in enumerate(zip(self._nodes, coordinates)):
+            with np.errstate(invalid="ignore"):
+                axis_indices, axis_weights = _lagrange_weights(nodes, x, num_nodes)
+            inside &= (x >= nodes[0]) & (x <= nodes[-1])
+            index_shape = [-1] + [1] * len(coordinates)
+            index_shape[axis + 1] = axis_indices.shape[1]
+            flat_index = flat_index + self._strides[axis] * axis_indices.reshape(
+                index_shape
+            )
+            weights.append(axis_weights)
+
+        values = self._log10_z_bar.take(flat_index)
+        # sum over the nodes of the last axis with their weights, one axis at a time
+        for axis_weights in reversed(weights):
+            values = np.einsum("n...j,nj->n...", values, axis_weights)
+        return np.where(inside, values, np.nan)
+
+
+def _lagrange_weights(
+    nodes: np.ndarray, x: np.ndarray, num_nodes: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # indices of the num_nodes nodes around each x, as centered as the ends of the axis allow, and the weights of the
+    # Lagrange polynomial through them at x
+    num_nodes = min(num_nodes, nodes.size)
+    cell = np.searchsorted(nodes, x, side="right") - 1
+    first = np.clip(cell - (num_nodes // 2 - 1), 0, nodes.size - num_nodes)
+    indices = first[:, np.newaxis] + np.arange(num_nodes)
+    node_values = nodes[indices]
+
+    weights = np.ones(indices.shape)
+    for k in range(num_nodes):
+        for m in range(num_nodes):
+            if m != k:
+                weights[:, k] *= (x - node_values[:, m]) / (
+                    node_values[:, k] - node_values[:, m]
+                )
+    return indices, weights
+
+
+def load_z_bar_table(path: pathlib.Path, mmap_mode: MmapMode | None = "r") -> ZBarTable:
+    """
+    Loads a table saved by build_z_bar_table, memory-mapping it with mmap_mode.
+    """
+
+    path = pathlib.Path(path)
+    smsi, smsr = load_sweep(path, mmap_mode=mmap_mode)
+    with open(path / sweep_index_file_name) as index_file:
+        metadata = json.load(index_file).get(z_bar_table_metadata_name, {})
+    interpolation_errors = {
+        InterpolationMethod(method): InterpolationErrors(**errors)
+        for method, errors in metadata.get("interpolation_errors", {}).items()
+    }
+    return ZBarTable(
+        smsi=smsi,
+        log10_z_bar=smsr.log10_z_bar,
+        interpolation_errors=interpolation_errors,
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+
+from comet_ice_sublimation.energy_balance import EnergyBalanceConvergenceError
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    AsyncSublimationModelRunner,
+    async_runner,
+    run_sublimation_model,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+def _input(visual_albedo: float, tolerance: float = 1e-6) -> SublimationModelInput:
+    return SublimationModelInput(
+        species=MolecularSpecies.co2,
+        visual_albedo=visual_albedo,
+        infrared_albedo=0.05,
+        rh_au=1.0,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=5,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=False,
+        tolerance=tolerance,
+    )
+
+
+def test_identical_runs_share_one_model(monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def gated_run_sublimation_model(smi):
+        started.append(smi)
+        release.wait()
+        return run_sublimation_model(smi)
+
+    monkeypatch.setattr(
+        async_runner, "run_sublimation_model", gated_run_sublimation_model
+    )
+    smi = _input(0.1)
+
+    async def main():
+        async with AsyncSublimationModelRunner(workers=2) as runner:
+            first = asyncio.ensure_future(runner.run(smi))
+            second = asyncio.ensure_future(runner.run(smi))
+            await asyncio.sleep(0.05)
+            assert runner.num_in_flight == 1
+
+            # the run carries on for the waiter that is left
+            first.cancel()
+            await asyncio.sleep(0.05)
+            assert runner.num_in_flight == 1
+            release.set()
+            smr = await second
+            assert first.cancelled()
+            return smr
+
+    smr = asyncio.run(main())
+    assert started == [smi]
+    assert smr.z_bar == run_sublimation_model(smi).z_bar
+
+
+def test_run_many_yields_results_in_input_order(monkeypatch):
+    smis = [_input(visual_albedo) for visual_albedo in (0.05, 0.1, 0.2, 0.3)]
+
+    def slow_first_run_sublimation_model(smi):
+        # the earlier inputs finish last
+        time.sleep(0.05 * (len(smis) - smis.index(smi)))
+        return run_sublimation_model(smi)
+
+    monkeypatch.setattr(
+        async_runner, "run_sublimation_model", slow_first_run_sublimation_model
+    )
+
+    async def main():
+        async with AsyncSublimationModelRunner(workers=4) as runner:
+            return [(smi, smr) async for smi, smr in runner.run_many(smis)]
+
+    results = asyncio.run(main())
+    assert [smi for smi, _ in results] == smis
+    for smi, smr in results:
+        assert smr.z_bar == run_sublimation_model(smi).z_bar
+
+
+def test_run_many_reads_at_most_window_inputs_ahead():
+    window = 3
+    num_read = 0
+
+    async def endless_inputs():
+        nonlocal num_read
+        for i in itertools.count():
+            num_read += 1
+            yield _input(0.01 * (i % 50))
+
+    async def main():
+        num_yielded = 0
+        async with AsyncSublimationModelRunner(workers=2) as runner:
+            async for _ in runner.run_many(endless_inputs(), window=window):
+                num_yielded += 1
+                assert num_read <= num_yielded - 1 + window
+                if num_yielded == 10:
+                    break
+
+    asyncio.run(main())
+
+
+def test_run_many_raises_a_failed_model_and_cancels_the_rest(monkeypatch):
+    # no solver reaches a net flux this small
+    bad = _input(0.1, tolerance=1e-16)
+    smis = [bad, _input(0.05), _input(0.2), _input(0.3)]
+
+    started = []
+
+    def counting_run_sublimation_model(smi):
+        started.append(smi)
+        return run_sublimation_model(smi)
+
+    monkeypatch.setattr(
+        async_runner, "run_sublimation_model", counting_run_sublimation_model
+    )
+
+    async def main():
+        async with AsyncSublimationModelRunner(workers=1) as runner:
+            with pytest.raises(EnergyBalanceConvergenceError):
+                async for _ in runner.run_many(smis):
+                    pass
+            await asyncio.sleep(0.1)
+            assert runner.num_in_flight == 0
+
+    asyncio.run(main())
+    # the models waiting for the one worker are never started
+    assert started == [bad]
@@ -0,0 +1,65 @@
+import io
+import json
+
+from comet_ice_sublimation.comet_ice_sublimation import batch_main
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    run_sublimation_model,
+    run_sublimation_model_batch,
+)
+
+
+def _record(visual_albedo: float, tolerance: float = 1e-6) -> dict:
+    return {
+        "species": "CO2",
+        "Av": visual_albedo,
+        "Air": 0.05,
+        "rh": 1.0,
+        "ssl": 30.0,
+        "nlat": 5,
+        "tolerance": tolerance,
+    }
+
+
+def test_batch_on_workers_keeps_row_order_and_reports_errors():
+    lines = [
+        json.dumps({"id": "a", **_record(0.05)}),
+        "not json",
+        json.dumps({"id": "b", **_record(0.2)}),
+        # no solver reaches a net flux this small
+        json.dumps({"id": "c", **_record(0.1, tolerance=1e-16)}),
+        json.dumps({"id": "d", **_record(0.3), "nlat": "many"}),
+        json.dumps({"id": "e", **_record(0.3)}),
+    ]
+    input_rows = list(
+        read_batch_inputs(
+            stream=io.StringIO("\n".join(lines)), input_format=BatchInputFormat.json
+        )
+    )
+
+    results = list(
+        run_sublimation_model_batch(input_rows=iter(input_rows), workers=2, window=2)
+    )
+
+    assert [result.input_row.row for result in results] == [1, 2, 3, 4, 5, 6]
+    assert [result.input_row.id for result in results] == [
+        "a",
+        None,
+        "b",
+        "c",
+        "d",
+        "e",
+    ]
+    failed = [result.error is not None for result in results]
+    assert failed == [False, True, False, True, True, False]
+    assert results[1].error is not None and results[1].error.startswith("Invalid json")
+    for input_row, result in zip(input_rows, results):
+        if input_row.smi is not None and result.smr is not None:
+            assert result.smr.z_bar == run_sublimation_model(input_row.smi).z_bar
+
+
+def test_batch_main_reports_an_unreadable_input_as_a_usage_error(tmp_path, capsys):
+    assert batch_main([str(tmp_path / "missing.json")]) == 2
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "could not read the inputs" in captured.err
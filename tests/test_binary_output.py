@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import run_sublimation_model_sweep
+from comet_ice_sublimation.model_saver.binary_output import (
+    load_sweep,
+    save_sweep_npy,
+    save_sweep_npz,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+@pytest.mark.parametrize(
+    "save, name", [(save_sweep_npy, "sweep"), (save_sweep_npz, "sweep.npz")]
+)
+def test_sweep_round_trips_through_binary_output(tmp_path, save, name):
+    smsi = SublimationModelSweepInput(
+        species=MolecularSpecies.co2,
+        visual_albedos=np.array([0.05, 0.2]),
+        infrared_albedos=np.array([0.1]),
+        rh_aus=np.array([1.0, 2.0, 4.0]),
+        sub_solar_latitudes=np.array([0.0, 60.0]),
+        num_latitude_gridpoints=31,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=True,
+    )
+    smsr = run_sublimation_model_sweep(smsi=smsi)
+
+    save(smsi=smsi, smsr=smsr, output_path=tmp_path / name)
+    loaded_smsi, loaded_smsr = load_sweep(tmp_path / name)
+
+    assert loaded_smsi.species == smsi.species
+    assert loaded_smsi.num_latitude_gridpoints == smsi.num_latitude_gridpoints
+    np.testing.assert_array_equal(loaded_smsi.rh_aus, smsi.rh_aus)
+    for field in ("z_bar", "log10_z_bar", "latitudes_rad", "zs", "temps_K"):
+        np.testing.assert_array_equal(getattr(loaded_smsr, field), getattr(smsr, field))
+    assert loaded_smsr.num_iterations == smsr.num_iterations
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.energy_balance import *
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.physical_constants import *
+
+
+@pytest.mark.parametrize("species", list(MolecularSpecies))
+def test_scalar_solver_matches_array_solver_bit_for_bit(species):
+    # fluxes from deep in the night side to the subsolar point at 0.3 AU, more than enough for the array iteration
+    incident_solar_flux = np.geomspace(1e2, 1.5e7, 4000)
+    assert incident_solar_flux.size >= scalar_energy_balance_max_points
+    t_init_K = get_starting_temperature(species)
+
+    array_result = solve_energy_balance_array(
+        species=species,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+    )
+    scalar_result = solve_energy_balance_scalar(
+        species=species,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+    )
+    np.testing.assert_array_equal(scalar_result.t_K, array_result.t_K)
+    np.testing.assert_array_equal(scalar_result.z, array_result.z)
+    np.testing.assert_array_equal(
+        scalar_result.num_iterations, array_result.num_iterations
+    )
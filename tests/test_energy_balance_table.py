@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.energy_balance import *
+from comet_ice_sublimation.model_input import EnergyBalanceSolver
+from comet_ice_sublimation.molecular_species import *
+
+
+@pytest.mark.parametrize("species", list(MolecularSpecies))
+def test_table_error_estimate_holds_between_grid_points(species):
+    table = get_energy_balance_table(species=species, infrared_albedo=0.05)
+    assert table.max_relative_z_error <= 1e-6
+
+    rng = np.random.default_rng(0)
+    incident_solar_flux = 10.0 ** rng.uniform(
+        table.log10_fluxes[0], table.log10_fluxes[-1], 2000
+    )
+    t_init_K = get_starting_temperature(species)
+    tabulated = lookup_energy_balance(
+        table=table, incident_solar_flux=incident_solar_flux, t_init_K=t_init_K
+    )
+    solved = solve_energy_balance_array(
+        species=species,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+        tolerance=1e-12,
+    )
+    relative_z_error = np.abs(tabulated.z / solved.z - 1.0)
+    assert np.max(relative_z_error) <= table.max_relative_z_error
+
+
+def test_fluxes_outside_the_table_are_solved_with_the_given_settings():
+    species = MolecularSpecies.co2
+    # below and above the fluxes the table covers
+    incident_solar_flux = np.array([1e-5, 1e10])
+    t_init_K = get_starting_temperature(species)
+    tabulated = solve_energy_balance_tabulated(
+        species=species,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+        solver=EnergyBalanceSolver.brent,
+        tolerance=1e-12,
+    )
+    solved = solve_energy_balance_array(
+        species=species,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+        solver=EnergyBalanceSolver.brent,
+        tolerance=1e-12,
+    )
+    np.testing.assert_array_equal(tabulated.t_K, solved.t_K)
+    np.testing.assert_array_equal(tabulated.num_iterations, solved.num_iterations)
+
+    with pytest.raises(EnergyBalanceConvergenceError):
+        solve_energy_balance_tabulated(
+            species=species,
+            infrared_albedo=0.05,
+            incident_solar_flux=incident_solar_flux,
+            t_init_K=t_init_K,
+            tolerance=1e-16,
+        )
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_input import ephemeris as ephemeris_module
+from comet_ice_sublimation.model_input import read_ephemeris
+
+
+def _ephemeris(num_rows: int) -> np.ndarray:
+    return np.column_stack(
+        [
+            np.arange(num_rows, dtype=np.float64),
+            np.linspace(0.8, 5.0, num_rows),
+            np.linspace(-60.0, 60.0, num_rows),
+        ]
+    )
+
+
+def _rows(path) -> list[tuple]:
+    return [
+        (row.epoch, row.rh_au, row.sub_solar_latitude) for row in read_ephemeris(path)
+    ]
+
+
+@pytest.mark.parametrize("save", [np.savez, np.savez_compressed])
+def test_npz_ephemeris_is_read_in_chunks_like_npy_and_csv(tmp_path, monkeypatch, save):
+    # a chunk size that doesn't divide the number of rows
+    monkeypatch.setattr(ephemeris_module, "ephemeris_npz_chunk_rows", 7)
+    ephemeris = _ephemeris(100)
+
+    np.save(tmp_path / "ephemeris.npy", ephemeris)
+    save(
+        tmp_path / "ephemeris.npz",
+        epoch=ephemeris[:, 0],
+        rh=ephemeris[:, 1],
+        ssl=ephemeris[:, 2],
+    )
+    np.savetxt(
+        tmp_path / "ephemeris.csv",
+        ephemeris,
+        delimiter=",",
+        header="epoch,rh,ssl",
+        comments="",
+        fmt="%.17g",
+    )
+
+    expected = _rows(tmp_path / "ephemeris.npy")
+    assert len(expected) == 100
+    assert _rows(tmp_path / "ephemeris.npz") == expected
+    assert _rows(tmp_path / "ephemeris.csv") == expected
+
+
+def test_npz_ephemeris_keeps_text_epochs(tmp_path):
+    np.savez(
+        tmp_path / "ephemeris.npz",
+        epoch=np.array(["2024-01-01", "2024-01-02"]),
+        rh=np.array([1.0, 1.1]),
+        ssl=np.array([0.0, 5.0]),
+    )
+    assert _rows(tmp_path / "ephemeris.npz") == [
+        ("2024-01-01", 1.0, 0.0),
+        ("2024-01-02", 1.1, 5.0),
+    ]
+
+
+def test_npz_ephemeris_with_mismatched_lengths_is_rejected(tmp_path):
+    np.savez(
+        tmp_path / "ephemeris.npz", epoch=np.arange(3.0), rh=np.ones(2), ssl=np.zeros(3)
+    )
+    with pytest.raises(ValueError, match="same length"):
+        _rows(tmp_path / "ephemeris.npz")
@@ -0,0 +1,130 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    fit_sublimation_models,
+    run_sublimation_model,
+)
+from comet_ice_sublimation.molecular_species import *
+
+visual_albedos = np.array([0.05, 0.2, 0.4])
+infrared_albedos = np.array([0.05, 0.1, 0.05])
+rh_aus = np.array([1.5, 3.0, 5.0])
+sub_solar_latitudes = np.array([0.0, 30.0, 0.0])
+active_areas_cm2 = np.array([1e10, 3e11, 2e12])
+
+
+def _absorbed_flux(visual_albedos: np.ndarray, rh_aus: np.ndarray) -> np.ndarray:
+    # what the fit of the albedo or distance searches on, and so what fit_rtol bounds
+    return (1.0 - visual_albedos) / rh_aus**2
+
+
+def _z_bars(species: MolecularSpecies) -> np.ndarray:
+    return np.array(
+        [
+            run_sublimation_model(
+                SublimationModelInput(
+                    species=species,
+                    visual_albedo=visual_albedo,
+                    infrared_albedo=infrared_albedo,
+                    rh_au=rh_au,
+                    sub_solar_latitude=sub_solar_latitude,
+                    num_latitude_gridpoints=41,
+                    t_init_K=get_starting_temperature(species),
+                    return_profile=False,
+                )
+            ).z_bar
+            for visual_albedo, infrared_albedo, rh_au, sub_solar_latitude in zip(
+                visual_albedos, infrared_albedos, rh_aus, sub_solar_latitudes
+            )
+        ]
+    )
+
+
+def _fit_input(
+    species: MolecularSpecies, parameter: FitParameter
+) -> SublimationModelFitInput:
+    return SublimationModelFitInput(
+        species=species,
+        parameter=parameter,
+        visual_albedos=visual_albedos,
+        infrared_albedos=infrared_albedos,
+        rh_aus=rh_aus,
+        sub_solar_latitudes=sub_solar_latitudes,
+        num_latitude_gridpoints=41,
+        t_init_K=get_starting_temperature(species),
+    )
+
+
+@pytest.mark.parametrize("species", [MolecularSpecies.h2o, MolecularSpecies.co2])
+def test_fit_recovers_the_visual_albedo_and_distance(species):
+    z_bars = _z_bars(species)
+
+    # start each fit away from the values the targets were made with
+    starts = {
+        FitParameter.visual_albedo: dict(visual_albedos=np.array([0.3, 0.01, 0.1])),
+        FitParameter.rh_au: dict(rh_aus=np.array([3.0, 1.0, 8.0])),
+    }
+    for parameter in (FitParameter.visual_albedo, FitParameter.rh_au):
+        smfi = dataclasses.replace(
+            _fit_input(species, parameter), z_bars=z_bars, **starts[parameter]
+        )
+        result = fit_sublimation_models(smfi)
+
+        assert np.all(result.converged)
+        if parameter == FitParameter.visual_albedo:
+            fitted_flux = _absorbed_flux(result.values, rh_aus)
+        else:
+            fitted_flux = _absorbed_flux(visual_albedos, result.values)
+        np.testing.assert_allclose(
+            fitted_flux, _absorbed_flux(visual_albedos, rh_aus), rtol=smfi.fit_rtol
+        )
+
+
+def test_fit_recovers_the_active_area():
+    species = MolecularSpecies.co2
+    smfi = dataclasses.replace(
+        _fit_input(species, FitParameter.active_area),
+        production_rates=_z_bars(species) * active_areas_cm2,
+        active_areas_cm2=np.full(3, 1.0),
+    )
+    result = fit_sublimation_models(smfi)
+
+    assert np.all(result.converged)
+    np.testing.assert_allclose(result.values, active_areas_cm2, rtol=smfi.fit_rtol)
+
+
+def test_fit_of_an_unreachable_target_does_not_converge():
+    species = MolecularSpecies.h2o
+    z_bars = _z_bars(species)
+    # the last target is twice what an albedo of 0 gives, out of reach of any albedo
+    z_bars[-1] = (
+        2.0
+        * run_sublimation_model(
+            SublimationModelInput(
+                species=species,
+                visual_albedo=0.0,
+                infrared_albedo=infrared_albedos[-1],
+                rh_au=rh_aus[-1],
+                sub_solar_latitude=sub_solar_latitudes[-1],
+                num_latitude_gridpoints=41,
+                t_init_K=get_starting_temperature(species),
+                return_profile=False,
+            )
+        ).z_bar
+    )
+    smfi = dataclasses.replace(
+        _fit_input(species, FitParameter.visual_albedo),
+        visual_albedos=np.array([0.3, 0.01, 0.0]),
+        z_bars=z_bars,
+    )
+    result = fit_sublimation_models(smfi)
+
+    np.testing.assert_array_equal(result.converged, [True, True, False])
+    assert np.isnan(result.values[-1])
+    np.testing.assert_allclose(
+        1.0 - result.values[:2], 1.0 - visual_albedos[:2], rtol=smfi.fit_rtol
+    )
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.heat_of_sublimation import *
+from comet_ice_sublimation.molecular_species import *
+
+# spanning every regime of each species' piecewise fits
+_temperatures_K = {
+    MolecularSpecies.h2o: np.linspace(20.0, 400.0, 2001),
+    MolecularSpecies.h2o_ch4: np.linspace(20.0, 400.0, 2001),
+    MolecularSpecies.co2: np.linspace(5.0, 250.0, 2001),
+    MolecularSpecies.co: np.linspace(5.0, 68.0, 2001),
+}
+
+
+@pytest.mark.parametrize("species", list(MolecularSpecies))
+def test_array_matches_scalar_bit_for_bit(species):
+    temps_K = _temperatures_K[species]
+    hsa = heat_of_sublimation_array(species=species, t_K=temps_K)
+    for i, t_K in enumerate(temps_K.tolist()):
+        hs = heat_of_sublimation(species=species, t_K=t_K)
+        assert hsa.mass_g == hs.mass_g
+        for field in (
+            "latent_heat_of_vaporization",
+            "latent_heat_of_vaporization_prime",
+            "pressure",
+            "pressure_prime",
+        ):
+            assert getattr(hsa, field)[i] == getattr(hs, field), (field, t_K)
@@ -0,0 +1,29 @@
+import pytest
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import run_sublimation_model
+from comet_ice_sublimation.molecular_species import *
+
+
+def _z_bar(quadrature: LatitudeQuadrature, num_latitude_gridpoints: int) -> float:
+    return run_sublimation_model(
+        smi=SublimationModelInput(
+            species=MolecularSpecies.h2o,
+            visual_albedo=0.05,
+            infrared_albedo=0.0,
+            rh_au=1.0,
+            sub_solar_latitude=30.0,
+            num_latitude_gridpoints=num_latitude_gridpoints,
+            t_init_K=get_starting_temperature(MolecularSpecies.h2o),
+            return_profile=False,
+            quadrature=quadrature,
+        )
+    ).z_bar
+
+
+@pytest.mark.parametrize(
+    "quadrature", [LatitudeQuadrature.gauss_kronrod, LatitudeQuadrature.adaptive]
+)
+def test_panel_quadratures_agree_with_a_fine_trapezoid_rule(quadrature):
+    reference = _z_bar(LatitudeQuadrature.trapezoid, 200001)
+    assert _z_bar(quadrature, 181) == pytest.approx(reference, rel=1e-5)
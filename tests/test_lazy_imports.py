@@ -0,0 +1,37 @@
+import ast
+import importlib
+import inspect
+
+import pytest
+
+lazy_packages = [
+    "comet_ice_sublimation.model_input",
+    "comet_ice_sublimation.model_runner",
+]
+
+
+def _type_checking_imports(package) -> dict[str, str]:
+    # the submodule each name is imported from in the package's TYPE_CHECKING block
+    imports = {}
+    for node in ast.parse(inspect.getsource(package)).body:
+        if isinstance(node, ast.If) and ast.unparse(node.test) == "TYPE_CHECKING":
+            for statement in node.body:
+                assert isinstance(statement, ast.ImportFrom) and statement.level == 1
+                for alias in statement.names:
+                    imports[alias.name] = statement.module
+    return imports
+
+
+@pytest.mark.parametrize("package_name", lazy_packages)
+def test_lazy_names_match_all_and_type_checking_imports(package_name):
+    package = importlib.import_module(package_name)
+    assert package.__all__ == list(package._submodule_names)
+    assert _type_checking_imports(package) == package._submodule_names
+
+
+@pytest.mark.parametrize("package_name", lazy_packages)
+def test_every_lazy_name_resolves_to_its_submodule(package_name):
+    package = importlib.import_module(package_name)
+    for name, submodule_name in package._submodule_names.items():
+        submodule = importlib.import_module(f"{package_name}.{submodule_name}")
+        assert getattr(package, name) is getattr(submodule, name)
@@ -0,0 +1,48 @@
+import dataclasses
+
+import numpy as np
+
+from comet_ice_sublimation.model_cache import SublimationModelCache
+from comet_ice_sublimation.model_cache.model_cache import model_input_cache_key
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import run_sublimation_model
+from comet_ice_sublimation.molecular_species import *
+
+
+def _input(**changes) -> SublimationModelInput:
+    smi = SublimationModelInput(
+        species=MolecularSpecies.h2o,
+        visual_albedo=0,
+        infrared_albedo=0.05,
+        rh_au=2,
+        sub_solar_latitude=30,
+        num_latitude_gridpoints=41,
+        t_init_K=get_starting_temperature(MolecularSpecies.h2o),
+        return_profile=False,
+    )
+    return dataclasses.replace(smi, **changes)
+
+
+def test_equal_numbers_give_the_same_cache_key():
+    smi = _input()
+    same_in_floats = _input(
+        visual_albedo=0.0,
+        rh_au=np.float64(2.0),
+        sub_solar_latitude=30.0,
+        t_init_K=float(get_starting_temperature(MolecularSpecies.h2o)),
+        num_latitude_gridpoints=np.int64(41),
+    )
+    assert model_input_cache_key(smi) == model_input_cache_key(same_in_floats)
+    assert model_input_cache_key(smi) != model_input_cache_key(_input(rh_au=2.5))
+    assert model_input_cache_key(smi) != model_input_cache_key(
+        _input(continuation=True)
+    )
+
+
+def test_cached_result_is_found_for_an_equal_input(tmp_path):
+    with SublimationModelCache(cache_dir=tmp_path) as cache:
+        smr = run_sublimation_model(smi=_input())
+        cache.put(smi=_input(), smr=smr)
+        cached = cache.get(smi=_input(visual_albedo=0.0, t_init_K=190.0))
+    assert cached is not None
+    assert cached.z_bar == smr.z_bar
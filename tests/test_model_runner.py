@@ -0,0 +1,150 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.energy_balance import EnergyBalanceConvergenceError
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    run_sublimation_model,
+    run_sublimation_models_vectorized,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+@pytest.mark.parametrize(
+    "quadrature", [LatitudeQuadrature.trapezoid, LatitudeQuadrature.gauss_kronrod]
+)
+def test_telemetry_of_vectorized_runs_matches_single_runs(quadrature):
+    smis = [
+        SublimationModelInput(
+            species=MolecularSpecies.h2o,
+            visual_albedo=visual_albedo,
+            infrared_albedo=0.05,
+            rh_au=rh_au,
+            sub_solar_latitude=30.0,
+            num_latitude_gridpoints=41,
+            t_init_K=get_starting_temperature(MolecularSpecies.h2o),
+            return_profile=True,
+            return_telemetry=True,
+            quadrature=quadrature,
+        )
+        for visual_albedo in (0.05, 0.3)
+        for rh_au in (0.8, 2.5)
+    ]
+
+    for smi, vectorized in zip(smis, run_sublimation_models_vectorized(smis=smis)):
+        single = run_sublimation_model(smi=smi)
+        assert single.telemetry is not None and vectorized.telemetry is not None
+        np.testing.assert_array_equal(
+            vectorized.telemetry.num_iterations, single.telemetry.num_iterations
+        )
+        np.testing.assert_array_equal(
+            vectorized.telemetry.num_clamped_steps, single.telemetry.num_clamped_steps
+        )
+        np.testing.assert_array_equal(
+            vectorized.telemetry.residuals, single.telemetry.residuals
+        )
+
+
+def _unconverged_input(visual_albedo: float) -> SublimationModelInput:
+    # no solver reaches a net flux this small, so every sunlit latitude fails
+    return SublimationModelInput(
+        species=MolecularSpecies.co2,
+        visual_albedo=visual_albedo,
+        infrared_albedo=0.05,
+        rh_au=1.0,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=5,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=False,
+        tolerance=1e-16,
+    )
+
+
+def _converged_input(visual_albedo: float) -> SublimationModelInput:
+    return SublimationModelInput(
+        species=MolecularSpecies.co2,
+        visual_albedo=visual_albedo,
+        infrared_albedo=0.05,
+        rh_au=1.0,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=5,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=False,
+    )
+
+
+def test_vectorized_failure_names_the_models_that_failed():
+    smis = [
+        _converged_input(0.05),
+        _unconverged_input(0.05),
+        _converged_input(0.2),
+        _unconverged_input(0.2),
+    ]
+    with pytest.raises(EnergyBalanceConvergenceError) as vectorized_error:
+        run_sublimation_models_vectorized(smis=smis)
+    with pytest.raises(EnergyBalanceConvergenceError) as single_error:
+        run_sublimation_model(smi=smis[1])
+
+    assert vectorized_error.value.indices.tolist() == [1, 3]
+    assert str(vectorized_error.value) == str(single_error.value)
+    np.testing.assert_array_equal(
+        vectorized_error.value.latitudes_rad, single_error.value.latitudes_rad
+    )
+
+
+# steps of the central differences, small enough for their truncation error to be below the tolerances below
+_sensitivity_steps = {
+    "visual_albedo": 1e-5,
+    "infrared_albedo": 1e-5,
+    "rh_au": 1e-5,
+    "sub_solar_latitude": 1e-3,
+}
+
+
+@pytest.mark.parametrize("species", [MolecularSpecies.h2o, MolecularSpecies.co2])
+@pytest.mark.parametrize(
+    "quadrature", [LatitudeQuadrature.trapezoid, LatitudeQuadrature.gauss_kronrod]
+)
+@pytest.mark.parametrize("parameter", list(_sensitivity_steps))
+def test_sensitivities_match_central_differences(species, quadrature, parameter):
+    smi = SublimationModelInput(
+        species=species,
+        visual_albedo=0.1,
+        infrared_albedo=0.05,
+        rh_au=1.5,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=181,
+        t_init_K=get_starting_temperature(species),
+        return_profile=False,
+        tolerance=1e-13,
+        quadrature=quadrature,
+        return_sensitivities=True,
+    )
+    sensitivities = run_sublimation_model(smi=smi).sensitivities
+    assert sensitivities is not None
+
+    step = _sensitivity_steps[parameter]
+    value = getattr(smi, parameter)
+    z_bars = [
+        run_sublimation_model(
+            smi=dataclasses.replace(
+                smi, **{parameter: value + sign * step}, return_sensitivities=False
+            )
+        ).z_bar
+        for sign in (1, -1)
+    ]
+    central_difference = (z_bars[0] - z_bars[1]) / (2 * step)
+
+    # the Gauss-Kronrod panels are split at the arctic latitudes, so they move with the sub-solar latitude, which
+    # the differences see and the sensitivity, on fixed panels, doesn't
+    rtol = (
+        1e-2
+        if quadrature == LatitudeQuadrature.gauss_kronrod
+        and parameter == "sub_solar_latitude"
+        else 1e-8
+    )
+    assert getattr(sensitivities, parameter) == pytest.approx(
+        central_difference, rel=rtol
+    )
@@ -0,0 +1,47 @@
+import pytest
+
+from comet_ice_sublimation.energy_balance import EnergyBalanceConvergenceError
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import run_sublimation_model
+from comet_ice_sublimation.model_server import model_server
+from comet_ice_sublimation.model_server.model_server import SublimationModelServer
+from comet_ice_sublimation.molecular_species import *
+
+
+def _input(visual_albedo: float, tolerance: float) -> SublimationModelInput:
+    return SublimationModelInput(
+        species=MolecularSpecies.co2,
+        visual_albedo=visual_albedo,
+        infrared_albedo=0.05,
+        rh_au=1.0,
+        sub_solar_latitude=30.0,
+        num_latitude_gridpoints=5,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=False,
+        tolerance=tolerance,
+    )
+
+
+def test_failed_model_does_not_fail_or_rerun_the_rest_of_its_batch(monkeypatch):
+    good = [_input(0.05, 1e-6), _input(0.2, 1e-6), _input(0.3, 1e-6)]
+    # no solver reaches a net flux this small
+    bad = _input(0.1, 1e-16)
+
+    run_alone = []
+
+    def counting_run_sublimation_model(smi):
+        run_alone.append(smi)
+        return run_sublimation_model(smi)
+
+    monkeypatch.setattr(
+        model_server, "run_sublimation_model", counting_run_sublimation_model
+    )
+    with SublimationModelServer(batch_wait_ms=500.0) as server:
+        futures = [server.submit(smi) for smi in [good[0], bad, good[1], good[2]]]
+        with pytest.raises(EnergyBalanceConvergenceError):
+            futures[1].result()
+        results = [futures[i].result() for i in (0, 2, 3)]
+
+    assert run_alone == [bad]
+    for smi, smr in zip(good, results):
+        assert smr.z_bar == run_sublimation_model(smi).z_bar
@@ -0,0 +1,28 @@
+import numpy as np
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import run_sublimation_model_monte_carlo
+from comet_ice_sublimation.molecular_species import *
+
+
+def test_monte_carlo_samples_do_not_depend_on_workers():
+    smci = SublimationModelMonteCarloInput(
+        species=MolecularSpecies.co2,
+        visual_albedo=parse_parameter_distribution("uniform:0.02,0.1"),
+        infrared_albedo=parse_parameter_distribution("0.05"),
+        rh_au=parse_parameter_distribution("normal:3,0.3"),
+        sub_solar_latitude=parse_parameter_distribution("uniform:0,90"),
+        num_latitude_gridpoints=21,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        num_samples=200,
+        seed=1234,
+        batch_size=50,
+    )
+
+    serial = run_sublimation_model_monte_carlo(smci=smci, workers=1)
+    parallel = run_sublimation_model_monte_carlo(smci=smci, workers=2)
+
+    assert serial.num_failed == parallel.num_failed
+    assert serial.mean == parallel.mean
+    assert serial.std == parallel.std
+    np.testing.assert_array_equal(serial.quantiles, parallel.quantiles)
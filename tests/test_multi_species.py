@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_cache import SublimationModelCache
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    run_sublimation_model,
+    run_sublimation_model_multi_species,
+    run_sublimation_model_multi_species_cached,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+def _species_inputs(quadrature: LatitudeQuadrature) -> list[SublimationModelInput]:
+    return [
+        SublimationModelInput(
+            species=species,
+            visual_albedo=0.05,
+            infrared_albedo=0.05,
+            rh_au=1.3,
+            sub_solar_latitude=20.0,
+            num_latitude_gridpoints=61,
+            t_init_K=get_starting_temperature(species),
+            return_profile=True,
+            quadrature=quadrature,
+        )
+        for species in (MolecularSpecies.co, MolecularSpecies.h2o, MolecularSpecies.co2)
+    ]
+
+
+@pytest.mark.parametrize(
+    "quadrature", [LatitudeQuadrature.trapezoid, LatitudeQuadrature.gauss_kronrod]
+)
+def test_multi_species_run_matches_single_species_runs(quadrature):
+    smis = _species_inputs(quadrature)
+    smsr = run_sublimation_model_multi_species(smis=smis)
+    assert list(smsr.results) == [smi.species for smi in smis]
+    for smi in smis:
+        expected = run_sublimation_model(smi=smi)
+        assert smsr.results[smi.species].z_bar == expected.z_bar
+        np.testing.assert_array_equal(
+            smsr.results[smi.species].temps_K, expected.temps_K
+        )
+
+
+def test_partly_cached_multi_species_run_keeps_species_order(tmp_path):
+    smis = _species_inputs(LatitudeQuadrature.trapezoid)
+    expected = run_sublimation_model_multi_species(smis=smis)
+    with SublimationModelCache(cache_dir=tmp_path) as cache:
+        run_sublimation_model_multi_species_cached(smis=smis[1:2], cache=cache)
+        smsr = run_sublimation_model_multi_species_cached(smis=smis, cache=cache)
+    assert list(smsr.results) == [smi.species for smi in smis]
+    for species, smr in expected.results.items():
+        assert smsr.results[species].z_bar == smr.z_bar
+
+
+def test_multi_species_run_needs_a_species():
+    with pytest.raises(ValueError, match="At least one species"):
+        run_sublimation_model_multi_species(smis=[])
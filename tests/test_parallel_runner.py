@@ -0,0 +1,82 @@
+import numpy as np
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    run_sublimation_model,
+    run_sublimation_model_sweep,
+    run_sublimation_model_sweep_parallel,
+    run_sublimation_models_parallel,
+)
+from comet_ice_sublimation.molecular_species import *
+
+
+def _model_inputs() -> list[SublimationModelInput]:
+    return [
+        SublimationModelInput(
+            species=species,
+            visual_albedo=0.05,
+            infrared_albedo=0.1,
+            rh_au=rh_au,
+            sub_solar_latitude=ssl,
+            num_latitude_gridpoints=91,
+            t_init_K=get_starting_temperature(species),
+            return_profile=True,
+        )
+        for species in (MolecularSpecies.h2o, MolecularSpecies.co2)
+        for rh_au in (0.7, 1.5, 3.0)
+        for ssl in (0.0, 45.0)
+    ]
+
+
+def test_parallel_models_match_serial_runs():
+    smis = _model_inputs()
+    parallel_results = run_sublimation_models_parallel(smis=smis, workers=2)
+    assert len(parallel_results) == len(smis)
+    for smi, smr in zip(smis, parallel_results):
+        expected = run_sublimation_model(smi=smi)
+        assert smr.z_bar == expected.z_bar
+        np.testing.assert_array_equal(smr.temps_K, expected.temps_K)
+
+
+def test_parallel_sweep_matches_serial_sweep():
+    smsi = SublimationModelSweepInput(
+        species=MolecularSpecies.h2o,
+        visual_albedos=np.array([0.05, 0.5]),
+        infrared_albedos=np.array([0.0, 0.3]),
+        rh_aus=np.array([0.5, 1.0, 2.5]),
+        sub_solar_latitudes=np.linspace(0.0, 90.0, 7),
+        num_latitude_gridpoints=61,
+        t_init_K=get_starting_temperature(MolecularSpecies.h2o),
+        return_profile=True,
+    )
+    serial = run_sublimation_model_sweep(smsi=smsi)
+    parallel = run_sublimation_model_sweep_parallel(smsi=smsi, workers=2)
+    np.testing.assert_array_equal(parallel.z_bar, serial.z_bar)
+    np.testing.assert_array_equal(parallel.log10_z_bar, serial.log10_z_bar)
+    np.testing.assert_array_equal(parallel.temps_K, serial.temps_K)
+    assert parallel.num_iterations == serial.num_iterations
+
+
+def test_cached_parallel_models_match_uncached_runs(tmp_path):
+    from comet_ice_sublimation.model_cache import SublimationModelCache
+
+    smis = _model_inputs()
+    expected = [run_sublimation_model(smi=smi) for smi in smis]
+    with SublimationModelCache(cache_dir=tmp_path) as cache:
+        # half of the inputs are already cached, so the results come from both the cache and the workers
+        run_sublimation_models_parallel(smis=smis[::2], workers=2, cache=cache)
+        results = run_sublimation_models_parallel(smis=smis, workers=2, cache=cache)
+    for smr, expected_smr in zip(results, expected):
+        assert smr.z_bar == expected_smr.z_bar
+        np.testing.assert_array_equal(smr.temps_K, expected_smr.temps_K)
+
+
+def test_default_num_workers_without_cpu_affinity(monkeypatch):
+    from comet_ice_sublimation.model_runner import default_num_workers
+
+    # macOS and Windows have no sched_getaffinity
+    monkeypatch.delattr("os.sched_getaffinity", raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 3)
+    assert default_num_workers() == 3
+    monkeypatch.setattr("os.cpu_count", lambda: None)
+    assert default_num_workers() == 1
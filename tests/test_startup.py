@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+# modules that only running the model needs, as in benchmarks/startup.py
+deferred_modules = [
+    "numpy",
+    "comet_ice_sublimation.energy_balance",
+    "comet_ice_sublimation.heat_of_sublimation",
+    "comet_ice_sublimation.model_runner.model_runner",
+    "comet_ice_sublimation.model_saver",
+    "comet_ice_sublimation.surface_geometry",
+]
+
+# benchmarks/startup.py holds --help to 100 ms over a bare interpreter on a quiet machine; this is looser so as not
+# to fail on a busy one, but importing numpy and the model up front again costs well over it
+startup_budget_ms = 150.0
+
+_run_main = "from comet_ice_sublimation.comet_ice_sublimation import main; main()"
+
+_probe = """
+import sys
+sys.argv = ["comet_ice"] + {argv!r}
+try:
+    {statement}
+except SystemExit:
+    pass
+print(",".join(m for m in {deferred_modules!r} if any(n == m or n.startswith(m + ".") for n in sys.modules)))
+"""
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        None,
+        ["--help"],
+        ["H2O", "--Av", "2", "--Air", "0", "--rh", "1", "--ssl", "0"],
+        ["sweep", "--help"],
+        ["light-curve", "--help"],
+        ["batch", "--help"],
+        ["monte-carlo", "--help"],
+        ["build-table", "--help"],
+        ["serve", "--help"],
+    ],
+)
+def test_help_and_argument_errors_do_not_import_the_model(argv):
+    probe = _probe.format(
+        argv=argv or [],
+        statement="import comet_ice_sublimation" if argv is None else _run_main,
+        deferred_modules=deferred_modules,
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe], check=True, capture_output=True, text=True
+    )
+    assert result.stdout.splitlines()[-1] == ""
+
+
+def _fastest_ms(command: list[str], runs: int = 5) -> float:
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        seconds.append(time.perf_counter() - start)
+    return 1e3 * min(seconds)
+
+
+def test_help_is_within_startup_budget():
+    interpreter_ms = _fastest_ms([sys.executable, "-c", "pass"])
+    help_ms = _fastest_ms([sys.executable, "-c", _run_main, "--help"])
+    assert help_ms - interpreter_ms < startup_budget_ms
@@ -0,0 +1,65 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    run_sublimation_model,
+    run_sublimation_model_sweep,
+)
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.parse_arguments import parse_sweep_arguments
+
+
+def _sweep_input(species: MolecularSpecies) -> SublimationModelSweepInput:
+    return SublimationModelSweepInput(
+        species=species,
+        visual_albedos=np.array([0.05, 0.3]),
+        infrared_albedos=np.array([0.0, 0.2]),
+        rh_aus=np.array([0.8, 2.0, 4.0]),
+        sub_solar_latitudes=np.array([0.0, 35.0, 90.0]),
+        num_latitude_gridpoints=61,
+        t_init_K=get_starting_temperature(species),
+        return_profile=True,
+    )
+
+
+@pytest.mark.parametrize("species", list(MolecularSpecies))
+def test_sweep_matches_individual_runs(species):
+    smsi = _sweep_input(species)
+    smsr = run_sublimation_model_sweep(smsi=smsi)
+    assert smsr.temps_K is not None and smsr.zs is not None
+    for (i_rh, rh_au), (i_ssl, ssl), (i_av, av), (i_air, air) in itertools.product(
+        enumerate(smsi.rh_aus),
+        enumerate(smsi.sub_solar_latitudes),
+        enumerate(smsi.visual_albedos),
+        enumerate(smsi.infrared_albedos),
+    ):
+        smr = run_sublimation_model(
+            smi=SublimationModelInput(
+                species=species,
+                visual_albedo=float(av),
+                infrared_albedo=float(air),
+                rh_au=float(rh_au),
+                sub_solar_latitude=float(ssl),
+                num_latitude_gridpoints=smsi.num_latitude_gridpoints,
+                t_init_K=smsi.t_init_K,
+                return_profile=True,
+            )
+        )
+        index = (i_rh, i_ssl, i_av, i_air)
+        assert smsr.z_bar[index] == smr.z_bar
+        assert smsr.log10_z_bar[index] == smr.log10_z_bar
+        np.testing.assert_array_equal(smsr.temps_K[index], smr.temps_K)
+        np.testing.assert_array_equal(smsr.zs[index], smr.zs)
+
+
+@pytest.mark.parametrize("axis", ["0.5:5", "0.5:x:3", "1:2:3:foo", "abc"])
+def test_malformed_sweep_axis_is_a_usage_error(axis, capsys):
+    with pytest.raises(SystemExit) as e:
+        parse_sweep_arguments(
+            ["H2O", "--Av", "0", "--Air", "0", "--rh", axis, "--ssl", "0"]
+        )
+    assert e.value.code == 2
+    assert axis in capsys.readouterr().err
@@ -0,0 +1,37 @@
+import functools
+
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.energy_balance import *
+from comet_ice_sublimation.molecular_species import *
+
+
+@pytest.mark.parametrize("num_distinct", [8, 500])
+@pytest.mark.parametrize("species", list(MolecularSpecies))
+def test_solving_distinct_problems_once_matches_solving_every_point(
+    species, num_distinct
+):
+    # many repeats of a few fluxes, with unlit points among them; with fewer distinct problems than
+    # scalar_energy_balance_max_points, the deduplicated solve takes the scalar path and the plain one the array path
+    rng = np.random.default_rng(0)
+    fluxes = np.append(np.geomspace(1e3, 1e7, num_distinct), 0.0)
+    incident_solar_flux = rng.choice(fluxes, size=(3, 400))
+    t_init_K = get_starting_temperature(species)
+    solve = functools.partial(solve_energy_balance_array, species=species)
+
+    plain = solve(
+        infrared_albedo=0.05, incident_solar_flux=incident_solar_flux, t_init_K=t_init_K
+    )
+    unique, solved_indices = solve_unique_energy_balance_problems(
+        solve,
+        infrared_albedo=0.05,
+        incident_solar_flux=incident_solar_flux,
+        t_init_K=t_init_K,
+    )
+
+    assert solved_indices.size <= num_distinct
+    np.testing.assert_array_equal(unique.z, plain.z)
+    np.testing.assert_array_equal(unique.t_K, plain.t_K)
+    np.testing.assert_array_equal(unique.num_iterations, plain.num_iterations)
+    np.testing.assert_array_equal(unique.num_clamped_steps, plain.num_clamped_steps)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from comet_ice_sublimation.model_input import *
+from comet_ice_sublimation.model_runner import (
+    build_z_bar_table,
+    run_sublimation_models_vectorized,
+)
+from comet_ice_sublimation.molecular_species import *
+from comet_ice_sublimation.z_bar_table import *
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory) -> ZBarTable:
+    smsi = SublimationModelSweepInput(
+        species=MolecularSpecies.co2,
+        visual_albedos=np.array([0.0, 0.1, 0.3, 0.5]),
+        infrared_albedos=np.array([0.0, 0.1, 0.2, 0.3]),
+        rh_aus=np.geomspace(0.5, 8.0, 9),
+        sub_solar_latitudes=np.linspace(0.0, 90.0, 7),
+        num_latitude_gridpoints=61,
+        t_init_K=get_starting_temperature(MolecularSpecies.co2),
+        return_profile=False,
+    )
+    return build_z_bar_table(
+        smsi=smsi,
+        output_path=tmp_path_factory.mktemp("z_bar_table") / "co2",
+        num_check_points=200,
+    )
+
+
+def _direct_log10_z_bar(
+    table, rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos
+):
+    smis = [
+        SublimationModelInput(
+            species=table.species,
+            visual_albedo=float(visual_albedo),
+            infrared_albedo=float(infrared_albedo),
+            rh_au=float(rh_au),
+            sub_solar_latitude=float(sub_solar_latitude),
+            num_latitude_gridpoints=table.smsi.num_latitude_gridpoints,
+            t_init_K=table.smsi.t_init_K,
+            return_profile=False,
+        )
+        for rh_au, sub_solar_latitude, visual_albedo, infrared_albedo in zip(
+            rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos
+        )
+    ]
+    return np.array(
+        [smr.log10_z_bar for smr in run_sublimation_models_vectorized(smis=smis)]
+    )
+
+
+@pytest.mark.parametrize("method", list(InterpolationMethod))
+def test_table_matches_direct_solve_at_its_nodes(table, method):
+    smsi = table.smsi
+    rng = np.random.default_rng(1)
+    rh_aus = rng.choice(smsi.rh_aus, 50)
+    sub_solar_latitudes = rng.choice(smsi.sub_solar_latitudes, 50)
+    visual_albedos = rng.choice(smsi.visual_albedos, 50)
+    infrared_albedos = rng.choice(smsi.infrared_albedos, 50)
+
+    np.testing.assert_allclose(
+        table.log10_z_bar(
+            rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos, method=method
+        ),
+        _direct_log10_z_bar(
+            table, rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos
+        ),
+        rtol=0.0,
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize("method", list(InterpolationMethod))
+def test_table_is_close_to_direct_solve_between_its_nodes(table, method):
+    rng = np.random.default_rng(2)
+    rh_aus = 10 ** rng.uniform(np.log10(0.5), np.log10(8.0), 200)
+    sub_solar_latitudes = rng.uniform(0.0, 90.0, 200)
+    visual_albedos = rng.uniform(0.0, 0.5, 200)
+    infrared_albedos = rng.uniform(0.0, 0.3, 200)
+
+    errors = np.abs(
+        table.log10_z_bar(
+            rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos, method=method
+        )
+        - _direct_log10_z_bar(
+            table, rh_aus, sub_solar_latitudes, visual_albedos, infrared_albedos
+        )
+    )
+    # the errors measured when the table was built are at cell centers, where interpolation is furthest from the
+    # nodes, so they bound these up to the chance of missing the worst cells
+    assert np.max(errors) <= 2 * table.interpolation_errors[method].max